@@ -1,26 +1,59 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, Response, g
+from flask import (
+    Flask, render_template, request, redirect, url_for, flash, session, jsonify, Response, g, stream_with_context,
+    send_from_directory
+)
+from flask.sessions import SecureCookieSessionInterface
 from werkzeug.security import generate_password_hash, check_password_hash
 from functools import wraps
 from database import (
-    init_db, insert_employee, get_employees, insert_shift, get_shifts_with_names,
+    init_db, insert_employee, get_employees, insert_shift, get_shifts_with_names_between,
     insert_attendance, get_attendance_with_names, insert_task, get_tasks_with_names,
     delete_employee, delete_shift, delete_attendance, delete_task,
     insert_user, get_user_by_email, delete_shifts_by_series, update_shift_employee,
-    connect_db, insert_time_off, get_time_off_overlapping, delete_time_off,
+    insert_time_off, get_time_off_overlapping, delete_time_off,
     employee_exists, get_time_off_by_id, update_time_off, update_user_password,
-    update_employee_rate, insert_adjustment
+    update_employee_rate, insert_adjustment, create_series, update_series_rule,
+    update_shift_occurrence, expand_weekly_occurrences, get_coverage_gaps, get_daily_coverage,
+    get_payroll_summary, iter_shift_export_rows, iter_time_off_export_rows, get_export_fingerprint,
+    on_table_change, get_db, release_db, db_pool_stats, cache_stats,
+    get_conflict_candidates, get_series_rule, get_series_exception_days, get_shift_by_id,
+    get_shifts_by_ids, apply_shift_ops, BulkOpError, DuplicateShiftError, get_change_seq, get_changes_since,
+    ensure_series_materialized, get_stat_totals, get_stat_buckets, get_table_versions
 )
+from scheduling import ConflictIndex, shift_minutes
+from exports import csv_stream, ics_stream
+import metrics
+import assets
+from compress import CompressMiddleware
 import sqlite3
 from datetime import datetime, timedelta, date, time as dtime
 import os
 import uuid
 import time
+import hashlib
+import hmac
+import mimetypes
+import threading
 import logging
 
 app = Flask(__name__)
 app.secret_key = os.environ.get('FLASK_SECRET_KEY', 'dev-secret-change-me')
 # Kiosk-friendly: keep sessions alive longer unless explicitly logged out
 app.permanent_session_lifetime = timedelta(days=30)
+# Pooled per-thread SQLite connection: roll back leftovers / reap dead threads after each request
+app.teardown_appcontext(release_db)
+# Hashed bundle/image/font URLs for templates (scripts/build_assets.py), or the sources without a build
+assets.init_app(app)
+# gzip (zstd/brotli too when installed) for HTML, JSON, CSS/JS and exports; see compress.py
+COMPRESSION = None
+if os.environ.get('CARE_COMPRESS', '1') == '1':
+    COMPRESSION = app.wsgi_app = CompressMiddleware(
+        app.wsgi_app,
+        encodings=tuple(e.strip() for e in os.environ.get('CARE_COMPRESS_ENCODINGS', 'zstd,br,gzip').split(',')),
+        min_size=int(os.environ.get('CARE_COMPRESS_MIN_BYTES', '1024')),
+        gzip_level=int(os.environ.get('CARE_COMPRESS_LEVEL', '6')),
+        cache_bytes=int(os.environ.get('CARE_COMPRESS_CACHE_KIB', '2048')) * 1024,
+    )
 
 # Force a low-cost hash suitable for Pi 2 unless overridden
 os.environ.setdefault('CARE_PWHASH_METHOD', 'pbkdf2:sha256:15000')
@@ -40,51 +73,77 @@ if os.environ.get('CARE_DISABLE_TIMING') != '1':
 
     @app.before_request
     def _care_timer_start():  # type: ignore
-        # High-resolution start time stored on flask.g
+        # High-resolution start time stored on flask.g; SQLite usage is tallied per thread
         g._care_t0 = time.perf_counter()
+        metrics.begin_request()
 
     @app.after_request
     def _care_timer_end(resp):  # type: ignore
         t0 = getattr(g, '_care_t0', None)
         if t0 is not None:
-            dt_ms = (time.perf_counter() - t0) * 1000.0
-            if not request.path.startswith('/static/'):
-                app.logger.info(
-                    "REQ method=%s path=%s status=%s dur=%.1fms",
-                    request.method, request.path, resp.status_code, dt_ms
+            dt = time.perf_counter() - t0
+            # Endpoint names (not paths) keep label cardinality bounded; unmatched URLs share one bucket
+            endpoint = request.endpoint or '<unmatched>'
+            queries, db_s = metrics.request_db_usage()
+            metrics.registry.observe_request(endpoint, request.method, resp.status_code, dt, queries, db_s)
+            if not request.path.startswith(('/static/', '/assets/')):
+                app.logger.debug(
+                    "REQ method=%s path=%s status=%s dur=%.1fms db=%d/%.1fms",
+                    request.method, request.path, resp.status_code, dt * 1000.0, queries, db_s * 1000.0
                 )
         return resp
 
-    # Opportunistic auto-login to streamline kiosk use
+    # Opportunistic auto-login to streamline kiosk use (identity resolved off the request path)
     @app.before_request
     def _care_autologin():  # type: ignore
         # Skip for static/auth endpoints and if already logged in
         if not AUTOLOGIN:
             return None
-        if 'user_id' in session:
+        if request.path.startswith(('/static/', '/assets/')):
             return None
-        if request.path.startswith('/static/'):
+        if 'user_id' in session:
             return None
-        if request.endpoint in ('logout', 'login', 'signup'):
+        if request.endpoint in ('logout', 'login', 'signup', 'metrics_text', 'health'):
             return None
+        if not _autologin['resolved']:
+            # Only if the server was started without resolve_autologin_user() (e.g. bare WSGI import)
+            resolve_autologin_user()
+        if _autologin['user_id'] is not None:
+            session['user_id'] = _autologin['user_id']
+            session.permanent = True
+        return None
+
+
+# Kiosk identity, resolved at startup and again whenever the users table changes
+_autologin = { 'resolved': False, 'user_id': None }
+_autologin_lock = threading.Lock()
+
+def resolve_autologin_user():
+    """Look up (creating if missing) the auto-login user and keep its id in memory.
+    Runs at startup, then once more after each users-table change (on the next anonymous request)."""
+    if not AUTOLOGIN:
+        return None
+    with _autologin_lock:
         try:
             user = get_user_by_email(AUTOLOGIN_EMAIL)
-        except Exception:
-            user = None
-        if not user:
-            # Create the user with current hash method
-            method = os.environ.get('CARE_PWHASH_METHOD')
-            try:
+            if not user:
+                # Create the user with current hash method
+                method = os.environ.get('CARE_PWHASH_METHOD')
                 hpw = generate_password_hash(AUTOLOGIN_PASSWORD, method=method) if method else generate_password_hash(AUTOLOGIN_PASSWORD)
                 insert_user('Monroe', AUTOLOGIN_EMAIL, hpw)
                 user = get_user_by_email(AUTOLOGIN_EMAIL)
-            except Exception as e:
-                app.logger.warning("Auto-login user create failed: %s", e)
-                return None
-        if user:
-            session['user_id'] = user[0]
-            session.permanent = True
-        return None
+        except Exception as e:
+            app.logger.warning("Auto-login user resolve failed: %s", e)
+            user = None
+        _autologin['user_id'] = user[0] if user else None
+        _autologin['resolved'] = True
+    return _autologin['user_id']
+
+def _on_users_changed():
+    # Re-resolve lazily: the listener can fire mid-write, so only mark stale here
+    _autologin['resolved'] = False
+
+on_table_change('users', _on_users_changed)
 
 
 def login_required(f):
@@ -96,41 +155,150 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
-def get_statistics():
-    """Return basic counts using the canonical DB connection.
-    Uses connect_db() so CARE_DB_PATH and migrations are respected.
-    """
-    conn = connect_db()
-    cur = conn.cursor()
+# --- Conditional GET: strong ETags from per-table write versions, answered before the view runs ---
+
+# endpoint -> tables its GET response is built from. None of these pages render flashed messages, and
+# everything else they show depends only on the URL, the session's user and rates flag, and today's date.
+VALIDATED_ENDPOINTS = {
+    'shifts': ('shifts', 'series', 'series_exceptions', 'employees', 'time_off'),
+    'api_shifts_list': ('shifts', 'series', 'series_exceptions', 'employees'),
+    'api_coverage': ('shifts', 'series', 'series_exceptions', 'time_off'),
+    'api_time_off_list': ('time_off',),
+    'hours_report': ('shifts', 'series', 'series_exceptions', 'employees', 'pay_adjustments'),
+    'employees': ('employees',),
+    'attendance': ('attendance', 'employees'),
+    'tasks': ('tasks', 'employees'),
+}
+
+# VALIDATED_ENDPOINTS that render HTML and so link static files (by ?v=mtime when not built)
+VALIDATED_PAGES = frozenset({'shifts', 'hours_report', 'employees', 'attendance', 'tasks'})
+
+def _response_build_id():
+    """Changes when the code (every backend .py module), templates, asset manifest or CARE_* settings that shape a
+    response change (new deploy or restart with other settings), so ETags from an older build never validate.
+    Same in every worker. Unbuilt static files are stamped per request instead (assets.source_stamp())."""
+    h = hashlib.sha1()
+    base = os.path.dirname(os.path.abspath(__file__))
+    paths = []
+    for root, dirs, files in os.walk(base):
+        dirs[:] = [d for d in dirs if d not in ('static', '__pycache__')]
+        paths.extend(os.path.join(root, f) for f in files if f.endswith('.py'))
+    for root, _dirs, files in os.walk(os.path.join(base, 'templates')):
+        paths.extend(os.path.join(root, f) for f in files)
+    if os.path.exists(assets.MANIFEST_PATH):
+        paths.append(assets.MANIFEST_PATH)
+    for path in sorted(paths):
+        st = os.stat(path)
+        h.update(f'{path}:{st.st_mtime_ns}:{st.st_size}\n'.encode())
+    h.update(repr(sorted((k, v) for k, v in os.environ.items() if k.startswith('CARE_'))).encode())
+    return h.hexdigest()
+
+RESPONSE_BUILD_ID = _response_build_id()
+
+@app.before_request
+def _care_conditional_get():
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    tables = VALIDATED_ENDPOINTS.get(request.endpoint)
+    if tables is None or 'user_id' not in session:
+        return None
+    if 'series' in tables:
+        # The view would materialize its window and bump `shifts`; do it first so the versions below
+        # already include those rows and the first response for a new window carries a current ETag
+        through = _series_read_end(request.endpoint, request.args)
+        if through is not None:
+            ensure_series_materialized(through.isoformat())
+    key = (
+        RESPONSE_BUILD_ID, request.endpoint, request.full_path, session['user_id'],
+        bool(session.get('rates_unlocked')), date.today().isoformat(), get_table_versions(tables),
+        assets.source_stamp() if request.endpoint in VALIDATED_PAGES else None,
+    )
+    etag = hashlib.sha1(repr(key).encode()).hexdigest()
+    g._care_etag = etag
+    if request.if_none_match.contains(etag):
+        resp = Response(status=304)
+        _set_validators(resp, etag)
+        return resp
+    return None
+
+def _series_read_end(endpoint, args):
+    """Last day whose series occurrences a VALIDATED_ENDPOINTS view reads (parsed as the view does), or None."""
     try:
-        # Employees
-        cur.execute("SELECT COUNT(*) FROM employees")
-        no_of_employees = cur.fetchone()[0]
-        # Tasks
-        cur.execute("SELECT COUNT(*) FROM tasks")
-        no_of_tasks = cur.fetchone()[0]
-        # Shifts
-        cur.execute("SELECT COUNT(*) FROM shifts")
-        no_of_shifts = cur.fetchone()[0]
-        # Attendance Present/Absent
-        cur.execute("SELECT COUNT(*) FROM attendance WHERE status = 'Present'")
-        no_of_present = cur.fetchone()[0]
-        cur.execute("SELECT COUNT(*) FROM attendance WHERE status = 'Absent'")
-        no_of_absent = cur.fetchone()[0]
-    finally:
-        conn.close()
-    return no_of_employees, no_of_tasks, no_of_shifts, no_of_present, no_of_absent
+        if endpoint in ('shifts', 'api_shifts_list'):
+            return _shift_window_from_args(args)[1]
+        if endpoint == 'api_coverage':
+            return _shift_window_from_args(args, MAX_COVERAGE_WINDOW_DAYS)[1]
+        if endpoint == 'hours_report':
+            return _report_range_from_args(args)[1]
+    except ValueError:
+        # /shifts falls back to the current month; the APIs answer 400 without reading anything
+        if endpoint == 'shifts':
+            return _month_grid_window(date.today())[1]
+    return None
+
+@app.after_request
+def _care_etag(resp):
+    etag = g.get('_care_etag')
+    if etag and resp.status_code == 200 and not resp.is_streamed:
+        _set_validators(resp, etag)
+    return resp
+
+def _set_validators(resp, etag):
+    resp.set_etag(etag)
+    resp.headers['Cache-Control'] = 'private, no-cache'
+    resp.vary.add('Cookie')
+
+PERFORMANCE_WEEKS = int(os.environ.get('CARE_PERFORMANCE_WEEKS', '12'))
+PERFORMANCE_MONTHS = int(os.environ.get('CARE_PERFORMANCE_MONTHS', '12'))
+
+def get_statistics():
+    """Return basic counts from the trigger-maintained stat_counters (one read, however large the tables grow)."""
+    totals = get_stat_totals()
+    return (totals.get('employees', 0), totals.get('tasks', 0), totals.get('shifts', 0),
+            totals.get('attendance:Present', 0), totals.get('attendance:Absent', 0))
+
+def get_trends(today: date):
+    """Shifts and hours for the last PERFORMANCE_WEEKS weeks (Monday buckets, current week included) and
+    attendance per month for the last PERFORMANCE_MONTHS months, from the stat_counters buckets."""
+    monday = today - timedelta(days=today.weekday())
+    weeks = [monday - timedelta(weeks=i) for i in range(PERFORMANCE_WEEKS - 1, -1, -1)]
+    # Series occurrences are written lazily; make sure this week's are counted
+    ensure_series_materialized((monday + timedelta(days=6)).isoformat())
+    counts = get_stat_buckets(('shifts:week', 'shift_minutes:week'), weeks[0].isoformat(), weeks[-1].isoformat())
+    weekly = [
+        {
+            'week': w.isoformat(),
+            'shifts': counts['shifts:week'].get(w.isoformat(), 0),
+            'hours': round(counts['shift_minutes:week'].get(w.isoformat(), 0) / 60.0, 1),
+        }
+        for w in weeks
+    ]
+    first = today.year * 12 + today.month - 1
+    months = [f'{m // 12:04d}-{m % 12 + 1:02d}' for m in range(first - PERFORMANCE_MONTHS + 1, first + 1)]
+    counts = get_stat_buckets(('attendance:Present:month', 'attendance:Absent:month'), months[0], months[-1])
+    monthly = []
+    for m in months:
+        present = counts['attendance:Present:month'].get(m, 0)
+        absent = counts['attendance:Absent:month'].get(m, 0)
+        rate = round(100.0 * present / (present + absent)) if present + absent else None
+        monthly.append({ 'month': m, 'present': present, 'absent': absent, 'rate': rate })
+    return weekly, monthly
 
 @app.route('/performance')
 @login_required
 def performance():
     no_of_employees, no_of_tasks, no_of_shifts, no_of_present, no_of_absent = get_statistics()
+    weekly, monthly = get_trends(date.today())
+    max_hours = max((w['hours'] for w in weekly), default=0) or 1
     return render_template('performance.html', 
                             no_of_employees=no_of_employees,
                             no_of_tasks=no_of_tasks,
                             no_of_shifts=no_of_shifts,
                             no_of_present=no_of_present,
-                            no_of_absent=no_of_absent)
+                            no_of_absent=no_of_absent,
+                            weekly=weekly,
+                            monthly=monthly,
+                            max_hours=max_hours)
 
 @app.route('/login', methods=['GET', 'POST'])
 def login():
@@ -150,6 +318,7 @@ def login():
             except Exception as e:
                 app.logger.warning("Password hash check failed: %s", e)
             else:
+                metrics.registry.observe_timer('password_verify', time.perf_counter() - lt1)
                 target_method = os.environ.get('CARE_PWHASH_METHOD')
                 if hash_ok and target_method and not stored_hash.startswith(target_method + ':'):
                     try:
@@ -159,6 +328,7 @@ def login():
                     except Exception as e:
                         app.logger.warning("Password hash upgrade failed: %s", e)
         lt2 = time.perf_counter()
+        metrics.registry.observe_timer('login_user_lookup', lt1 - lt0)
         app.logger.info(
             "LOGIN diag email=%s user_lookup=%.1fms hash=%.1fms total=%.1fms found=%s ok=%s upgraded=%s",
             email,
@@ -235,6 +405,66 @@ def delete_employee_route(employee_id):
     delete_employee(employee_id)
     return redirect(url_for('employees'))
 
+# --- Double-booking checks (per-caregiver interval index over shifts + time off) ---
+
+# block: reject overlapping saves unless the client sends force; warn: save and report; off: skip the check
+CONFLICT_POLICY = os.environ.get('CARE_CONFLICT_POLICY', 'block')
+MAX_CONFLICT_DETAILS = 50
+
+def _find_conflicts(proposals, ignore_shift_ids=(), ignore_series_ids=()):
+    """Structured conflicts for proposed shifts [(employee_id, shift_time, end_time[, shift_id]), ...]:
+    one index over the caregivers and days they touch, one O(log n) probe per proposal.
+    Shifts in ignore_shift_ids / series in ignore_series_ids are about to be replaced or deleted."""
+    if CONFLICT_POLICY == 'off' or not proposals:
+        return []
+    days = [p[1][:10] for p in proposals] + [p[2][:10] for p in proposals if p[2]]
+    # Shifts may run past midnight; +1 day covers a missing end time (start + 60)
+    last = (date.fromisoformat(max(days)) + timedelta(days=1)).isoformat()
+    shift_rows, off_rows = get_conflict_candidates({p[0] for p in proposals}, min(days), last)
+    return ConflictIndex(shift_rows, off_rows).check(proposals, ignore_shift_ids, ignore_series_ids)
+
+def _conflicts_block(conflicts, force):
+    return bool(conflicts) and CONFLICT_POLICY == 'block' and not force
+
+def _conflict_response(conflicts, **extra):
+    n = len(conflicts)
+    return jsonify({
+        'ok': False,
+        'error': f"{n} shift{'s' if n != 1 else ''} would overlap an existing shift or time off",
+        'conflict_count': n,
+        'conflicts': conflicts[:MAX_CONFLICT_DETAILS],
+        **extra,
+    }), 409
+
+def _duplicate_response(err):
+    # Same caregiver, same start time: ux_shifts_employee_time rejects it, so force cannot override it
+    return jsonify({ 'ok': False, 'error': str(err), 'duplicate_shift_id': getattr(err, 'duplicate_id', None) }), 409
+
+def _conflict_summary(conflicts, limit=3):
+    """Short human-readable list for flash messages and confirm() prompts."""
+    parts = []
+    for c in conflicts[:limit]:
+        other = c['conflicts'][0]
+        what = ('time off' if other['kind'] == 'time_off'
+                else f"shift at {other['shift_time'][11:16]}")
+        parts.append(f"{c['shift_time'][:10]} {c['shift_time'][11:16]} overlaps {what}")
+    more = len(conflicts) - limit
+    return '; '.join(parts) + (f' (+{more} more)' if more > 0 else '')
+
+def _is_forced(source):
+    val = source.get('force') if source else None
+    return val is True or str(val).lower() in ('1', 'true', 'on', 'yes')
+
+def _new_shift_proposals(employee_id, base_dt, end_t, weekday_indices=None, end_date=None):
+    """(employee_id, shift_time, end_time) for a single shift or every occurrence of a new weekly series."""
+    if weekday_indices is None:
+        end_dt = datetime.combine(base_dt.date(), end_t).isoformat() if end_t else None
+        return [(employee_id, base_dt.isoformat(), end_dt)]
+    return [
+        (employee_id, st, et)
+        for st, et in expand_weekly_occurrences(base_dt.date(), end_date, weekday_indices, base_dt.time(), end_t)
+    ]
+
 @app.route('/shifts', methods=['GET', 'POST'])
 @login_required
 def shifts():
@@ -287,49 +517,275 @@ def shifts():
                 flash('Invalid weekday selection', 'error')
                 return redirect(url_for('shifts'))
 
-            start_date = base_dt.date()
-            time_part = base_dt.time()
-            # Start from Monday of the week containing the base date
-            current_week_start = start_date - timedelta(days=start_date.weekday())
-            occurrences = 0
-            series_id = str(uuid.uuid4())
-            while current_week_start <= end_date:
-                for dow in weekday_indices:
-                    shift_date = current_week_start + timedelta(days=dow)
-                    if shift_date < start_date or shift_date > end_date:
-                        continue
-                    shift_dt = datetime.combine(shift_date, time_part)
-                    end_dt = None
-                    if end_dt_template:
-                        end_dt = datetime.combine(shift_date, end_dt_template)
-                    insert_shift(employee_id, shift_dt.isoformat(), end_dt.isoformat() if end_dt else None, series_id)
-                    occurrences += 1
-                current_week_start += timedelta(days=7)
-            flash(f'Recurring weekly pattern created ({occurrences} shifts).', 'success')
+            try:
+                proposals = _new_shift_proposals(int(employee_id), base_dt, end_dt_template, weekday_indices, end_date)
+            except ValueError:
+                flash('Invalid employee', 'error')
+                return redirect(url_for('shifts'))
+            conflicts = _find_conflicts(proposals)
+            if _conflicts_block(conflicts, _is_forced(request.form)):
+                flash(f'Not saved, {len(conflicts)} of {len(proposals)} shifts overlap: {_conflict_summary(conflicts)}', 'error')
+                return redirect(url_for('shifts'))
+
+            try:
+                create_series(
+                    employee_id, str(uuid.uuid4()), base_dt.date(), end_date,
+                    weekday_indices, base_dt.time(), end_dt_template,
+                )
+            except sqlite3.Error as e:
+                app.logger.warning("Recurring shift insert failed: %s", e)
+                flash('Could not create recurring shifts', 'error')
+                return redirect(url_for('shifts'))
+            count = len(proposals)
+            msg = f'Recurring weekly pattern created ({count} shifts).'
+            flash(msg, 'success')
         else:
-            end_dt = None
-            if end_dt_template:
-                end_dt = datetime.combine(base_dt.date(), end_dt_template)
-            insert_shift(employee_id, base_dt.isoformat(), end_dt.isoformat() if end_dt else None, None)
+            try:
+                proposals = _new_shift_proposals(int(employee_id), base_dt, end_dt_template)
+            except ValueError:
+                flash('Invalid employee', 'error')
+                return redirect(url_for('shifts'))
+            conflicts = _find_conflicts(proposals)
+            if _conflicts_block(conflicts, _is_forced(request.form)):
+                flash(f'Not saved, the shift overlaps: {_conflict_summary(conflicts)}', 'error')
+                return redirect(url_for('shifts'))
+            _, shift_time, end_time = proposals[0]
+            insert_shift(employee_id, shift_time, end_time, None)
             flash('Shift added.', 'success')
         return redirect(url_for('shifts'))
 
-    shifts_data = get_shifts_with_names()
+    # Read before the shifts so the client's first /api/changes poll can't miss a concurrent write
+    change_seq = get_change_seq()
+    # Only ship the visible window; the calendar fetches other months via /api/shifts
+    try:
+        win_start, win_end = _shift_window_from_args(request.args)
+    except ValueError:
+        win_start, win_end = _month_grid_window(date.today())
+    shifts_serializable = [_shift_to_dict(s) for s in get_shifts_with_names_between(win_start.isoformat(), win_end.isoformat())]
     employees = get_employees()
+    employees_serializable = [ { 'id': e['id'], 'name': e['name'] } for e in employees ]
+    return render_template(
+        'shifts.html',
+        shifts=shifts_serializable,
+        shifts_window={ 'start': win_start.isoformat(), 'end': win_end.isoformat() },
+        change_seq=change_seq,
+        employees=employees_serializable,
+    )
+
+
+# --- Windowed shift loading (calendar pages through months instead of embedding everything) ---
+
+MAX_SHIFT_WINDOW_DAYS = int(os.environ.get('CARE_SHIFT_WINDOW_MAX_DAYS', '62'))
+
+def _month_grid_window(anchor_d):
+    """Return (first_cell, last_cell) of the 6-week Monday-aligned month grid containing anchor_d."""
+    month_start = date(anchor_d.year, anchor_d.month, 1)
+    first_cell = month_start - timedelta(days=month_start.weekday())
+    return first_cell, first_cell + timedelta(days=41)
+
+def _shift_window_from_args(args, max_days=None):
+    """Parse ?start=&end= (YYYY-MM-DD). Missing start -> current month grid; missing end -> start's grid end.
+    Raises ValueError on bad input or when the span exceeds max_days (default MAX_SHIFT_WINDOW_DAYS)."""
+    max_days = max_days or MAX_SHIFT_WINDOW_DAYS
+    start_raw = args.get('start')
+    end_raw = args.get('end')
+    if not start_raw:
+        return _month_grid_window(date.today())
+    start_d = _parse_iso_date(start_raw, 'start')
+    if end_raw:
+        end_d = _parse_iso_date(end_raw, 'end')
+    else:
+        end_d = start_d + timedelta(days=41)
+    if end_d < start_d:
+        start_d, end_d = end_d, start_d
+    if (end_d - start_d).days + 1 > max_days:
+        raise ValueError(f'window exceeds {max_days} day limit')
+    return start_d, end_d
+
+def _shift_to_dict(s):
     # Convert Row objects to plain dicts for JSON serialization
-    shifts_serializable = [
-        {
-            'id': s['id'],
-            'name': s['name'],
-            'employee_id': s['employee_id'],
-            'shift_time': s['shift_time'],
-            'end_time': s['end_time'],
-            'series_id': s['series_id'],
+    return {
+        'id': s['id'],
+        'name': s['name'],
+        'employee_id': s['employee_id'],
+        'shift_time': s['shift_time'],
+        'end_time': s['end_time'],
+        'series_id': s['series_id'],
+    }
+
+@app.route('/api/shifts', methods=['GET'])
+@login_required
+def api_shifts_list():
+    """Return shifts whose start date falls in ?start=YYYY-MM-DD&end=YYYY-MM-DD (inclusive).
+    If omitted, defaults to the month grid (Mon-aligned, 42 days) containing today."""
+    try:
+        start_d, end_d = _shift_window_from_args(request.args)
+    except ValueError as ve:
+        return jsonify({ 'ok': False, 'error': str(ve) }), 400
+    rows = get_shifts_with_names_between(start_d.isoformat(), end_d.isoformat())
+    return jsonify({
+        'ok': True,
+        'start': start_d.isoformat(),
+        'end': end_d.isoformat(),
+        'items': [_shift_to_dict(r) for r in rows],
+    })
+
+
+@app.route('/api/shift_conflicts', methods=['POST'])
+@login_required
+def api_shift_conflicts():
+    """Check a new shift or weekly series for double-booking without saving it (wizard review step).
+    Payload JSON mirrors the create form: employee_id, shift_time (YYYY-MM-DDTHH:MM), end_time (HH:MM) optional,
+    repeat_weekly (bool), weekdays (list[int 0..6]), repeat_until (YYYY-MM-DD, default end of year).
+    Returns { ok, checked, conflict_count, conflicts: [{employee_id, shift_time, end_time, conflicts: [...]}] }."""
+    data = request.get_json(silent=True) or {}
+    try:
+        employee_id = int(data.get('employee_id'))
+        base_dt = datetime.strptime(data.get('shift_time') or '', '%Y-%m-%dT%H:%M')
+        end_t = datetime.strptime(data['end_time'], '%H:%M').time() if data.get('end_time') else None
+        weekday_indices = end_date = None
+        if data.get('repeat_weekly'):
+            weekday_indices = sorted({int(d) for d in (data.get('weekdays') or [base_dt.weekday()]) if 0 <= int(d) <= 6})
+            until_raw = data.get('repeat_until')
+            end_date = _parse_iso_date(until_raw, 'repeat_until') if until_raw else date(base_dt.year, 12, 31)
+    except (TypeError, ValueError) as ve:
+        return jsonify({ 'ok': False, 'error': f'Invalid payload: {ve}' }), 400
+    proposals = _new_shift_proposals(employee_id, base_dt, end_t, weekday_indices, end_date)
+    conflicts = _find_conflicts(proposals)
+    return jsonify({
+        'ok': True,
+        'policy': CONFLICT_POLICY,
+        'checked': len(proposals),
+        'conflict_count': len(conflicts),
+        'conflicts': conflicts[:MAX_CONFLICT_DETAILS],
+        'summary': _conflict_summary(conflicts) if conflicts else '',
+    })
+
+
+# --- Changes feed (the calendar patches its cached windows instead of reloading) ---
+
+CHANGES_PAGE_SIZE = int(os.environ.get('CARE_CHANGES_PAGE', '1000'))
+CHANGES_MAX_WAIT_S = float(os.environ.get('CARE_CHANGES_MAX_WAIT_S', '25'))
+CHANGES_POLL_INTERVAL_S = 0.5
+# Each long-poll holds a server thread; cap them per process so normal requests always have threads left
+_changes_waiters = threading.BoundedSemaphore(int(os.environ.get('CARE_CHANGES_MAX_WAITERS', '2')))
+
+@app.route('/api/changes', methods=['GET'])
+@login_required
+def api_changes():
+    """Rows of shifts, time_off and employees changed after ?since=<seq> (from /shifts' data-seq or a previous call).
+    Optional ?start=&end= (YYYY-MM-DD): the range the client has loaded; series are materialized through end and
+    only shifts starting in the range are returned (deletions always are).
+    Optional ?wait=<seconds> (max CARE_CHANGES_MAX_WAIT_S): long-poll until something changes. When too many
+    clients are already waiting the call returns at once with waited=false, and the client should poll slower.
+    Returns { ok, since, seq, more, waited, shifts|time_off|employees: { upserted: [...], deleted: [ids] } };
+    call again with since=seq, immediately while more is true."""
+    try:
+        since = int(request.args.get('since', ''))
+        wait = float(request.args.get('wait') or 0)
+    except ValueError:
+        return jsonify({ 'ok': False, 'error': 'since must be an integer and wait a number' }), 400
+    if since < 0:
+        return jsonify({ 'ok': False, 'error': 'since must be >= 0' }), 400
+    wait = min(max(wait, 0.0), CHANGES_MAX_WAIT_S)
+    try:
+        start_raw, end_raw = request.args.get('start'), request.args.get('end')
+        start_d = _parse_iso_date(start_raw, 'start') if start_raw else None
+        end_d = _parse_iso_date(end_raw, 'end') if end_raw else None
+    except ValueError as ve:
+        return jsonify({ 'ok': False, 'error': str(ve) }), 400
+    if bool(start_d) != bool(end_d) or (start_d and end_d < start_d):
+        return jsonify({ 'ok': False, 'error': 'start and end must be given together, end >= start' }), 400
+    window = (start_d.isoformat(), end_d.isoformat()) if start_d and end_d else (None, None)
+    if end_d:
+        # Series edits drop future occurrences and regenerate them on read; materialize so they show up here
+        # (ensure_series_materialized stops at today + CARE_SERIES_HORIZON_DAYS, whatever end says)
+        ensure_series_materialized(end_d.isoformat())
+    waited = False
+    if wait and get_change_seq() <= since and _changes_waiters.acquire(blocking=False):
+        waited = True
+        try:
+            deadline = time.monotonic() + wait
+            while get_change_seq() <= since and time.monotonic() < deadline:
+                time.sleep(CHANGES_POLL_INTERVAL_S)
+        finally:
+            _changes_waiters.release()
+    seq, more, changes = get_changes_since(since, CHANGES_PAGE_SIZE, *window)
+    return jsonify({
+        'ok': True,
+        'since': since,
+        'seq': seq,
+        'more': more,
+        'waited': waited,
+        'shifts': {
+            'upserted': [_shift_to_dict(r) for r in changes['shifts']['upserted']],
+            'deleted': changes['shifts']['deleted'],
+        },
+        'time_off': {
+            'upserted': [dict(r) for r in changes['time_off']['upserted']],
+            'deleted': changes['time_off']['deleted'],
+        },
+        'employees': {
+            'upserted': [{ 'id': r['id'], 'name': r['name'] } for r in changes['employees']['upserted']],
+            'deleted': changes['employees']['deleted'],
+        },
+    })
+
+
+# --- Coverage gaps (server-side sweep; the calendar only renders the badges) ---
+
+MAX_COVERAGE_WINDOW_DAYS = int(os.environ.get('CARE_COVERAGE_MAX_DAYS', '366'))
+COVERAGE_DEFAULT_START = os.environ.get('CARE_COVERAGE_START', '09:00')
+COVERAGE_DEFAULT_END = os.environ.get('CARE_COVERAGE_END', '21:00')
+
+def _hhmm_to_min(val, field):
+    try:
+        t = datetime.strptime(val, '%H:%M').time()
+    except (TypeError, ValueError):
+        raise ValueError(f'{field} must be HH:MM')
+    return t.hour * 60 + t.minute
+
+def _min_to_hhmm(m):
+    return f'{m // 60:02d}:{m % 60:02d}'
+
+COVERAGE_DEFAULT_WINDOW = (_hhmm_to_min(COVERAGE_DEFAULT_START, 'CARE_COVERAGE_START'),
+                           _hhmm_to_min(COVERAGE_DEFAULT_END, 'CARE_COVERAGE_END'))
+
+@app.route('/api/coverage', methods=['GET'])
+@login_required
+def api_coverage():
+    """Uncovered minutes per day for ?start=YYYY-MM-DD&end=YYYY-MM-DD (inclusive, up to a year).
+    Optional ?window_start=HH:MM&window_end=HH:MM set the daily coverage window (default CARE_COVERAGE_START/END).
+    Shifts of a caregiver who has time off that day do not count as coverage.
+    Only days with a gap are listed under 'days'."""
+    try:
+        start_d, end_d = _shift_window_from_args(request.args, MAX_COVERAGE_WINDOW_DAYS)
+        w_start = _hhmm_to_min(request.args.get('window_start', COVERAGE_DEFAULT_START), 'window_start')
+        w_end = _hhmm_to_min(request.args.get('window_end', COVERAGE_DEFAULT_END), 'window_end')
+    except ValueError as ve:
+        return jsonify({ 'ok': False, 'error': str(ve) }), 400
+    if w_end <= w_start:
+        return jsonify({ 'ok': False, 'error': 'window_end must be after window_start' }), 400
+    if (w_start, w_end) == COVERAGE_DEFAULT_WINDOW:
+        # Served from the daily_coverage rollup; only days changed since the last read are recomputed
+        coverage = get_daily_coverage(start_d.isoformat(), end_d.isoformat(), w_start, w_end)
+        gaps = { day: day_gaps for day, (_covered, day_gaps) in coverage.items() if day_gaps }
+    else:
+        gaps = get_coverage_gaps(start_d.isoformat(), end_d.isoformat(), w_start, w_end)
+    days = {
+        day: {
+            'gap_minutes': sum(b - a for a, b in day_gaps),
+            'gaps': [{ 'start': _min_to_hhmm(a), 'end': _min_to_hhmm(b) } for a, b in day_gaps],
         }
-        for s in shifts_data
-    ]
-    employees_serializable = [ { 'id': e['id'], 'name': e['name'] } for e in employees ]
-    return render_template('shifts.html', shifts=shifts_serializable, employees=employees_serializable)
+        for day, day_gaps in sorted(gaps.items())
+    }
+    return jsonify({
+        'ok': True,
+        'start': start_d.isoformat(),
+        'end': end_d.isoformat(),
+        'window': { 'start': _min_to_hhmm(w_start), 'end': _min_to_hhmm(w_end) },
+        'days': days,
+    })
 
 @app.route('/delete_shift/<int:shift_id>')
 @login_required
@@ -410,8 +866,20 @@ def api_swap_shift():
     if not shift_id or not new_employee_id:
         return jsonify({'ok': False, 'error': 'shift_id and new_employee_id required'}), 400
     try:
-        update_shift_employee(int(shift_id), int(new_employee_id))
-        return jsonify({'ok': True})
+        shift_id, new_employee_id = int(shift_id), int(new_employee_id)
+    except (TypeError, ValueError):
+        return jsonify({'ok': False, 'error': 'shift_id and new_employee_id must be integers'}), 400
+    try:
+        row = get_shift_by_id(shift_id)
+        if row is None:
+            return jsonify({'ok': False, 'error': 'Shift not found'}), 404
+        conflicts = _find_conflicts([(new_employee_id, row['shift_time'], row['end_time'], shift_id)])
+        if _conflicts_block(conflicts, _is_forced(request.json if request.is_json else request.form)):
+            return _conflict_response(conflicts)
+        update_shift_employee(shift_id, new_employee_id)
+        return jsonify({'ok': True, 'conflicts': conflicts})
+    except (DuplicateShiftError, sqlite3.IntegrityError) as de:
+        return _duplicate_response(de)
     except Exception as e:
         return jsonify({'ok': False, 'error': str(e)}), 500
 
@@ -428,7 +896,8 @@ def api_update_series():
       - weekdays (list[int 0..6]) REQUIRED which weekdays to occur
       - repeat_until (YYYY-MM-DD) optional; defaults end of current year
       - employee_id optional; if provided, reassign occurrences to this employee
-    Behavior: deletes existing series occurrences on/after start_date; regenerates new ones per rules.
+    Behavior: replaces the series rule from start_date; generated occurrences on/after it are dropped and
+    regenerated on read. Single-day edits and deletions (series_exceptions) are preserved.
     """
     data = request.get_json(silent=True) or {}
     series_id = data.get('series_id')
@@ -473,71 +942,38 @@ def api_update_series():
     else:
         end_date = date(start_date.year, 12, 31)
 
-    try:
-        # Determine employee to use: explicit, else infer from existing series BEFORE deletion
-        employee_id_to_use = data.get('employee_id')
-        if employee_id_to_use is not None:
-            try:
-                employee_id_to_use = int(employee_id_to_use)
-            except Exception:
-                return jsonify({ 'ok': False, 'error': 'employee_id must be integer' }), 400
-        else:
-            # Use same DB path/connection helper as rest of app to avoid CWD issues
-            conn0 = connect_db()
-            cur0 = conn0.cursor()
-            # Prefer any occurrence on/after start_date (about to be replaced)
-            cur0.execute(
-                """
-                SELECT employee_id FROM shifts
-                WHERE series_id = ? AND date(shift_time) >= date(?)
-                ORDER BY shift_time ASC LIMIT 1
-                """,
-                (series_id, start_date.isoformat())
-            )
-            row = cur0.fetchone()
-            if not row:
-                # Fall back to the most recent occurrence before start_date
-                cur0.execute(
-                    """
-                    SELECT employee_id FROM shifts
-                    WHERE series_id = ? AND date(shift_time) < date(?)
-                    ORDER BY shift_time DESC LIMIT 1
-                    """,
-                    (series_id, start_date.isoformat())
-                )
-                row = cur0.fetchone()
-            conn0.close()
-            if row:
-                employee_id_to_use = int(row[0])
-            else:
-                return jsonify({ 'ok': False, 'error': 'Could not infer employee for this series. Please choose a caregiver.' }), 400
-
-        # delete occurrences on/after start_date in this series
-        # Delete using the canonical DB connection
-        conn = connect_db()
-        cur = conn.cursor()
-        cur.execute(
-            "DELETE FROM shifts WHERE series_id = ? AND date(shift_time) >= date(?)",
-            (series_id, start_date.isoformat()),
-        )
-        conn.commit()
-        conn.close()
+    employee_id_to_use = data.get('employee_id')
+    if employee_id_to_use is not None:
+        try:
+            employee_id_to_use = int(employee_id_to_use)
+        except Exception:
+            return jsonify({ 'ok': False, 'error': 'employee_id must be integer' }), 400
 
-        # regenerate weekly occurrences from the Monday of start week up to end_date
+    try:
+        # Rewrites the series rule; occurrences on/after start_date are regenerated lazily on read
         weekday_indices = sorted({int(x) for x in weekdays if isinstance(x, int) and 0 <= int(x) <= 6})
-        week_start = start_date - timedelta(days=start_date.weekday())
-        occ = 0
-        while week_start <= end_date:
-            for wd in weekday_indices:
-                day = week_start + timedelta(days=wd)
-                if day < start_date or day > end_date:
-                    continue
-                st_dt = datetime.combine(day, t_parts)
-                et_dt = datetime.combine(day, end_t) if end_t else None
-                insert_shift(employee_id_to_use, st_dt.isoformat(), et_dt and et_dt.isoformat(), series_id)
-                occ += 1
-            week_start += timedelta(days=7)
-        return jsonify({ 'ok': True, 'updated': occ })
+        rule = get_series_rule(series_id)
+        if rule is None:
+            return jsonify({ 'ok': False, 'error': 'Series not found' }), 404
+        # Every occurrence the new rule will generate (kept overrides/skips excluded) against everything
+        # except this series' own rows, which the rewrite replaces
+        skip_days = get_series_exception_days(series_id, start_date.isoformat(), end_date.isoformat())
+        series_employee = employee_id_to_use if employee_id_to_use is not None else rule['employee_id']
+        proposals = [
+            (series_employee, st, et)
+            for st, et in expand_weekly_occurrences(start_date, end_date, weekday_indices, t_parts, end_t)
+            if st[:10] not in skip_days
+        ]
+        conflicts = _find_conflicts(proposals, ignore_series_ids={series_id})
+        if _conflicts_block(conflicts, _is_forced(data)):
+            return _conflict_response(conflicts)
+        removed = update_series_rule(
+            series_id, start_date, end_date, weekday_indices, t_parts, end_t, employee_id=employee_id_to_use,
+        )
+        if removed is None:
+            return jsonify({ 'ok': False, 'error': 'Series not found' }), 404
+        updated = sum(1 for _ in expand_weekly_occurrences(start_date, end_date, weekday_indices, t_parts))
+        return jsonify({ 'ok': True, 'updated': updated, 'removed': removed, 'conflicts': conflicts[:MAX_CONFLICT_DETAILS] })
     except Exception as e:
         return jsonify({ 'ok': False, 'error': str(e) }), 500
 
@@ -620,7 +1056,7 @@ def api_time_off_create():
     if not employee_exists(emp_id):
         return jsonify({ 'ok': False, 'error': 'employee not found' }), 404
     # Overlap check
-    conn = connect_db()
+    conn = get_db()
     cur = conn.cursor()
     cur.execute(
         """
@@ -631,7 +1067,6 @@ def api_time_off_create():
         (emp_id, start_d.isoformat(), end_d.isoformat())
     )
     overlap = cur.fetchone() is not None
-    conn.close()
     if overlap:
         return jsonify({ 'ok': False, 'error': 'overlapping time off exists' }), 409
     try:
@@ -688,7 +1123,7 @@ def api_time_off_patch(time_off_id):
     if not employee_exists(emp_id):
         return jsonify({ 'ok': False, 'error': 'employee not found' }), 404
     # Overlap (exclude self)
-    conn = connect_db()
+    conn = get_db()
     cur = conn.cursor()
     cur.execute(
         """
@@ -699,7 +1134,6 @@ def api_time_off_patch(time_off_id):
         (emp_id, time_off_id, start_d.isoformat(), end_d.isoformat())
     )
     overlap = cur.fetchone() is not None
-    conn.close()
     if overlap:
         return jsonify({ 'ok': False, 'error': 'overlapping time off exists' }), 409
     try:
@@ -765,14 +1199,13 @@ def api_edit_day():
             return jsonify({ 'ok': False, 'error': 'employee_id must be integer' }), 400
     
     try:
-        conn = connect_db()
+        conn = get_db()
         cursor = conn.cursor()
 
         # Fetch the original shift; we will update THIS row only
         cursor.execute("SELECT employee_id, series_id, shift_time FROM shifts WHERE id = ?", (shift_id,))
         original_shift = cursor.fetchone()
         if not original_shift:
-            conn.close()
             return jsonify({ 'ok': False, 'error': 'Original shift not found' }), 404
 
         # Default to original employee if not provided
@@ -787,36 +1220,187 @@ def api_edit_day():
 
         # Validate end after start when provided
         if new_end_datetime and new_end_datetime <= new_shift_datetime:
-            conn.close()
             return jsonify({ 'ok': False, 'error': 'end_time must be after start time' }), 400
 
-        # Update this occurrence only
-        cursor.execute(
-            "UPDATE shifts SET shift_time = ?, end_time = ?, employee_id = ? WHERE id = ?",
-            (
-                new_shift_datetime.isoformat(),
-                new_end_datetime.isoformat() if new_end_datetime else None,
-                employee_id,
-                shift_id
-            )
+        conflicts = _find_conflicts([(
+            employee_id,
+            new_shift_datetime.isoformat(),
+            new_end_datetime.isoformat() if new_end_datetime else None,
+            shift_id,
+        )])
+        if _conflicts_block(conflicts, _is_forced(data)):
+            return _conflict_response(conflicts)
+
+        # Update this occurrence only (recorded as a series override when it belongs to one)
+        update_shift_occurrence(
+            shift_id,
+            new_shift_datetime.isoformat(),
+            new_end_datetime.isoformat() if new_end_datetime else None,
+            employee_id,
         )
 
-        conn.commit()
-        conn.close()
-
-        return jsonify({ 'ok': True, 'message': 'Day updated successfully' })
+        return jsonify({ 'ok': True, 'message': 'Day updated successfully', 'conflicts': conflicts })
+    except (DuplicateShiftError, sqlite3.IntegrityError) as de:
+        return _duplicate_response(de)
     except Exception as e:
         return jsonify({ 'ok': False, 'error': str(e) }), 500
 
 
-# --- Weekly hours report ---
-@app.route('/hours')
+# --- Bulk shift operations (one transaction for a whole selection) ---
+
+MAX_BULK_OPS = int(os.environ.get('CARE_BULK_MAX_OPS', '500'))
+
+def _parse_bulk_op(raw, originals):
+    """Validate one /api/shifts/bulk op into the tuple apply_shift_ops() takes. Raises ValueError."""
+    if not isinstance(raw, dict):
+        raise ValueError('op must be an object')
+    kind = raw.get('op')
+    if kind not in ('delete', 'delete_series', 'swap', 'edit_day'):
+        raise ValueError("op must be one of delete, delete_series, swap, edit_day")
+    if kind == 'delete_series':
+        series_id = raw.get('series_id')
+        if not series_id or not isinstance(series_id, str):
+            raise ValueError('series_id required')
+        return ('delete_series', series_id)
+    try:
+        shift_id = int(raw.get('shift_id'))
+    except (TypeError, ValueError):
+        raise ValueError('shift_id must be integer')
+    if kind == 'delete':
+        return ('delete', shift_id)
+    original = originals.get(shift_id)
+    if original is None:
+        raise LookupError(f'shift {shift_id} not found')
+    if kind == 'swap':
+        try:
+            return ('swap', shift_id, int(raw.get('new_employee_id')))
+        except (TypeError, ValueError):
+            raise ValueError('new_employee_id must be integer')
+    # edit_day
+    try:
+        day = datetime.strptime(raw.get('shift_date') or '', '%Y-%m-%d').date()
+        start_t = datetime.strptime(raw.get('time') or '', '%H:%M').time()
+        end_t = datetime.strptime(raw['end_time'], '%H:%M').time() if raw.get('end_time') else None
+    except (TypeError, ValueError):
+        raise ValueError('shift_date must be YYYY-MM-DD, time/end_time HH:MM')
+    if end_t and end_t <= start_t:
+        raise ValueError('end_time must be after start time')
+    employee_id = raw.get('employee_id')
+    try:
+        employee_id = int(employee_id) if employee_id is not None else int(original['employee_id'])
+    except (TypeError, ValueError):
+        raise ValueError('employee_id must be integer')
+    return (
+        'edit_day', shift_id, datetime.combine(day, start_t).isoformat(),
+        datetime.combine(day, end_t).isoformat() if end_t else None, employee_id,
+    )
+
+def _bulk_results(ops, status, failed=None, error=None):
+    """Per-op result list; the op at index `failed` (if any) is marked failed with `error`."""
+    results = []
+    for i, op in enumerate(ops):
+        res = { 'index': i, 'op': op.get('op') if isinstance(op, dict) else None, 'status': status }
+        if i == failed:
+            res.update(status='failed', error=error)
+        results.append(res)
+    return results
+
+@app.route('/api/shifts/bulk', methods=['POST'])
 @login_required
-def hours_report():
-    # Optional query params: ?start=YYYY-MM-DD&end=YYYY-MM-DD
-    # If end missing, default to start + 6 days. If neither provided, default to current week (Mon..Sun).
-    start_raw = request.args.get('start')
-    end_raw = request.args.get('end')
+def api_shifts_bulk():
+    """
+    Apply several shift operations atomically: all of them or none.
+    Payload JSON: { ops: [...], force: bool } with ops (up to CARE_BULK_MAX_OPS) of:
+      - { op: 'delete', shift_id }
+      - { op: 'delete_series', series_id }
+      - { op: 'swap', shift_id, new_employee_id }
+      - { op: 'edit_day', shift_id, shift_date, time, end_time?, employee_id? }  (same fields as /api/edit_day)
+    Ops run in order inside one BEGIN IMMEDIATE transaction. Deletes of rows that are already gone succeed
+    with affected 0; a swap/edit_day of a missing shift fails the batch (404).
+    Swaps and edits are checked for double-booking against the state after the whole batch (409 unless force).
+    Returns { ok, results: [{ index, op, status: 'applied'|'failed'|'not_applied', affected?, error? }] }.
+    """
+    data = request.get_json(silent=True) or {}
+    ops = data.get('ops')
+    if not isinstance(ops, list) or not ops:
+        return jsonify({ 'ok': False, 'error': 'ops must be a non-empty list' }), 400
+    if len(ops) > MAX_BULK_OPS:
+        return jsonify({ 'ok': False, 'error': f'at most {MAX_BULK_OPS} ops per request' }), 400
+
+    referenced = set()
+    for op in ops:
+        if isinstance(op, dict) and op.get('op') in ('swap', 'edit_day'):
+            try:
+                referenced.add(int(op.get('shift_id')))
+            except (TypeError, ValueError):
+                pass
+    originals = get_shifts_by_ids(referenced)
+    parsed = []
+    for i, op in enumerate(ops):
+        try:
+            parsed.append(_parse_bulk_op(op, originals))
+        except LookupError as le:
+            return jsonify({ 'ok': False, 'error': str(le), 'results': _bulk_results(ops, 'not_applied', i, str(le)) }), 404
+        except ValueError as ve:
+            return jsonify({ 'ok': False, 'error': f'op {i}: {ve}', 'results': _bulk_results(ops, 'not_applied', i, str(ve)) }), 400
+
+    # Double-booking check against the end state: deleted/rewritten rows don't count, and the batch's own
+    # swaps/edits are also checked against each other
+    # Final state of every shift the batch moves (later ops on the same shift win), keyed by shift id
+    final = {}
+    for op in parsed:
+        if op[0] == 'swap':
+            prev = final.get(op[1]) or (None, originals[op[1]]['shift_time'], originals[op[1]]['end_time'], op[1])
+            final[op[1]] = (op[2], prev[1], prev[2], op[1])
+        elif op[0] == 'edit_day':
+            final[op[1]] = (op[4], op[2], op[3], op[1])
+        elif op[0] == 'delete':
+            final.pop(op[1], None)
+    conflicts = []
+    if final and CONFLICT_POLICY != 'off':
+        proposals = list(final.values())
+        gone = {op[1] for op in parsed if op[0] != 'delete_series'}
+        gone_series = {op[1] for op in parsed if op[0] == 'delete_series'}
+        conflicts = _find_conflicts(proposals, gone, gone_series)
+        # ...and against each other, since none of them is in the database yet
+        moved = []
+        for employee_id, shift_time, end_time, shift_id in proposals:
+            start_min, end_min = shift_minutes(shift_time, end_time)
+            moved.append({
+                'id': shift_id, 'employee_id': employee_id, 'series_id': None,
+                'shift_time': shift_time, 'end_time': end_time, 'start_min': start_min, 'end_min': end_min,
+            })
+        reported = {c['shift_id']: c for c in conflicts}
+        for c in ConflictIndex(moved, []).check(proposals):
+            if c['shift_id'] in reported:
+                reported[c['shift_id']]['conflicts'].extend(c['conflicts'])
+            else:
+                conflicts.append(c)
+    if _conflicts_block(conflicts, _is_forced(data)):
+        return _conflict_response(conflicts, results=_bulk_results(ops, 'not_applied'))
+
+    try:
+        affected = apply_shift_ops(parsed)
+    except BulkOpError as be:
+        return jsonify({
+            'ok': False, 'error': f'op {be.index}: {be}',
+            'results': _bulk_results(ops, 'not_applied', be.index, str(be)),
+        }), be.status
+    except sqlite3.Error as e:
+        app.logger.warning("Bulk shift ops rolled back: %s", e)
+        return jsonify({ 'ok': False, 'error': str(e), 'results': _bulk_results(ops, 'not_applied') }), 500
+    results = _bulk_results(ops, 'applied')
+    for res, n in zip(results, affected):
+        res['affected'] = n
+    return jsonify({ 'ok': True, 'results': results, 'conflicts': conflicts[:MAX_CONFLICT_DETAILS] })
+
+
+# --- Weekly hours report ---
+def _report_range_from_args(args):
+    """Parse ?start=&end= for reports. If end missing, default to start + 6 days.
+    If neither provided (or unparseable), default to the current week (Mon..Sun)."""
+    start_raw = args.get('start')
+    end_raw = args.get('end')
     today_d = date.today()
     if start_raw:
         try:
@@ -834,66 +1418,21 @@ def hours_report():
         end_date = start_date + timedelta(days=6)
     if end_date < start_date:
         start_date, end_date = end_date, start_date
+    return start_date, end_date
 
-    # Use canonical DB connection (respects CARE_DB_PATH, has schema migrations)
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        SELECT employees.id AS employee_id, employees.name AS employee_name, employees.hourly_rate AS hourly_rate,
-               shifts.shift_time, shifts.end_time
-        FROM shifts
-        JOIN employees ON shifts.employee_id = employees.id
-        WHERE date(shifts.shift_time) BETWEEN date(?) AND date(?)
-        """,
-        (start_date.isoformat(), end_date.isoformat())
-    )
-    rows = cur.fetchall()
-
-    # Aggregate minutes per employee
-    totals_min = {}
-    names = {}
-    rates = {}
-    for r in rows:
-        emp_id = r['employee_id']
-        names[emp_id] = r['employee_name']
-        # hourly_rate may be NULL for legacy rows; treat as 16 default
-        rates[emp_id] = r['hourly_rate'] if r['hourly_rate'] is not None else 16
-        try:
-            st = datetime.fromisoformat(r['shift_time'])
-        except Exception:
-            continue
-        try:
-            et = datetime.fromisoformat(r['end_time']) if r['end_time'] else (st + timedelta(hours=1))
-        except Exception:
-            et = st + timedelta(hours=1)
-        if et <= st:
-            et = st + timedelta(hours=1)
-        minutes = int((et - st).total_seconds() // 60)
-        totals_min[emp_id] = totals_min.get(emp_id, 0) + minutes
-
-    # Adjustments within range
-    cur.execute(
-        """
-        SELECT employee_id, COALESCE(SUM(amount), 0) AS total
-        FROM pay_adjustments
-        WHERE date(date) BETWEEN date(?) AND date(?)
-        GROUP BY employee_id
-        """,
-        (start_date.isoformat(), end_date.isoformat())
-    )
-    adj_rows = cur.fetchall()
-    conn.close()
-    adj_by_emp = { r['employee_id']: (r['total'] or 0.0) for r in adj_rows }
+@app.route('/hours')
+@login_required
+def hours_report():
+    # Optional query params: ?start=YYYY-MM-DD&end=YYYY-MM-DD
+    start_date, end_date = _report_range_from_args(request.args)
     rates_unlocked = bool(session.get('rates_unlocked'))
-    # Build report
     report = []
-    for emp_id, mins in sorted(totals_min.items(), key=lambda x: names.get(x[0], '').lower()):
-        hours = round(mins / 60.0, 2)
-        row = { 'employee_id': emp_id, 'name': names.get(emp_id, str(emp_id)), 'hours': hours }
+    for r in get_payroll_summary(start_date.isoformat(), end_date.isoformat()):
+        hours = round(r['minutes'] / 60.0, 2)
+        row = { 'employee_id': r['employee_id'], 'name': r['employee_name'], 'hours': hours }
         if rates_unlocked:
-            rate = float(rates.get(emp_id, 16))
-            adjustments = float(adj_by_emp.get(emp_id, 0.0))
+            rate = float(r['hourly_rate'])
+            adjustments = float(r['adjustments'])
             total = round(hours * rate + adjustments, 2)
             row.update({ 'rate': rate, 'adjustments': round(adjustments, 2), 'total': total })
         report.append(row)
@@ -902,68 +1441,70 @@ def hours_report():
     employees = get_employees()
     return render_template('hours.html', report=report, start=start_date.isoformat(), end=end_date.isoformat(), rates_unlocked=rates_unlocked, employees=employees)
 
-# --- Weekly hours CSV export ---
+# --- Streaming exports (hours summary CSV, per-shift CSV, iCalendar feed) ---
+def _export_etag(kind, start_date, end_date, include_time_off=False):
+    fingerprint = get_export_fingerprint(start_date.isoformat(), end_date.isoformat(), include_time_off)
+    return hashlib.sha1(repr((kind, start_date.isoformat(), end_date.isoformat(), fingerprint)).encode()).hexdigest()
+
+def _streamed_export(etag, body_factory, mimetype, filename):
+    """304 when the client's ETag still matches; otherwise stream body_factory() (a generator),
+    keeping the request context (and pooled connection) alive until the last chunk is sent."""
+    headers = { 'Content-Disposition': f'attachment; filename="{filename}"', 'Cache-Control': 'private, no-cache' }
+    if request.if_none_match.contains_weak(etag):
+        resp = Response(status=304, headers=headers)
+    else:
+        resp = Response(stream_with_context(body_factory()), mimetype=mimetype, headers=headers)
+    resp.set_etag(etag, weak=True)
+    return resp
+
 @app.route('/hours.csv')
 @login_required
 def hours_csv():
-    # Reuse logic from hours_report with optional end date support
-    start_raw = request.args.get('start')
-    end_raw = request.args.get('end')
-    today_d = date.today()
-    if start_raw:
-        try:
-            start_date = datetime.strptime(start_raw, '%Y-%m-%d').date()
-        except ValueError:
-            start_date = today_d - timedelta(days=today_d.weekday())
-    else:
-        start_date = today_d - timedelta(days=today_d.weekday())
-    if end_raw:
-        try:
-            end_date = datetime.strptime(end_raw, '%Y-%m-%d').date()
-        except ValueError:
-            end_date = start_date + timedelta(days=6)
-    else:
-        end_date = start_date + timedelta(days=6)
-    if end_date < start_date:
-        start_date, end_date = end_date, start_date
-
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        SELECT employees.name AS employee_name,
-               shifts.shift_time, shifts.end_time
-        FROM shifts
-        JOIN employees ON shifts.employee_id = employees.id
-        WHERE date(shifts.shift_time) BETWEEN date(?) AND date(?)
-        """,
-        (start_date.isoformat(), end_date.isoformat())
-    )
-    rows = cur.fetchall()
-    conn.close()
+    start_date, end_date = _report_range_from_args(request.args)
+    etag = _export_etag('hours.csv', start_date, end_date)
+    def body():
+        rows = get_payroll_summary(start_date.isoformat(), end_date.isoformat())
+        yield from csv_stream(['Employee', 'Hours'], ((r['employee_name'], round(r['minutes'] / 60.0, 2)) for r in rows))
+    return _streamed_export(etag, body, 'text/csv', f'hours_{start_date.isoformat()}_{end_date.isoformat()}.csv')
+
+@app.route('/shifts.csv')
+@login_required
+def shifts_csv():
+    """Per-shift detail for ?start=&end= (same defaults as the hours report; multi-year ranges are fine)."""
+    start_date, end_date = _report_range_from_args(request.args)
+    etag = _export_etag('shifts.csv', start_date, end_date)
+    def body():
+        rows = iter_shift_export_rows(start_date.isoformat(), end_date.isoformat())
+        yield from csv_stream(
+            ['Shift ID', 'Date', 'Employee', 'Start', 'End', 'Hours', 'Series ID'],
+            (
+                (r['id'], r['shift_day'], r['name'], r['start_local'][11:], r['end_local'][11:],
+                 round(r['minutes'] / 60.0, 2), r['series_id'] or '')
+                for r in rows
+            ),
+        )
+    return _streamed_export(etag, body, 'text/csv', f'shifts_{start_date.isoformat()}_{end_date.isoformat()}.csv')
 
-    totals_min = {}
-    for r in rows:
-        name = r['employee_name']
-        try:
-            st = datetime.fromisoformat(r['shift_time'])
-        except Exception:
-            continue
-        try:
-            et = datetime.fromisoformat(r['end_time']) if r['end_time'] else (st + timedelta(hours=1))
-        except Exception:
-            et = st + timedelta(hours=1)
-        if et <= st:
-            et = st + timedelta(hours=1)
-        minutes = int((et - st).total_seconds() // 60)
-        totals_min[name] = totals_min.get(name, 0) + minutes
+ICS_DEFAULT_PAST_DAYS = int(os.environ.get('CARE_ICS_PAST_DAYS', '31'))
+ICS_DEFAULT_FUTURE_DAYS = int(os.environ.get('CARE_ICS_FUTURE_DAYS', '365'))
 
-    # build CSV
-    lines = ["Employee,Hours"]
-    for name, mins in sorted(totals_min.items(), key=lambda x: x[0].lower()):
-        lines.append(f"{name},{round(mins/60.0, 2)}")
-    csv_data = "\n".join(lines)
-    return Response(csv_data, mimetype='text/csv', headers={'Content-Disposition': f'attachment; filename="hours_{start_date.isoformat()}_{end_date.isoformat()}.csv"'})
+@app.route('/calendar.ics')
+@login_required
+def calendar_ics():
+    """iCalendar feed of shifts and time off. ?start=&end= optional; default is the last
+    CARE_ICS_PAST_DAYS through the next CARE_ICS_FUTURE_DAYS days."""
+    if request.args.get('start'):
+        start_date, end_date = _report_range_from_args(request.args)
+    else:
+        today_d = date.today()
+        start_date = today_d - timedelta(days=ICS_DEFAULT_PAST_DAYS)
+        end_date = today_d + timedelta(days=ICS_DEFAULT_FUTURE_DAYS)
+    etag = _export_etag('calendar.ics', start_date, end_date, include_time_off=True)
+    def body():
+        # Time off rows are few; fetch them up front so the shift cursor is the only open statement
+        time_off_rows = iter_time_off_export_rows(start_date.isoformat(), end_date.isoformat()).fetchall()
+        yield from ics_stream(iter_shift_export_rows(start_date.isoformat(), end_date.isoformat()), time_off_rows)
+    return _streamed_export(etag, body, 'text/calendar', 'care-calendar.ics')
 
 
 # --- Rates PIN unlock and management ---
@@ -1062,6 +1603,108 @@ def api_pay_adjustment():
     end = request.args.get('end') or request.form.get('end')
     return redirect(url_for('hours_report', start=start, end=end))
 
+# -------- Built static assets --------
+
+ASSET_MAX_AGE_S = 365 * 24 * 3600
+
+class _AssetAwareSessionInterface(SecureCookieSessionInterface):
+    # The permanent session is re-signed on every request; a Set-Cookie / Vary: Cookie on an
+    # immutable asset would keep it from being reused once the cookie value moves on
+    def save_session(self, app, session, response):
+        if request.path.startswith('/assets/'):
+            return None
+        return super().save_session(app, session, response)
+
+app.session_interface = _AssetAwareSessionInterface()
+
+@app.route('/assets/<path:filename>')
+def built_asset(filename):
+    """Content-hashed files from scripts/build_assets.py: the name changes with the content, so they
+    are cached for a year without revalidation. The precompressed .gz copy goes to gzip clients."""
+    found = assets.built_path(filename, request.accept_encodings['gzip'] > 0)
+    if found is None:
+        return Response('Not found', status=404, mimetype='text/plain')
+    path, encoding = found
+    resp = send_from_directory(
+        assets.DIST_DIR, path, mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+        max_age=ASSET_MAX_AGE_S,
+    )
+    resp.headers['Cache-Control'] = f'public, max-age={ASSET_MAX_AGE_S}, immutable'
+    if filename.endswith(assets.GZIP_EXTS):
+        resp.vary.add('Accept-Encoding')
+    if encoding:
+        resp.headers['Content-Encoding'] = encoding
+    return resp
+
+# -------- Metrics / health --------
+
+def _pool_and_cache_metrics():
+    pool = db_pool_stats()
+    cache = cache_stats()
+    counters = {
+        'care_db_pool_connections_total': {
+            (('event', k),): v for k, v in sorted(pool.items()) if k != 'open'
+        },
+        'care_lookup_cache_total': {
+            (('event', k),): v for k, v in sorted(cache.items()) if k in ('hits', 'misses', 'invalidations')
+        },
+    }
+    gauges = {
+        'care_db_pool_open_connections': {None: pool.get('open', 0)},
+        'care_lookup_cache_entries': {None: cache.get('entries', 0)},
+    }
+    if COMPRESSION is not None:
+        comp = COMPRESSION.stats_snapshot()
+        counters['care_compression_bytes_total'] = {
+            (('direction', 'in'),): comp['bytes_in'], (('direction', 'out'),): comp['bytes_out'],
+        }
+        counters['care_compression_responses_total'] = {
+            (('encoding', e),): comp['encoding_' + e] for e in comp['encodings']
+        }
+        counters['care_compression_cache_total'] = {
+            (('event', 'hits'),): comp['cache_hits'], (('event', 'misses'),): comp['cache_misses'],
+        }
+        gauges['care_compression_cache_entries'] = {None: comp['cache_entries']}
+    return counters, gauges
+
+# Scrapers without a session send "Authorization: Bearer <token>"; unset = logged-in users only
+METRICS_TOKEN = os.environ.get('CARE_METRICS_TOKEN', '')
+
+def _metrics_allowed():
+    if 'user_id' in session:
+        return True
+    auth = request.headers.get('Authorization', '')
+    return bool(METRICS_TOKEN) and auth.startswith('Bearer ') and hmac.compare_digest(
+        auth[len('Bearer '):].strip().encode(), METRICS_TOKEN.encode()
+    )
+
+@app.route('/metrics')
+def metrics_text():
+    """Prometheus text exposition of the in-process registry (see metrics.py): per-endpoint timings, SQLite
+    statements, pool/cache/compression counters. Needs a logged-in session or the CARE_METRICS_TOKEN bearer."""
+    if not _metrics_allowed():
+        return Response('unauthorized\n', status=401, mimetype='text/plain',
+                        headers={'WWW-Authenticate': 'Bearer', 'Cache-Control': 'no-store'})
+    counters, gauges = _pool_and_cache_metrics()
+    info = {'hash_method': os.environ.get('CARE_PWHASH_METHOD') or 'default'}
+    body = metrics.registry.render_prometheus(counters, gauges, info)
+    return Response(body, mimetype='text/plain; version=0.0.4', headers={'Cache-Control': 'no-store'})
+
+@app.route('/health')
+def health():
+    """Unauthenticated liveness check: { ok } with 503 when the database cannot be queried.
+    Details live behind /metrics."""
+    db_ok = True
+    try:
+        get_db().execute('SELECT 1').fetchone()
+    except sqlite3.Error as e:
+        app.logger.warning("Health DB check failed: %s", e)
+        db_ok = False
+    resp = jsonify({ 'ok': db_ok })
+    resp.headers['Cache-Control'] = 'no-store'
+    return resp, (200 if db_ok else 503)
+
 if __name__ == '__main__':
     init_db()
+    resolve_autologin_user()
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,174 @@
+"""Static asset bundles and the manifest written by scripts/build_assets.py.
+
+Templates call asset_tags('calendar.js'), asset_url(...), image_tag(...) and font_tags(). After a
+build they point at content-hashed files in static/dist/ (served from /assets/ with immutable
+cache headers); without one they fall back to the individual source files under /static/ with an
+mtime cache buster, so a plain checkout works without running the build.
+"""
+
+import hashlib
+import json
+import os
+import time
+
+from flask import url_for
+from markupsafe import Markup, escape
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_PATH = os.path.join(DIST_DIR, 'manifest.json')
+# Built files of these types also get a precompressed .gz copy
+GZIP_EXTS = ('.js', '.css', '.svg')
+
+# bundle name -> source files under static/, concatenated in this order
+BUNDLES = {
+    'calendar.js': (
+        'js/shifts.utils.js', 'js/shifts.calendar.js', 'js/shifts.wizard.js',
+        'js/shifts.menu.js', 'js/shifts.edit.js',
+    ),
+    'theme.js': ('js/theme.js',),
+    'base.css': ('css/theme-dark.css',),
+    'calendar.css': ('css/theme-dark.css', 'css/shifts.css'),
+    'home.css': ('css/theme-dark.css', 'css/styles.css'),
+    'auth.css': ('css/styles.css', 'css/auth_styles.css', 'css/theme-dark.css'),
+}
+
+# source image -> (variant widths, sizes attribute for the srcset)
+IMAGES = {
+    'images/home.jpg': ((640, 1280, 1920), '(max-width: 768px) 100vw, 50vw'),
+    # shown 28px high in the nav (about 57px wide)
+    'images/Alex-Logo.png': ((64, 128), '57px'),
+}
+
+# Kanit weights the stylesheets use (300-800, no italics); only these are subset and self-hosted
+FONT_WEIGHTS = (300, 400, 500, 600, 700, 800)
+
+# Used until the fonts have been built: each page keeps the Font Awesome release and Kanit styles it
+# was written against (font_tags(fa=..., kanit=...)), since FA 5 and 6 differ in some class names
+FONT_AWESOME_CDN = 'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/%s/css/all.min.css'
+KANIT_CDN = 'https://fonts.googleapis.com/css2?family=Kanit:%s&display=swap'
+KANIT_ALL_STYLES = (
+    'ital,wght@0,100;0,200;0,300;0,400;0,500;0,600;0,700;0,800;0,900;'
+    '1,100;1,200;1,300;1,400;1,500;1,600;1,700;1,800;1,900'
+)
+
+def load_manifest(path=MANIFEST_PATH):
+    """{'files': {name: hashed path}, 'images': {source: [[width, jpg/png path, webp path], ...]}}
+    or empty sections when nothing has been built."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        data = {}
+    return {'files': data.get('files', {}), 'images': data.get('images', {})}
+
+
+MANIFEST = load_manifest()
+# Only hashed outputs are served from /assets/ (never the manifest or leftovers)
+BUILT_FILES = frozenset(MANIFEST['files'].values()) | frozenset(
+    p for variants in MANIFEST['images'].values() for v in variants for p in v[1:]
+)
+
+
+def built_path(filename, accept_gzip):
+    """(directory-relative file to send, content encoding) for an /assets/ request, or None."""
+    if filename not in BUILT_FILES:
+        return None
+    if accept_gzip and os.path.exists(os.path.join(DIST_DIR, filename + '.gz')):
+        return filename + '.gz', 'gzip'
+    return filename, None
+
+
+def _source_url(path):
+    try:
+        version = int(os.stat(os.path.join(STATIC_DIR, path)).st_mtime)
+    except OSError:
+        version = None
+    return url_for('static', filename=path, v=version)
+
+
+_stamp = {'at': None, 'value': None}
+STAMP_TTL_S = 1.0
+
+
+def source_stamp():
+    """Digest of the mtimes of every file under static/ outside dist/: the ?v= values pages link to whenever a
+    file is not served from the build. Re-read at most once a second (a couple dozen stats), so an edited
+    script changes the page ETags without a restart."""
+    now = time.monotonic()
+    if _stamp['at'] is not None and now - _stamp['at'] < STAMP_TTL_S:
+        return _stamp['value']
+    parts = []
+    for root, dirs, files in os.walk(STATIC_DIR):
+        if root == STATIC_DIR and 'dist' in dirs:
+            dirs.remove('dist')
+        for f in files:
+            path = os.path.join(root, f)
+            try:
+                parts.append((path, os.stat(path).st_mtime_ns))
+            except OSError:
+                pass
+    _stamp['value'] = hashlib.sha1(repr(sorted(parts)).encode()).hexdigest()
+    _stamp['at'] = now
+    return _stamp['value']
+
+
+def asset_url(name):
+    """URL for a bundle, built file or static path: the hashed copy if built, else /static/ ?v=mtime."""
+    built = MANIFEST['files'].get(name)
+    if built:
+        return url_for('built_asset', filename=built)
+    sources = BUNDLES.get(name)
+    return _source_url(sources[0] if sources else name)
+
+
+def asset_tags(name):
+    """<script>/<link> tags for a bundle: one hashed file when built, else one tag per source."""
+    if name in MANIFEST['files']:
+        urls = [asset_url(name)]
+    else:
+        urls = [_source_url(p) for p in BUNDLES[name]]
+    if name.endswith('.js'):
+        tags = ['<script src="%s"></script>' % escape(u) for u in urls]
+    else:
+        tags = ['<link rel="stylesheet" href="%s">' % escape(u) for u in urls]
+    return Markup('\n'.join(tags))
+
+
+def font_tags(fa=None, kanit=KANIT_ALL_STYLES):
+    """Self-hosted subset Kanit + Font Awesome stylesheet if built, else the CDN links: Font Awesome `fa`
+    (a release such as '5.15.3', None for pages without icons) and the Kanit `kanit` axis spec."""
+    if 'fonts.css' in MANIFEST['files']:
+        return Markup('<link rel="stylesheet" href="%s">' % escape(asset_url('fonts.css')))
+    tags = ['<link rel="stylesheet" href="%s">' % escape(FONT_AWESOME_CDN % fa)] if fa else []
+    tags += [
+        '<link rel="preconnect" href="https://fonts.googleapis.com">',
+        '<link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>',
+        '<link href="%s" rel="stylesheet">' % escape(KANIT_CDN % kanit),
+    ]
+    return Markup('\n'.join(tags))
+
+def image_tag(path, alt, **attrs):
+    """<picture> with WebP and original-format srcsets of the resized variants, or a plain <img>."""
+    extra = ''.join(' %s="%s"' % (k.rstrip('_'), escape(v)) for k, v in attrs.items())
+    variants = MANIFEST['images'].get(path)
+    if not variants:
+        return Markup('<img src="%s" alt="%s"%s>' % (escape(_source_url(path)), escape(alt), extra))
+    sizes = IMAGES[path][1]
+
+    def srcset(i):
+        return ', '.join('%s %dw' % (url_for('built_asset', filename=v[i]), v[0]) for v in variants)
+
+    return Markup(
+        '<picture><source type="image/webp" srcset="%s" sizes="%s">'
+        '<img src="%s" srcset="%s" sizes="%s" alt="%s"%s></picture>' % (
+            escape(srcset(2)), escape(sizes), escape(url_for('built_asset', filename=variants[-1][1])),
+            escape(srcset(1)), escape(sizes), escape(alt), extra,
+        )
+    )
+
+
+def init_app(app):
+    app.jinja_env.globals.update(
+        asset_url=asset_url, asset_tags=asset_tags, font_tags=font_tags, image_tag=image_tag,
+    )
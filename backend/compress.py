@@ -0,0 +1,304 @@
+"""WSGI response compression: gzip, plus zstd/brotli when the zstandard/brotli modules are installed.
+
+CompressMiddleware wraps app.wsgi_app. It compresses 200 responses whose type is in
+COMPRESSIBLE_TYPES and whose body is at least min_size bytes, using the encoding the client
+accepts that comes first in `encodings`. Bodies with a Content-Length are compressed in one go,
+and a strong ETag keys a small LRU of compressed bodies: an identical response (same ETag, e.g. a
+page rendered again for a client without the cached copy) is not compressed twice. Streamed
+bodies (CSV/ICS exports) are compressed chunk by chunk. Responses that already carry a
+Content-Encoding (the precompressed /assets/ files) pass through untouched.
+
+Compressed responses get the encoding appended to a strong ETag ("abc" -> "abc-gzip") because
+they are a different representation. The suffix is stripped again from If-None-Match before the
+app sees it, so the app's own validators (and its 304s) keep working on the plain ETag.
+"""
+
+import threading
+import zlib
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+try:
+    import zstandard
+except ImportError:  # optional
+    zstandard = None
+
+COMPRESSIBLE_TYPES = frozenset({
+    'text/html', 'text/css', 'text/plain', 'text/csv', 'text/calendar', 'text/javascript',
+    'application/javascript', 'application/json', 'image/svg+xml',
+})
+
+
+class _Gzip:
+    name = 'gzip'
+
+    def __init__(self, level):
+        self.level = level
+
+    def compress(self, data):
+        c = zlib.compressobj(self.level, zlib.DEFLATED, 31)  # 31: gzip container, fixed header (no mtime)
+        return c.compress(data) + c.flush()
+
+    def stream(self):
+        c = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+        return c.compress, c.flush
+
+
+class _Brotli:
+    name = 'br'
+
+    def __init__(self, quality):
+        self.quality = quality
+
+    def compress(self, data):
+        return brotli.compress(data, quality=self.quality)
+
+    def stream(self):
+        c = brotli.Compressor(quality=self.quality)
+        return c.process, c.finish
+
+
+class _Zstd:
+    name = 'zstd'
+
+    def __init__(self, level):
+        self.compressor = zstandard.ZstdCompressor(level=level)
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    def stream(self):
+        c = self.compressor.compressobj()
+        return c.compress, c.flush
+
+
+def available_encoders(names, gzip_level=6, brotli_quality=4, zstd_level=3):
+    """Encoders for `names` in preference order, leaving out those whose module is missing."""
+    made = []
+    for name in names:
+        if name == 'gzip':
+            made.append(_Gzip(gzip_level))
+        elif name == 'br' and brotli is not None:
+            made.append(_Brotli(brotli_quality))
+        elif name == 'zstd' and zstandard is not None:
+            made.append(_Zstd(zstd_level))
+    return made
+
+
+def _accepted(header):
+    """{coding: q} from an Accept-Encoding header."""
+    accepted = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if coding:
+            accepted[coding.strip().lower()] = q
+    return accepted
+
+
+class _BodyCache:
+    """LRU of compressed bodies, bounded by total bytes."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._items.get(key)
+            if body is not None:
+                self._items.move_to_end(key)
+            return body
+
+    def put(self, key, body):
+        if len(body) > self.max_bytes // 4:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._items[key] = body
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                _, dropped = self._items.popitem(last=False)
+                self._size -= len(dropped)
+
+    def __len__(self):
+        return len(self._items)
+
+
+class _CompressedStream:
+    """Compresses an app_iter as it is consumed; close() reaches the wrapped iterable."""
+
+    def __init__(self, app_iter, encoder, stats):
+        self._app_iter = app_iter
+        self._compress, self._finish = encoder.stream()
+        self._stats = stats
+
+    def __iter__(self):
+        raw = packed = 0
+        for chunk in self._app_iter:
+            raw += len(chunk)
+            out = self._compress(chunk)
+            if out:
+                packed += len(out)
+                yield out
+        tail = self._finish()
+        packed += len(tail)
+        self._stats.add(raw, packed)
+        if tail:
+            yield tail
+
+    def close(self):
+        close = getattr(self._app_iter, 'close', None)
+        if close is not None:
+            close()
+
+
+class _Stats:
+    def __init__(self, encoders):
+        self._lock = threading.Lock()
+        self.counts = dict.fromkeys(
+            ('responses', 'bytes_in', 'bytes_out', 'cache_hits', 'cache_misses', 'skipped_small'), 0
+        )
+        self.counts.update({'encoding_' + e.name: 0 for e in encoders})
+
+    def add(self, raw, packed, **events):
+        with self._lock:
+            self.counts['bytes_in'] += raw
+            self.counts['bytes_out'] += packed
+            for name, n in events.items():
+                self.counts[name] += n
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counts)
+
+
+def _no_write(data):
+    raise RuntimeError('CompressMiddleware does not support the WSGI write() callable')
+
+
+class CompressMiddleware:
+    def __init__(self, app, encodings=('zstd', 'br', 'gzip'), min_size=1024, cache_bytes=2 * 1024 * 1024,
+                 gzip_level=6, brotli_quality=4, zstd_level=3):
+        self.app = app
+        self.encoders = available_encoders(encodings, gzip_level, brotli_quality, zstd_level)
+        self.min_size = min_size
+        self.cache = _BodyCache(cache_bytes)
+        self.stats = _Stats(self.encoders)
+        self._suffixes = tuple('-%s"' % e.name for e in self.encoders)
+
+    def stats_snapshot(self):
+        snap = self.stats.snapshot()
+        snap['encodings'] = [e.name for e in self.encoders]
+        snap['cache_entries'] = len(self.cache)
+        return snap
+
+    def _choose(self, environ):
+        accepted = _accepted(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        for encoder in self.encoders:
+            if accepted.get(encoder.name, accepted.get('*', 0)) > 0:
+                return encoder
+        return None
+
+    def _strip_if_none_match(self, environ):
+        """Drop our encoding suffixes from If-None-Match; returns {plain tag: tag the client sent}."""
+        header = environ.get('HTTP_IF_NONE_MATCH')
+        if not header or not self._suffixes:
+            return {}
+        sent, tags = {}, []
+        for tag in header.split(','):
+            tag = tag.strip()
+            if not tag.startswith('W/'):
+                for suffix in self._suffixes:
+                    if tag.endswith(suffix):
+                        plain = tag[:-len(suffix)] + '"'
+                        sent[plain] = tag
+                        tag = plain
+                        break
+            tags.append(tag)
+        if sent:
+            environ['HTTP_IF_NONE_MATCH'] = ', '.join(tags)
+        return sent
+
+    def __call__(self, environ, start_response):
+        if environ.get('REQUEST_METHOD') == 'HEAD' or not self.encoders:
+            return self.app(environ, start_response)
+        encoder = self._choose(environ)
+        sent_tags = self._strip_if_none_match(environ)
+        captured = []
+
+        def capture(status, headers, exc_info=None):
+            captured[:] = [status, headers, exc_info]
+            return _no_write
+
+        app_iter = self.app(environ, capture)
+        status, headers, exc_info = captured
+        code = status[:3]
+        if code == '304':
+            # Hand the client back the tag it sent (with its encoding suffix)
+            headers = [(k, sent_tags.get(v, v) if k.lower() == 'etag' else v) for k, v in headers]
+        if code != '200':
+            start_response(status, headers, exc_info)
+            return app_iter
+
+        found = {k.lower(): v for k, v in headers}
+        mimetype = found.get('content-type', '').split(';')[0].strip().lower()
+        if ('content-encoding' in found or mimetype not in COMPRESSIBLE_TYPES
+                or 'no-transform' in found.get('cache-control', '')):
+            start_response(status, headers, exc_info)
+            return app_iter
+        # Cacheable responses may differ by encoding from here on, whether or not this one is compressed
+        vary = [v.strip() for v in found.get('vary', '').split(',') if v.strip()]
+        if 'accept-encoding' not in (v.lower() for v in vary):
+            vary.append('Accept-Encoding')
+        headers = [(k, v) for k, v in headers if k.lower() != 'vary'] + [('Vary', ', '.join(vary))]
+        length = found.get('content-length')
+        if encoder is None or (length is not None and int(length) < self.min_size):
+            if encoder is not None:
+                self.stats.add(0, 0, skipped_small=1)
+            start_response(status, headers, exc_info)
+            return app_iter
+
+        etag = found.get('etag')
+        strong = etag if etag and not etag.startswith('W/') else None
+        headers = [
+            (k, v) for k, v in headers if k.lower() not in ('content-length', 'accept-ranges', 'etag')
+        ] + [('Content-Encoding', encoder.name)]
+        if etag:
+            headers.append(('ETag', strong[:-1] + '-%s"' % encoder.name if strong else etag))
+        if length is None:
+            self.stats.add(0, 0, responses=1, **{'encoding_' + encoder.name: 1})
+            start_response(status, headers, exc_info)
+            return _CompressedStream(app_iter, encoder, self.stats)
+
+        try:
+            body = b''.join(app_iter)
+        finally:
+            close = getattr(app_iter, 'close', None)
+            if close is not None:
+                close()
+        key = (strong, encoder.name, len(body))
+        packed = self.cache.get(key) if strong else None
+        if packed is None:
+            packed = encoder.compress(body)
+            if strong:
+                self.cache.put(key, packed)
+            hit = {'cache_misses': 1} if strong else {}
+        else:
+            hit = {'cache_hits': 1}
+        self.stats.add(len(body), len(packed), responses=1, **{'encoding_' + encoder.name: 1}, **hit)
+        start_response(status, headers + [('Content-Length', str(len(packed)))], exc_info)
+        return [packed]
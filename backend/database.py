@@ -1,5 +1,14 @@
+import logging
 import os
 import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta, time as dtime
+
+import metrics
+from scheduling import coverage_gaps, expand_time_off_days
+
+log = logging.getLogger('care.database')
 
 # Determine database path with env override (backward compatible)
 # CARE_DB_PATH can point to an absolute file or a relative path (relative to project root or this file's dir).
@@ -14,31 +23,827 @@ if _env_db:
 else:
     DATABASE = _default_db
 
-def connect_db():
-    """Connect to the SQLite database."""
-    conn = sqlite3.connect(DATABASE)
+# Connection tuning (env overridable). WAL lets the kiosk and phones read while a write
+# commits; synchronous=NORMAL is durable across app crashes in WAL mode and avoids an
+# fsync per commit on the Pi's SD card.
+DB_BUSY_TIMEOUT_MS = int(os.environ.get('CARE_DB_BUSY_TIMEOUT_MS', '5000'))
+DB_CACHE_SIZE_KIB = int(os.environ.get('CARE_DB_CACHE_KIB', '8192'))
+DB_MMAP_SIZE = int(os.environ.get('CARE_DB_MMAP_BYTES', str(64 * 1024 * 1024)))
+# Per-request statement counts/time for /metrics (see metrics.py); off together with request timing
+DB_METRICS = os.environ.get('CARE_METRICS', '1') == '1' and os.environ.get('CARE_DISABLE_TIMING') != '1'
+# Series occurrences are written to `shifts` at most this many days past today, however far a read asks
+SERIES_HORIZON_DAYS = int(os.environ.get('CARE_SERIES_HORIZON_DAYS', '400'))
+# Opt-in statement tracer (sqltrace.py); only imported when enabled
+SQL_TRACE = os.environ.get('CARE_SQL_TRACE') == '1'
+if SQL_TRACE:
+    import sqltrace
+
+
+class _MeteredCursor(sqlite3.Cursor):
+    """Cursor that reports execute/fetch time to metrics.note_query(). Plain iteration
+    (`for row in cur`) is not timed, to keep streaming exports free of per-row overhead."""
+
+    def execute(self, sql, parameters=()):
+        t0 = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            metrics.note_query(time.perf_counter() - t0)
+
+    def executemany(self, sql, seq_of_parameters):
+        t0 = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            metrics.note_query(time.perf_counter() - t0)
+
+    def fetchone(self):
+        t0 = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            metrics.note_query(time.perf_counter() - t0, 0)
+
+    def fetchmany(self, size=None):
+        t0 = time.perf_counter()
+        try:
+            return super().fetchmany(self.arraysize if size is None else size)
+        finally:
+            metrics.note_query(time.perf_counter() - t0, 0)
+
+    def fetchall(self):
+        t0 = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            metrics.note_query(time.perf_counter() - t0, 0)
+
+
+class _MeteredConnection(sqlite3.Connection):
+    # sqlite3.Connection.execute() does not go through cursor(), so route both here
+    def cursor(self, factory=_MeteredCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+class _TracedCursor(_MeteredCursor):
+    """Cursor that reports each statement to sqltrace (CARE_SQL_TRACE=1). A statement is
+    finished when its rows are exhausted, the cursor runs another statement, or is dropped."""
+
+    _trace = None  # [normalized sql, param count, rows, seconds, plan]
+
+    def _begin(self, sql, params, run):
+        self._finish()
+        tracer = sqltrace.get_tracer(SQL_TRACE_DIR)
+        norm = sqltrace.normalize(sql)
+        plan = None
+        if sqltrace.explainable(sql) and tracer.needs_plan(norm):
+            try:
+                plan = [r[3] for r in self.connection.cursor(sqlite3.Cursor).execute('EXPLAIN QUERY PLAN ' + sql, params)]
+            except sqlite3.Error:
+                plan = []
+        t0 = time.perf_counter()
+        try:
+            return run()
+        finally:
+            dt = time.perf_counter() - t0
+            rows = self.rowcount if self.description is None and self.rowcount > 0 else 0
+            self._trace = [norm, len(params), rows, dt, plan]
+
+    def _add(self, seconds, rows, done=False):
+        if self._trace is not None:
+            self._trace[2] += rows
+            self._trace[3] += seconds
+            if done:
+                self._finish()
+
+    def _finish(self):
+        trace, self._trace = self._trace, None
+        if trace is not None:
+            sqltrace.get_tracer(SQL_TRACE_DIR).record(*trace)
+
+    def execute(self, sql, parameters=()):
+        return self._begin(sql, parameters, lambda: super(_TracedCursor, self).execute(sql, parameters))
+
+    def executemany(self, sql, seq_of_parameters):
+        seq = list(seq_of_parameters)
+        first = seq[0] if seq else ()
+        return self._begin(sql, first, lambda: super(_TracedCursor, self).executemany(sql, seq))
+
+    def fetchone(self):
+        t0 = time.perf_counter()
+        row = super().fetchone()
+        self._add(time.perf_counter() - t0, row is not None, done=row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        t0 = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._add(time.perf_counter() - t0, len(rows), done=not rows)
+        return rows
+
+    def fetchall(self):
+        t0 = time.perf_counter()
+        rows = super().fetchall()
+        self._add(time.perf_counter() - t0, len(rows), done=True)
+        return rows
+
+    def __next__(self):
+        t0 = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._add(time.perf_counter() - t0, 0, done=True)
+            raise
+        self._add(time.perf_counter() - t0, 1)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+
+class _TracedConnection(_MeteredConnection):
+    def cursor(self, factory=_TracedCursor):
+        return super().cursor(factory)
+
+
+# Slow-query log and stats location when CARE_SQL_TRACE=1 (CARE_SQL_TRACE_DIR overrides)
+SQL_TRACE_DIR = os.path.join(os.path.dirname(DATABASE), 'sqltrace')
+
+def _connection_factory():
+    if SQL_TRACE:
+        return _TracedConnection
+    return _MeteredConnection if DB_METRICS else sqlite3.Connection
+
+
+def _open_connection(check_same_thread=True):
+    conn = sqlite3.connect(
+        DATABASE, timeout=DB_BUSY_TIMEOUT_MS / 1000.0, check_same_thread=check_same_thread,
+        factory=_connection_factory(),
+    )
     conn.row_factory = sqlite3.Row  # To return rows as dictionaries
     # Ensure foreign keys if we ever add them
     conn.execute('PRAGMA foreign_keys = ON')
+    conn.execute(f'PRAGMA busy_timeout = {DB_BUSY_TIMEOUT_MS}')
+    try:
+        # Persistent in the DB file; a no-op once the database is already in WAL mode
+        conn.execute('PRAGMA journal_mode = WAL')
+    except sqlite3.OperationalError:
+        # e.g. database locked by an old rollback-journal writer; keep the current mode
+        pass
+    conn.execute('PRAGMA synchronous = NORMAL')
+    conn.execute(f'PRAGMA cache_size = -{DB_CACHE_SIZE_KIB}')
+    conn.execute(f'PRAGMA mmap_size = {DB_MMAP_SIZE}')
     return conn
 
+def connect_db():
+    """Open a new, caller-owned connection (scripts, migrations). Callers must close() it.
+    Request-path code should use get_db() instead."""
+    return _open_connection()
+
+
+class _ConnectionPool:
+    """One persistent connection per thread.
+
+    Connections are reused across helper calls (and across requests when the server
+    reuses threads). release() runs at the end of each Flask request: it rolls back
+    anything a failed helper left open and closes connections whose thread has exited
+    (Werkzeug's threaded dev server starts a thread per request).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._conns = {}  # thread ident -> (thread, connection)
+        self._stats = {'opened': 0, 'reused': 0, 'released': 0, 'rolled_back': 0, 'closed': 0}
+
+    def acquire(self):
+        thread = threading.current_thread()
+        entry = self._conns.get(thread.ident)
+        if entry is not None and entry[0] is thread:
+            with self._lock:
+                self._stats['reused'] += 1
+            return entry[1]
+        # check_same_thread=False only so the reaper may close it after its thread exits
+        conn = _open_connection(check_same_thread=False)
+        with self._lock:
+            stale = self._conns.pop(thread.ident, None)
+            self._conns[thread.ident] = (thread, conn)
+            self._stats['opened'] += 1
+        if stale is not None:
+            self._close(stale[1])
+        return conn
+
+    def release(self):
+        entry = self._conns.get(threading.get_ident())
+        with self._lock:
+            self._stats['released'] += 1
+        if entry is not None and entry[1].in_transaction:
+            entry[1].rollback()
+            with self._lock:
+                self._stats['rolled_back'] += 1
+        self._reap()
+
+    def _reap(self):
+        with self._lock:
+            dead = [ident for ident, (t, _) in self._conns.items() if not t.is_alive()]
+            conns = [self._conns.pop(ident)[1] for ident in dead]
+        for conn in conns:
+            self._close(conn)
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._stats['closed'] += 1
+
+    def close_all(self):
+        with self._lock:
+            conns = [c for _, c in self._conns.values()]
+            self._conns.clear()
+        for conn in conns:
+            self._close(conn)
+
+    def stats(self):
+        with self._lock:
+            out = dict(self._stats)
+            out['open'] = len(self._conns)
+        return out
+
+
+_pool = _ConnectionPool()
+
+def get_db():
+    """Return this thread's pooled connection. Do not close it; commit() as usual."""
+    return _pool.acquire()
+
+def release_db(exc=None):
+    """Request teardown hook (see app.py): roll back leftovers and reap dead threads' connections."""
+    _pool.release()
+
+def close_all_db():
+    """Close every pooled connection (shutdown, tests, worker fork)."""
+    _pool.close_all()
+
+def db_pool_stats():
+    """Counters for the connection pool: opened/reused/released/rolled_back/closed/open."""
+    return _pool.stats()
+
+# ---------------- Read cache for small lookup tables (employees, users) ---------------- #
+#
+# Entries are tagged with the change_counters value of the table they were read from
+# (bumped by triggers, see _ensure_change_tracking). Our own helpers invalidate on write;
+# commits from other connections (other threads, cron sync, seed scripts) are noticed via
+# PRAGMA data_version, which only then costs one read of change_counters.
+
+CACHED_TABLES = ('employees', 'users')
+
+class _LookupCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}            # key -> (table, version, value)
+        self._versions = {}           # table -> last change_counters value seen
+        self._versions_stale = True   # re-read counters before the next lookup
+        self._local = threading.local()
+        self._stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+        self._listeners = {}          # table -> [callback()]
+
+    def _refresh_versions(self, conn):
+        dv = conn.execute('PRAGMA data_version').fetchone()[0]
+        seen = getattr(self._local, 'seen', None)
+        if not self._versions_stale and seen == (id(conn), dv):
+            return
+        self._local.seen = (id(conn), dv)
+        try:
+            rows = conn.execute(
+                f"SELECT name, value FROM change_counters WHERE name IN ({','.join('?' * len(CACHED_TABLES))})",
+                CACHED_TABLES,
+            ).fetchall()
+        except sqlite3.OperationalError:
+            rows = []  # schema not initialised yet; entries will never match and just reload
+        with self._lock:
+            before = self._versions
+            self._versions = {name: value for name, value in rows}
+            self._versions_stale = False
+            changed = [t for t in self._versions if t in before and before[t] != self._versions[t]]
+        for table in changed:
+            self._notify(table)
+
+    def get(self, key, table, loader):
+        conn = get_db()
+        self._refresh_versions(conn)
+        with self._lock:
+            version = self._versions.get(table)
+            entry = self._entries.get(key)
+            if entry is not None and version is not None and entry[1] == version:
+                self._stats['hits'] += 1
+                return entry[2]
+            self._stats['misses'] += 1
+        value = loader()
+        with self._lock:
+            self._entries[key] = (table, version, value)
+        return value
+
+    def invalidate(self, table):
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if e[0] == table]:
+                del self._entries[key]
+            self._versions_stale = True
+            self._stats['invalidations'] += 1
+        self._notify(table)
+
+    def subscribe(self, table, callback):
+        with self._lock:
+            self._listeners.setdefault(table, []).append(callback)
+
+    def _notify(self, table):
+        for callback in list(self._listeners.get(table, ())):
+            try:
+                callback()
+            except Exception:
+                pass  # a listener must never break the write/read that noticed the change
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions_stale = True
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries))
+
+_cache = _LookupCache()
+
+def cache_stats():
+    """Counters for the lookup cache: hits/misses/invalidations/entries."""
+    return _cache.stats()
+
+def on_table_change(table, callback):
+    """Call callback() after a cached table (see CACHED_TABLES) changes: immediately for writes made
+    through this module, or on the next cached lookup after another connection commits."""
+    _cache.subscribe(table, callback)
+
+def clear_cache():
+    """Drop every cached lookup (e.g. after restoring a backup underneath a running app)."""
+    _cache.clear()
+
 def _column_exists(conn, table, column):
     cur = conn.execute(f"PRAGMA table_info({table})")
     return any(row[1] == column for row in cur.fetchall())
 
-def init_db():
-    """Initialize the database with necessary tables and columns."""
-    conn = connect_db()
-    cursor = conn.cursor()
-    
-    cursor.execute('''
+# Shift times are stored as text in mixed formats ('YYYY-MM-DDTHH:MM[:SS]' from the app,
+# 'YYYY-MM-DD HH:MM' from scripts/seed_database.py). SQLite's date/time functions accept
+# both, so the normalized columns are derived in SQL and kept current by triggers; that
+# way raw INSERTs from scripts are covered too.
+#   shift_day  canonical 'YYYY-MM-DD' of the start (what range queries filter on)
+#   start_min  start as epoch minutes
+#   end_min    effective end as epoch minutes; missing, invalid or non-positive end
+#              times fall back to start + 60 (same rule as the hours report)
+_SHIFT_DAY_SQL = "date({src}.shift_time)"
+_START_MIN_SQL = "CAST(strftime('%s', {src}.shift_time) AS INTEGER) / 60"
+_END_MIN_SQL = (
+    "CASE WHEN CAST(strftime('%s', {src}.end_time) AS INTEGER) / 60"
+    " > CAST(strftime('%s', {src}.shift_time) AS INTEGER) / 60"
+    " THEN CAST(strftime('%s', {src}.end_time) AS INTEGER) / 60"
+    " ELSE CAST(strftime('%s', {src}.shift_time) AS INTEGER) / 60 + 60 END"
+)
+
+def _shift_norm_assignments(src):
+    return (
+        f"shift_day = {_SHIFT_DAY_SQL.format(src=src)}, "
+        f"start_min = {_START_MIN_SQL.format(src=src)}, "
+        f"end_min = {_END_MIN_SQL.format(src=src)}"
+    )
+
+def _ensure_shift_time_index(conn):
+    """Add/backfill normalized shift time columns, their triggers and range indexes (idempotent)."""
+    for col, decl in (('shift_day', 'TEXT'), ('start_min', 'INTEGER'), ('end_min', 'INTEGER')):
+        if not _column_exists(conn, 'shifts', col):
+            conn.execute(f'ALTER TABLE shifts ADD COLUMN {col} {decl}')
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_shifts_norm_insert AFTER INSERT ON shifts
+        BEGIN
+            UPDATE shifts SET {_shift_norm_assignments('NEW')} WHERE id = NEW.id;
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_shifts_norm_update AFTER UPDATE OF shift_time, end_time ON shifts
+        BEGIN
+            UPDATE shifts SET {_shift_norm_assignments('NEW')} WHERE id = NEW.id;
+        END
+    """)
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_shifts_day ON shifts (shift_day)')
+    # Covering index so payroll/coverage aggregation never touches the table rows
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_shifts_day_minutes ON shifts (shift_day, employee_id, start_min, end_min)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_shifts_employee_day ON shifts (employee_id, shift_day)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_shifts_series_day ON shifts (series_id, shift_day)')
+    # Idempotency key for (bulk) inserts: one shift per employee per start time.
+    # Legacy DBs may hold duplicates from before the insert guard; keep the oldest row.
+    has_unique = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'ux_shifts_employee_time'"
+    ).fetchone()
+    if not has_unique:
+        removed = conn.execute(
+            "DELETE FROM shifts WHERE id NOT IN (SELECT MIN(id) FROM shifts GROUP BY employee_id, shift_time)"
+        ).rowcount
+        if removed > 0:
+            log.warning(
+                "Removed %d duplicate shift row(s) (same caregiver and start time) before adding ux_shifts_employee_time",
+                removed,
+            )
+        conn.execute('CREATE UNIQUE INDEX ux_shifts_employee_time ON shifts (employee_id, shift_time)')
+    # Backfill rows written before the columns existed (uses idx_shifts_day for the NULL probe)
+    conn.execute(f"UPDATE shifts SET {_shift_norm_assignments('shifts')} WHERE shift_day IS NULL")
+
+def _ensure_series_tables(conn):
+    """Create series/series_exceptions and backfill rules for legacy series_id groups (idempotent)."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS series (
+            id TEXT PRIMARY KEY,            -- same value as shifts.series_id
+            employee_id INTEGER NOT NULL,
+            weekdays TEXT NOT NULL,         -- comma list of weekday indices, 0=Mon
+            start_time TEXT NOT NULL,       -- HH:MM
+            end_time TEXT,                  -- HH:MM or NULL
+            valid_from TEXT NOT NULL,       -- YYYY-MM-DD inclusive
+            valid_until TEXT,               -- YYYY-MM-DD inclusive, NULL = open-ended
+            materialized_through TEXT,      -- occurrences up to this day exist as shifts rows
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (employee_id) REFERENCES employees (id) ON DELETE CASCADE
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS series_exceptions (
+            series_id TEXT NOT NULL,
+            day TEXT NOT NULL,              -- YYYY-MM-DD the rule would have generated
+            kind TEXT NOT NULL,             -- 'skip' (occurrence deleted) | 'override' (row edited/swapped)
+            shift_id INTEGER,               -- the overriding shifts row, kept across rule edits
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (series_id, day)
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_series_exceptions_shift ON series_exceptions (shift_id)')
+    _backfill_series_rules(conn)
+
+def _backfill_series_rules(conn, series_id=None) -> int:
+    """Derive a `series` rule for series_id groups in `shifts` that have none (all of them, or just series_id).
+
+    Such series were written as plain rows (before rules existed, or by a raw INSERT), so they are fully
+    materialized: the rule spans first..last occurrence with the watermark at the last one. Runs inside the
+    caller's transaction. Returns the number of rules created."""
+    sql = '''
+        SELECT series_id, MIN(shift_day) AS first_day, MAX(shift_day) AS last_day
+        FROM shifts
+        WHERE series_id IS NOT NULL AND shift_day IS NOT NULL
+          AND series_id NOT IN (SELECT id FROM series)
+    '''
+    args = ()
+    if series_id is not None:
+        sql += ' AND series_id = ?'
+        args = (str(series_id),)
+    legacy = conn.execute(sql + ' GROUP BY series_id', args).fetchall()
+    for row in legacy:
+        sid = row['series_id']
+        latest = conn.execute(
+            "SELECT employee_id, shift_time, end_time FROM shifts WHERE series_id = ? AND shift_day IS NOT NULL "
+            "ORDER BY shift_day DESC, start_min DESC LIMIT 1",
+            (sid,),
+        ).fetchone()
+        days = conn.execute(
+            "SELECT DISTINCT (CAST(strftime('%w', shift_day) AS INTEGER) + 6) % 7 AS dow FROM shifts "
+            "WHERE series_id = ? ORDER BY dow",
+            (sid,),
+        ).fetchall()
+        end_hhmm = conn.execute("SELECT strftime('%H:%M', ?)", (latest['end_time'],)).fetchone()[0] if latest['end_time'] else None
+        conn.execute(
+            "INSERT INTO series (id, employee_id, weekdays, start_time, end_time, valid_from, valid_until, materialized_through) "
+            "VALUES (?, ?, ?, strftime('%H:%M', ?), ?, ?, ?, ?)",
+            (
+                sid, latest['employee_id'], ','.join(str(d[0]) for d in days),
+                latest['shift_time'], end_hhmm, row['first_day'], row['last_day'], row['last_day'],
+            ),
+        )
+    return len(legacy)
+
+def _ensure_change_tracking(conn):
+    """shifts.change_seq (bumped by triggers from change_counters) and the Google Calendar sync state tables."""
+    if not _column_exists(conn, 'shifts', 'change_seq'):
+        conn.execute('ALTER TABLE shifts ADD COLUMN change_seq INTEGER')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS change_counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    conn.execute("INSERT OR IGNORE INTO change_counters (name, value) VALUES ('shifts', 0)")
+    bump = "UPDATE change_counters SET value = value + 1 WHERE name = 'shifts';"
+    current = "(SELECT value FROM change_counters WHERE name = 'shifts')"
+    # Column lists keep the normalization triggers (which only touch shift_day/start_min/end_min) from re-firing these
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_shifts_seq_insert AFTER INSERT ON shifts
+        BEGIN
+            {bump}
+            UPDATE shifts SET change_seq = {current} WHERE id = NEW.id;
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_shifts_seq_update
+        AFTER UPDATE OF employee_id, shift_time, end_time, series_id ON shifts
+        BEGIN
+            {bump}
+            UPDATE shifts SET change_seq = {current} WHERE id = NEW.id;
+        END
+    """)
+    # Event titles carry the caregiver name, so a rename touches all of their shifts
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_employees_seq_rename AFTER UPDATE OF name ON employees
+        BEGIN
+            {bump}
+            UPDATE shifts SET change_seq = {current} WHERE employee_id = NEW.id;
+        END
+    """)
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_shifts_change_seq ON shifts (change_seq)')
+    # Table-level versions for the lookup cache (_LookupCache)
+    for table in CACHED_TABLES:
+        conn.execute("INSERT OR IGNORE INTO change_counters (name, value) VALUES (?, 0)", (table,))
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_version_{event.lower()} AFTER {event} ON {table}
+                BEGIN
+                    UPDATE change_counters SET value = value + 1 WHERE name = '{table}';
+                END
+            """)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS gcal_sync_state (
+            calendar_id TEXT NOT NULL,
+            shift_id INTEGER NOT NULL,      -- no FK: the row must outlive the shift so its event gets deleted
+            event_id TEXT NOT NULL,
+            content_hash TEXT NOT NULL,     -- hash of the last event body pushed
+            remote_etag TEXT,
+            synced_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (calendar_id, shift_id)
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS gcal_sync_cursor (
+            calendar_id TEXT PRIMARY KEY,
+            last_seq INTEGER NOT NULL DEFAULT 0,   -- change_counters value covered by the last clean run
+            synced_at TEXT
+        )
+    ''')
+
+# Tables whose rows the calendar mirrors client-side; every write to them is logged in `changes`
+CHANGE_FEED_TABLES = {
+    # table: columns whose UPDATE is a visible change (normalization/bookkeeping columns excluded)
+    'shifts': ('employee_id', 'shift_time', 'end_time', 'series_id'),
+    'time_off': ('employee_id', 'start_date', 'end_date', 'reason'),
+    'employees': ('name', 'position', 'hourly_rate'),
+}
+
+def _ensure_changes_feed(conn):
+    """`changes`: the latest change per row of CHANGE_FEED_TABLES, under a monotonically increasing seq.
+
+    Re-touching a row moves it to a new seq (delete + insert, so the log stays one row per entity);
+    deletes leave a tombstone. AUTOINCREMENT keeps seq from ever being reused. The triggers avoid
+    INSERT OR REPLACE because an outer INSERT OR IGNORE (series materialization) would override it.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            tbl TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            op TEXT NOT NULL,            -- 'upsert' | 'delete'
+            UNIQUE (tbl, row_id)
+        )
+    ''')
+    for table, columns in CHANGE_FEED_TABLES.items():
+        for event, ref, op in (('INSERT', 'NEW', 'upsert'), (f"UPDATE OF {', '.join(columns)}", 'NEW', 'upsert'),
+                               ('DELETE', 'OLD', 'delete')):
+            name = f"trg_{table}_changes_{event.split()[0].lower()}"
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON {table}
+                BEGIN
+                    DELETE FROM changes WHERE tbl = '{table}' AND row_id = {ref}.id;
+                    INSERT INTO changes (tbl, row_id, op) VALUES ('{table}', {ref}.id, '{op}');
+                END
+            """)
+
+def _ensure_daily_rollups(conn):
+    """Per-day rollups the reports read instead of raw shifts (idempotent).
+
+    daily_employee_minutes: worked minutes per (shift_day, employee), kept exact by triggers that
+    subtract a row's OLD minutes and add its NEW ones. Inserts arrive through the normalization
+    UPDATE (trg_shifts_norm_insert), so the insert trigger only counts rows written pre-normalized.
+    daily_coverage: covered/uncovered minutes of the coverage window per day. A union of intervals is
+    not additive, so triggers delete the days a shift or time off row touches and readers refill them
+    (get_daily_coverage). Each row records the window it was computed for.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS daily_employee_minutes (
+            day TEXT NOT NULL,
+            employee_id INTEGER NOT NULL,
+            minutes INTEGER NOT NULL,
+            PRIMARY KEY (day, employee_id)
+        ) WITHOUT ROWID
+    ''')
+    # Covering per-employee index: one caregiver's range, or GROUP BY employee_id without a sort once ANALYZEd
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_daily_employee_minutes_employee ON daily_employee_minutes (employee_id, day, minutes)')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS daily_coverage (
+            day TEXT PRIMARY KEY,
+            window_start INTEGER NOT NULL,
+            window_end INTEGER NOT NULL,
+            covered_minutes INTEGER NOT NULL,
+            gap_minutes INTEGER NOT NULL,
+            gaps TEXT NOT NULL           -- 'start-end,...' minutes after midnight
+        ) WITHOUT ROWID
+    ''')
+
+    def add(ref, sign):
+        # Create the (day, employee) row on first use, then adjust it
+        return f"""
+            INSERT INTO daily_employee_minutes (day, employee_id, minutes)
+            SELECT {ref}.shift_day, {ref}.employee_id, 0
+            WHERE {ref}.start_min IS NOT NULL AND NOT EXISTS (
+                SELECT 1 FROM daily_employee_minutes WHERE day = {ref}.shift_day AND employee_id = {ref}.employee_id);
+            UPDATE daily_employee_minutes SET minutes = minutes {sign} ({ref}.end_min - {ref}.start_min)
+            WHERE {ref}.start_min IS NOT NULL AND day = {ref}.shift_day AND employee_id = {ref}.employee_id;
+        """
+
+    def forget_coverage(ref):
+        return f"""
+            DELETE FROM daily_coverage
+            WHERE day BETWEEN {ref}.shift_day AND date({ref}.end_min * 60, 'unixepoch');
+        """
+
+    drop_empty = "DELETE FROM daily_employee_minutes WHERE day = OLD.shift_day AND employee_id = OLD.employee_id AND minutes = 0;"
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_shifts_rollup_insert AFTER INSERT ON shifts
+        BEGIN
+            {add('NEW', '+')}
+            {forget_coverage('NEW')}
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_shifts_rollup_update
+        AFTER UPDATE OF employee_id, shift_day, start_min, end_min ON shifts
+        BEGIN
+            {add('OLD', '-')}
+            {drop_empty}
+            {add('NEW', '+')}
+            {forget_coverage('OLD')}
+            {forget_coverage('NEW')}
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_shifts_rollup_delete AFTER DELETE ON shifts
+        BEGIN
+            {add('OLD', '-')}
+            {drop_empty}
+            {forget_coverage('OLD')}
+        END
+    """)
+    # Time off removes that caregiver's shifts from coverage; a shift on the last day can reach past midnight
+    for event, refs in (('INSERT', ('NEW',)), ('UPDATE', ('OLD', 'NEW')), ('DELETE', ('OLD',))):
+        body = ''.join(
+            f"DELETE FROM daily_coverage WHERE day BETWEEN {ref}.start_date AND date({ref}.end_date, '+1 day');"
+            for ref in refs
+        )
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_time_off_rollup_{event.lower()} AFTER {event} ON time_off
+            BEGIN
+                {body}
+            END
+        """)
+    _rebuild_employee_minutes(conn)
+
+def _rebuild_employee_minutes(conn):
+    conn.execute('DELETE FROM daily_employee_minutes')
+    conn.execute('''
+        INSERT INTO daily_employee_minutes (day, employee_id, minutes)
+        SELECT shift_day, employee_id, SUM(end_min - start_min)
+        FROM shifts
+        WHERE start_min IS NOT NULL
+        GROUP BY shift_day, employee_id
+    ''')
+
+# Dashboard counters: (name, bucket) -> value. Totals use bucket ''; shift counts/minutes are bucketed by the
+# Monday of their shift_day, attendance by 'YYYY-MM' of its date. Each entry: name, table, bucket SQL, value SQL,
+# row condition, columns whose UPDATE can move the row ({ref} is NEW/OLD). Recounts group the same expressions.
+_WEEK_SQL = "date({ref}.shift_day, '-6 days', 'weekday 1')"
+STAT_COUNTERS = (
+    ("'employees'", 'employees', "''", '1', '1', ()),
+    ("'tasks'", 'tasks', "''", '1', '1', ()),
+    ("'shifts'", 'shifts', "''", '1', '1', ()),
+    ("'shifts:week'", 'shifts', _WEEK_SQL, '1', '{ref}.shift_day IS NOT NULL', ('shift_day',)),
+    ("'shift_minutes:week'", 'shifts', _WEEK_SQL, '{ref}.end_min - {ref}.start_min',
+     '{ref}.start_min IS NOT NULL', ('shift_day', 'start_min', 'end_min')),
+    ("'attendance:' || {ref}.status", 'attendance', "''", '1', '1', ('status',)),
+    ("'attendance:' || {ref}.status || ':month'", 'attendance', 'substr({ref}.date, 1, 7)', '1', '1',
+     ('status', 'date')),
+)
+
+def _stat_counter_bump(name, bucket, value, cond, ref, sign):
+    name, bucket, value, cond = (s.format(ref=ref) for s in (name, bucket, value, cond))
+    # An UPSERT's DO UPDATE still applies under an outer INSERT OR IGNORE/REPLACE (series materialization)
+    return f"""
+        INSERT INTO stat_counters (name, bucket, value)
+        SELECT {name}, {bucket}, {sign}({value}) WHERE {cond}
+        ON CONFLICT (name, bucket) DO UPDATE SET value = value + excluded.value;
+    """
+
+def _ensure_stat_counters(conn):
+    """`stat_counters` for /performance: row counts and trend buckets kept current by triggers (idempotent).
+    Like daily_employee_minutes, shift buckets follow the normalized columns, which arrive by UPDATE."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS stat_counters (
+            name TEXT NOT NULL,
+            bucket TEXT NOT NULL DEFAULT '',
+            value INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (name, bucket)
+        ) WITHOUT ROWID
+    ''')
+    for table in sorted({c[1] for c in STAT_COUNTERS}):
+        counters = [c for c in STAT_COUNTERS if c[1] == table]
+        insert = ''.join(_stat_counter_bump(n, b, v, cond, 'NEW', '+') for n, _t, b, v, cond, _cols in counters)
+        delete = ''.join(_stat_counter_bump(n, b, v, cond, 'OLD', '-') for n, _t, b, v, cond, _cols in counters)
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS trg_{table}_stats_insert AFTER INSERT ON {table} BEGIN {insert} END")
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS trg_{table}_stats_delete AFTER DELETE ON {table} BEGIN {delete} END")
+        moving = [c for c in counters if c[5]]
+        if moving:
+            columns = sorted({col for c in moving for col in c[5]})
+            update = ''.join(
+                _stat_counter_bump(n, b, v, cond, 'OLD', '-') + _stat_counter_bump(n, b, v, cond, 'NEW', '+')
+                for n, _t, b, v, cond, _cols in moving
+            )
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_stats_update AFTER UPDATE OF {', '.join(columns)} ON {table}
+                BEGIN {update} END
+            """)
+    _recount_stat_counters(conn)
+
+def _stat_counter_recount_sql():
+    """One SELECT of every (name, bucket, value) the triggers should have produced, straight from the tables."""
+    parts = []
+    for name, table, bucket, value, cond, _cols in STAT_COUNTERS:
+        name, bucket, value, cond = (s.format(ref=table) for s in (name, bucket, value, cond))
+        parts.append(f"SELECT {name} AS name, {bucket} AS bucket, SUM({value}) AS value FROM {table} WHERE {cond} GROUP BY 1, 2")
+    return ' UNION ALL '.join(parts)
+
+def _recount_stat_counters(conn):
+    conn.execute('DELETE FROM stat_counters')
+    conn.execute(f'INSERT INTO stat_counters (name, bucket, value) {_stat_counter_recount_sql()}')
+    # Totals are read unconditionally; make sure empty tables still have a row
+    conn.execute("INSERT OR IGNORE INTO stat_counters (name, bucket, value) VALUES ('employees', '', 0), ('tasks', '', 0), ('shifts', '', 0)")
+
+# Per-table write versions for conditional GETs (app.VALIDATED_ENDPOINTS): change_counters rows bumped by
+# triggers on every INSERT/UPDATE/DELETE. employees/users reuse the lookup cache's counters; 'shifts' is the
+# calendar sync sequence (not bumped on delete), so shift rows count under 'shifts:rows'.
+TABLE_VERSION_COUNTERS = {
+    'employees': 'employees',
+    'users': 'users',
+    'shifts': 'shifts:rows',
+    'series': 'series',
+    'series_exceptions': 'series_exceptions',
+    'time_off': 'time_off',
+    'pay_adjustments': 'pay_adjustments',
+    'attendance': 'attendance',
+    'tasks': 'tasks',
+}
+
+def _ensure_table_versions(conn):
+    """Version counter and triggers for each table in TABLE_VERSION_COUNTERS (idempotent)."""
+    for table, counter in TABLE_VERSION_COUNTERS.items():
+        conn.execute("INSERT OR IGNORE INTO change_counters (name, value) VALUES (?, 0)", (counter,))
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_version_{event.lower()} AFTER {event} ON {table}
+                BEGIN
+                    UPDATE change_counters SET value = value + 1 WHERE name = '{counter}';
+                END
+            """)
+
+def _migrate_core_tables(conn):
+    conn.execute('''
         CREATE TABLE IF NOT EXISTS employees (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             name TEXT NOT NULL,
             position TEXT NOT NULL
         )
     ''')
-    cursor.execute('''
+    conn.execute('''
         CREATE TABLE IF NOT EXISTS shifts (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             employee_id INTEGER,
@@ -46,10 +851,14 @@ def init_db():
             -- Optional fields added by migration helpers
             end_time TEXT,
             series_id TEXT,
+            -- Normalized copies of shift_time/end_time, maintained by triggers
+            shift_day TEXT,
+            start_min INTEGER,
+            end_min INTEGER,
             FOREIGN KEY (employee_id) REFERENCES employees (id)
         )
     ''')
-    cursor.execute('''
+    conn.execute('''
         CREATE TABLE IF NOT EXISTS attendance (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             employee_id INTEGER,
@@ -58,7 +867,7 @@ def init_db():
             FOREIGN KEY (employee_id) REFERENCES employees (id)
         )
     ''')
-    cursor.execute('''
+    conn.execute('''
         CREATE TABLE IF NOT EXISTS tasks (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             employee_id INTEGER,
@@ -67,7 +876,7 @@ def init_db():
             FOREIGN KEY (employee_id) REFERENCES employees (id)
         )
     ''')
-    cursor.execute('''
+    conn.execute('''
         CREATE TABLE IF NOT EXISTS users (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             name TEXT NOT NULL,
@@ -75,16 +884,15 @@ def init_db():
             password TEXT NOT NULL
         )
     ''')
-    
-    # Lightweight migration: ensure new columns on existing DBs
-    # SQLite doesn't support IF NOT EXISTS for columns; guard manually
+    # Databases from before these columns existed
     if not _column_exists(conn, 'shifts', 'end_time'):
         conn.execute('ALTER TABLE shifts ADD COLUMN end_time TEXT')
     if not _column_exists(conn, 'shifts', 'series_id'):
         conn.execute('ALTER TABLE shifts ADD COLUMN series_id TEXT')
 
-    # --- Time Off (Caregiver unavailability) table (idempotent) ---
-    cursor.execute('''
+def _migrate_time_off(conn):
+    """Caregiver unavailability."""
+    conn.execute('''
         CREATE TABLE IF NOT EXISTS time_off (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             employee_id INTEGER NOT NULL,
@@ -96,22 +904,13 @@ def init_db():
         )
     ''')
     # Helpful covering index for overlap / range queries
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_time_off_employee_start ON time_off (employee_id, start_date)')
-    
-    conn.commit()
-    # Lightweight migration: ensure new columns on existing DBs
-    # SQLite doesn't support IF NOT EXISTS for columns; guard manually
-    if not _column_exists(conn, 'shifts', 'end_time'):
-        conn.execute('ALTER TABLE shifts ADD COLUMN end_time TEXT')
-    if not _column_exists(conn, 'shifts', 'series_id'):
-        conn.execute('ALTER TABLE shifts ADD COLUMN series_id TEXT')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_time_off_employee_start ON time_off (employee_id, start_date)')
 
-    # Employee hourly_rate for pay calculations (default $16)
+def _migrate_pay(conn):
+    """Hourly rates (default $16) and misc owed/paid adjustments."""
     if not _column_exists(conn, 'employees', 'hourly_rate'):
         conn.execute('ALTER TABLE employees ADD COLUMN hourly_rate REAL DEFAULT 16')
-
-    # --- Pay adjustments table (misc owed/paid) ---
-    cursor.execute('''
+    conn.execute('''
         CREATE TABLE IF NOT EXISTS pay_adjustments (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             employee_id INTEGER NOT NULL,
@@ -122,56 +921,126 @@ def init_db():
             FOREIGN KEY (employee_id) REFERENCES employees (id) ON DELETE CASCADE
         )
     ''')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_adjustments_emp_date ON pay_adjustments (employee_id, date)')
-
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_adjustments_emp_date ON pay_adjustments (employee_id, date)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_adjustments_date ON pay_adjustments (date)')
     # One-off: ensure Scarlett gets $20 default if present and at default rate
+    conn.execute("""
+        UPDATE employees
+        SET hourly_rate = 20
+        WHERE name = 'Scarlett' AND (hourly_rate IS NULL OR hourly_rate = 16)
+    """)
+
+# ---------------- Schema migrations ---------------- #
+#
+# Applied in order by init_db(); PRAGMA user_version records the last one applied, so a
+# current database costs a single PRAGMA read at startup (plus the REPAIRS probes). Append new
+# steps with the next number and never edit a released one. Steps must be idempotent: databases
+# created before versioning start at user_version 0 with most of this schema already in place.
+#
+# A migration runs once per database, so it cannot keep a runtime invariant true. REPAIRS run on
+# every init_db() once their schema version is reached: (version, probe SQL, step). The step only
+# takes the write lock when the probe returns a row.
+MIGRATIONS = (
+    (1, 'core tables', _migrate_core_tables),
+    (2, 'time off', _migrate_time_off),
+    (3, 'normalized shift times', _ensure_shift_time_index),
+    (4, 'pay rates and adjustments', _migrate_pay),
+    (5, 'recurring series rules', _ensure_series_tables),
+    (6, 'change tracking and calendar sync state', _ensure_change_tracking),
+    (7, 'changes feed', _ensure_changes_feed),
+    (8, 'daily hours and coverage rollups', _ensure_daily_rollups),
+    (9, 'dashboard counters', _ensure_stat_counters),
+    (10, 'table versions for conditional GET', _ensure_table_versions),
+)
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+REPAIRS = (
+    # Series written as plain shifts rows (raw INSERTs, old seed data) get their rule derived
+    (5, "SELECT 1 FROM shifts WHERE series_id IS NOT NULL AND shift_day IS NOT NULL "
+        "AND series_id NOT IN (SELECT id FROM series) LIMIT 1", _backfill_series_rules),
+)
+
+def schema_version():
+    """PRAGMA user_version of the database (0 = never migrated)."""
+    return get_db().execute('PRAGMA user_version').fetchone()[0]
+
+def init_db():
+    """Bring the schema up to date by applying pending MIGRATIONS. Returns the number applied.
+
+    Each step runs in its own BEGIN IMMEDIATE transaction together with its user_version bump,
+    so a crash never leaves a half-applied step, and a second process that raced us for the
+    write lock sees the new version and skips it. REPAIRS run afterwards, whether or not
+    anything was migrated.
+    """
+    conn = connect_db()
     try:
-        cursor.execute("""
-            UPDATE employees
-            SET hourly_rate = 20
-            WHERE name = 'Scarlett' AND (hourly_rate IS NULL OR hourly_rate = 16)
-        """)
-    except Exception:
-        pass
+        current = conn.execute('PRAGMA user_version').fetchone()[0]
+        applied = 0
+        for version, _name, step in MIGRATIONS:
+            if version <= current:
+                continue
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                if conn.execute('PRAGMA user_version').fetchone()[0] >= version:
+                    conn.rollback()
+                    continue
+                step(conn)
+                conn.execute(f'PRAGMA user_version = {int(version)}')
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            applied += 1
+        _run_repairs(conn)
+        return applied
+    finally:
+        conn.close()
+
+def _run_repairs(conn):
+    current = conn.execute('PRAGMA user_version').fetchone()[0]
+    for version, probe, step in REPAIRS:
+        if version > current or conn.execute(probe).fetchone() is None:
+            continue
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            step(conn)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
 
-    conn.commit()
-    conn.close()
-    
 def insert_user(name, email, password):
-    conn = connect_db()
+    conn = get_db()
     c = conn.cursor()
     c.execute("INSERT INTO users (name, email, password) VALUES (?, ?, ?)", (name, email, password))
     conn.commit()
-    conn.close()
+    _cache.invalidate('users')
 
 def get_user_by_email(email):
-    conn = connect_db()
-    c = conn.cursor()
-    c.execute("SELECT * FROM users WHERE email = ?", (email,))
-    user = c.fetchone()
-    conn.close()
-    return user
+    def load():
+        c = get_db().cursor()
+        c.execute("SELECT * FROM users WHERE email = ?", (email,))
+        return c.fetchone()
+    return _cache.get(('user_by_email', email), 'users', load)
 
 def update_user_password(user_id: int, new_hash: str):
     """Update stored password hash for a user (used for hash upgrades)."""
-    conn = connect_db()
+    conn = get_db()
     cur = conn.cursor()
     cur.execute("UPDATE users SET password = ? WHERE id = ?", (new_hash, user_id))
     conn.commit()
-    conn.close()
+    _cache.invalidate('users')
 
 def insert_employee(name, position):
     """Insert a new employee into the database."""
-    conn = connect_db()
+    conn = get_db()
     cursor = conn.cursor()
     cursor.execute("INSERT INTO employees (name, position) VALUES (?, ?)", (name, position))
     conn.commit()
-    conn.close()
+    _cache.invalidate('employees')
 
-def get_employees():
-    """Get all employees; include hourly_rate with default 16 for legacy rows."""
-    conn = connect_db()
-    cursor = conn.cursor()
+def _load_employees():
+    cursor = get_db().cursor()
     try:
         cursor.execute(
             """
@@ -183,150 +1052,449 @@ def get_employees():
     except sqlite3.OperationalError:
         # Fallback for very old DBs without hourly_rate column
         cursor.execute("SELECT id, name, position, 16 AS hourly_rate FROM employees")
-    employees = cursor.fetchall()
-    conn.close()
-    return employees
+    return tuple(cursor.fetchall())
+
+def get_employees():
+    """Get all employees; include hourly_rate with default 16 for legacy rows. Served from the lookup cache."""
+    return list(_cache.get('employees', 'employees', _load_employees))
 
 def update_employee_rate(employee_id: int, rate: float) -> bool:
     """Update an employee's hourly rate. Returns True if a row changed."""
-    conn = connect_db()
+    conn = get_db()
     cur = conn.cursor()
     cur.execute("UPDATE employees SET hourly_rate = ? WHERE id = ?", (rate, employee_id))
     changed = cur.rowcount > 0
     conn.commit()
-    conn.close()
+    _cache.invalidate('employees')
     return changed
 
 def insert_shift(employee_id, shift_time, end_time=None, series_id=None):
     """Insert a new shift into the database. Idempotent on (employee_id, shift_time)."""
-    conn = connect_db()
+    conn = get_db()
     cursor = conn.cursor()
-    # Guard against duplicate recurrence submissions
+    # Duplicate recurrence submissions are absorbed by ux_shifts_employee_time
     cursor.execute(
-        "SELECT 1 FROM shifts WHERE employee_id = ? AND shift_time = ? LIMIT 1",
-        (employee_id, shift_time),
+        "INSERT OR IGNORE INTO shifts (employee_id, shift_time, end_time, series_id) VALUES (?, ?, ?, ?)",
+        (employee_id, shift_time, end_time, series_id)
     )
-    exists = cursor.fetchone() is not None
-    if not exists:
-        cursor.execute(
-            "INSERT INTO shifts (employee_id, shift_time, end_time, series_id) VALUES (?, ?, ?, ?)",
-            (employee_id, shift_time, end_time, series_id)
+    conn.commit()
+
+def expand_weekly_occurrences(start_date: date, end_date: date, weekdays, start_t: dtime, end_t: dtime|None = None):
+    """Yield (shift_time, end_time) ISO strings for each selected weekday (0=Mon) in [start_date, end_date].
+    end_time is None when no end_t is given. Output format matches datetime.isoformat()."""
+    weekday_indices = sorted({int(d) for d in weekdays if 0 <= int(d) <= 6})
+    # Start from Monday of the week containing the start date
+    week_start = start_date - timedelta(days=start_date.weekday())
+    while week_start <= end_date:
+        for dow in weekday_indices:
+            day = week_start + timedelta(days=dow)
+            if day < start_date or day > end_date:
+                continue
+            st = datetime.combine(day, start_t).isoformat()
+            et = datetime.combine(day, end_t).isoformat() if end_t else None
+            yield st, et
+        week_start += timedelta(days=7)
+
+# ---------------- Recurring series (rule + exceptions, materialized on read) ---------------- #
+#
+# A weekly series is stored once in `series`; its occurrences are written to `shifts` lazily, up to
+# the furthest day anyone has read (series.materialized_through) but no further than SERIES_HORIZON_DAYS
+# past today. Deleting or editing a single occurrence records a row in `series_exceptions` so later
+# materialization and rule edits respect it.
+
+def _series_weekdays(text):
+    return [int(x) for x in (text or '').split(',') if x.strip().isdigit()]
+
+def _materialize_series(conn, rule, through: date) -> int:
+    """Insert occurrences of one series rule after its watermark, up to `through` (clamped to valid_until).
+    Runs inside the caller's transaction. Returns number of rows inserted."""
+    first = date.fromisoformat(rule['valid_from'])
+    if rule['materialized_through']:
+        first = max(first, date.fromisoformat(rule['materialized_through']) + timedelta(days=1))
+    last = through
+    if rule['valid_until']:
+        last = min(last, date.fromisoformat(rule['valid_until']))
+    if first > last:
+        return 0
+    exception_days = {
+        r[0] for r in conn.execute(
+            "SELECT day FROM series_exceptions WHERE series_id = ? AND day BETWEEN ? AND ?",
+            (rule['id'], first.isoformat(), last.isoformat()),
         )
-        conn.commit()
-    conn.close()
+    }
+    start_t = dtime.fromisoformat(rule['start_time'])
+    end_t = dtime.fromisoformat(rule['end_time']) if rule['end_time'] else None
+    rows = [
+        (rule['employee_id'], st, et, rule['id'])
+        for st, et in expand_weekly_occurrences(first, last, _series_weekdays(rule['weekdays']), start_t, end_t)
+        if st[:10] not in exception_days
+    ]
+    inserted = 0
+    if rows:
+        cur = conn.executemany(
+            "INSERT OR IGNORE INTO shifts (employee_id, shift_time, end_time, series_id) VALUES (?, ?, ?, ?)",
+            rows,
+        )
+        inserted = max(cur.rowcount, 0)
+    conn.execute("UPDATE series SET materialized_through = ? WHERE id = ?", (last.isoformat(), rule['id']))
+    return inserted
+
+def ensure_series_materialized(through_iso_date: str, employee_ids=None) -> int:
+    """Make sure every series (or only those of employee_ids) has its occurrences written to `shifts`
+    through the given day (inclusive), but never past today + SERIES_HORIZON_DAYS: a read of a far-future or
+    open-ended range must not write years of rows. Costs one query over the (small) series table when
+    everything is already current."""
+    horizon = (date.today() + timedelta(days=SERIES_HORIZON_DAYS)).isoformat()
+    through_iso_date = min(through_iso_date[:10], horizon)
+    conn = get_db()
+    pending_sql = """
+        SELECT * FROM series
+        WHERE valid_from <= date(?)
+          AND (materialized_through IS NULL
+               OR materialized_through < MIN(date(?), COALESCE(valid_until, date(?))))
+    """
+    args = (through_iso_date, through_iso_date, through_iso_date)
+    if employee_ids is not None:
+        ids = sorted({int(e) for e in employee_ids})
+        pending_sql += f" AND employee_id IN ({','.join('?' * len(ids))})"
+        args += tuple(ids)
+    if conn.execute(pending_sql, args).fetchone() is None:
+        return 0
+    through = date.fromisoformat(through_iso_date)
+    inserted = 0
+    with conn:
+        # Re-read inside the write transaction so concurrent readers don't double-advance watermarks
+        for rule in conn.execute(pending_sql, args).fetchall():
+            inserted += _materialize_series(conn, rule, through)
+    return inserted
+
+def create_series(employee_id, series_id, start_date: date, end_date: date|None, weekdays,
+                  start_t: dtime, end_t: dtime|None = None, conn=None):
+    """Store a weekly recurrence rule. No shifts are written here; they appear as the calendar is read.
+    With conn (a script's own connection) the rule is written inside the caller's transaction."""
+    weekday_indices = sorted({int(d) for d in weekdays if 0 <= int(d) <= 6})
+    if conn is None:
+        conn = get_db()
+        with conn:
+            _insert_series_rule(conn, employee_id, series_id, start_date, end_date, weekday_indices, start_t, end_t)
+    else:
+        _insert_series_rule(conn, employee_id, series_id, start_date, end_date, weekday_indices, start_t, end_t)
+
+def _insert_series_rule(conn, employee_id, series_id, start_date, end_date, weekday_indices, start_t, end_t):
+    conn.execute(
+        "INSERT INTO series (id, employee_id, weekdays, start_time, end_time, valid_from, valid_until) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (
+            series_id, employee_id, ','.join(str(d) for d in weekday_indices),
+            start_t.strftime('%H:%M'), end_t.strftime('%H:%M') if end_t else None,
+            start_date.isoformat(), end_date.isoformat() if end_date else None,
+        ),
+    )
+
+def update_series_rule(series_id, start_date: date, end_date: date|None, weekdays,
+                       start_t: dtime, end_t: dtime|None = None, employee_id=None):
+    """Change a series from start_date (inclusive) onwards. Occurrences before start_date keep the old rule;
+    generated occurrences on/after it are dropped and will be regenerated on read. Edited (override) rows and
+    deleted (skip) days are kept. Returns the number of rows removed, or None if the series does not exist."""
+    conn = get_db()
+    with conn:
+        rule = conn.execute("SELECT * FROM series WHERE id = ?", (series_id,)).fetchone()
+        if rule is None and _backfill_series_rules(conn, series_id):
+            rule = conn.execute("SELECT * FROM series WHERE id = ?", (series_id,)).fetchone()
+        if rule is None:
+            return None
+        # Freeze history under the old rule before it changes
+        _materialize_series(conn, rule, start_date - timedelta(days=1))
+        cur = conn.execute(
+            """
+            DELETE FROM shifts
+            WHERE series_id = ? AND shift_day >= date(?)
+              AND id NOT IN (
+                SELECT shift_id FROM series_exceptions
+                WHERE series_id = ? AND kind = 'override' AND shift_id IS NOT NULL
+              )
+            """,
+            (series_id, start_date.isoformat(), series_id),
+        )
+        removed = max(cur.rowcount, 0)
+        valid_from = min(date.fromisoformat(rule['valid_from']), start_date)
+        watermark = start_date - timedelta(days=1)
+        weekday_indices = sorted({int(d) for d in weekdays if 0 <= int(d) <= 6})
+        conn.execute(
+            """
+            UPDATE series
+            SET employee_id = ?, weekdays = ?, start_time = ?, end_time = ?, valid_from = ?, valid_until = ?,
+                materialized_through = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+            """,
+            (
+                employee_id if employee_id is not None else rule['employee_id'],
+                ','.join(str(d) for d in weekday_indices),
+                start_t.strftime('%H:%M'), end_t.strftime('%H:%M') if end_t else None,
+                valid_from.isoformat(), end_date.isoformat() if end_date else None,
+                watermark.isoformat() if watermark >= valid_from else None,
+                series_id,
+            ),
+        )
+    return removed
+
+def _record_series_override(conn, shift_id):
+    """Mark a materialized occurrence as individually edited so rule edits leave it alone."""
+    conn.execute(
+        """
+        INSERT OR IGNORE INTO series_exceptions (series_id, day, kind, shift_id)
+        SELECT shifts.series_id, shifts.shift_day, 'override', shifts.id
+        FROM shifts JOIN series ON series.id = shifts.series_id
+        WHERE shifts.id = ?
+          AND NOT EXISTS (SELECT 1 FROM series_exceptions WHERE shift_id = shifts.id)
+        """,
+        (shift_id,),
+    )
 
 def get_shifts():
     """Get all shifts from the database."""
-    conn = connect_db()
+    conn = get_db()
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM shifts")
     shifts = cursor.fetchall()
-    conn.close()
     return shifts
 
 def get_shifts_in_range(start_iso_date, end_iso_date):
-    """Get shifts where date(shift_time) between start and end inclusive."""
-    conn = connect_db()
+    """Get shifts whose start day is between start and end inclusive (uses idx_shifts_day)."""
+    ensure_series_materialized(end_iso_date)
+    conn = get_db()
     cursor = conn.cursor()
     cursor.execute(
         """
         SELECT * FROM shifts
-        WHERE date(shift_time) BETWEEN date(?) AND date(?)
+        WHERE shift_day BETWEEN date(?) AND date(?)
         """,
         (start_iso_date, end_iso_date)
     )
     rows = cursor.fetchall()
-    conn.close()
     return rows
 
 
 def insert_attendance(employee_id, date, status):
     """Insert a new attendance record into the database."""
-    conn = connect_db()
+    conn = get_db()
     cursor = conn.cursor()
     cursor.execute("INSERT INTO attendance (employee_id, date, status) VALUES (?, ?, ?)", (employee_id, date, status))
     conn.commit()
-    conn.close()
 
 def get_attendance():
     """Get all attendance records from the database."""
-    conn = connect_db()
+    conn = get_db()
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM attendance")
     attendance_records = cursor.fetchall()
-    conn.close()
     return attendance_records
 
 
 def insert_task(employee_id, task, status):
     """Insert a new task into the database."""
-    conn = connect_db()
+    conn = get_db()
     cursor = conn.cursor()
     cursor.execute("INSERT INTO tasks (employee_id, task, status) VALUES (?, ?, ?)", (employee_id, task, status))
     conn.commit()
-    conn.close()
 
 def get_tasks():
     """Get all tasks from the database."""
-    conn = connect_db()
+    conn = get_db()
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM tasks")
     tasks = cursor.fetchall()
-    conn.close()
     return tasks
 
 def delete_employee(employee_id):
     """Delete an employee and their shifts from the database."""
-    conn = connect_db()
+    conn = get_db()
     cursor = conn.cursor()
-    # Delete related shifts first (soft cascade)
+    # Delete related shifts and recurrence rules first (soft cascade)
+    cursor.execute(
+        "DELETE FROM series_exceptions WHERE series_id IN (SELECT id FROM series WHERE employee_id = ?)",
+        (employee_id,),
+    )
+    cursor.execute("DELETE FROM series WHERE employee_id = ?", (employee_id,))
     cursor.execute("DELETE FROM shifts WHERE employee_id = ?", (employee_id,))
     cursor.execute("DELETE FROM employees WHERE id = ?", (employee_id,))
     conn.commit()
-    conn.close()
+    _cache.invalidate('employees')
+
+def _delete_shift(conn, shift_id) -> int:
+    """Delete one shift inside the caller's transaction, remembering a series occurrence as a skip.
+    Returns the number of rows deleted (0 if it was already gone)."""
+    cur = conn.execute(
+        "UPDATE series_exceptions SET kind = 'skip', shift_id = NULL WHERE shift_id = ?",
+        (shift_id,),
+    )
+    if cur.rowcount == 0:
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO series_exceptions (series_id, day, kind, shift_id)
+            SELECT shifts.series_id, shifts.shift_day, 'skip', NULL
+            FROM shifts JOIN series ON series.id = shifts.series_id
+            WHERE shifts.id = ?
+            """,
+            (shift_id,),
+        )
+    return max(conn.execute("DELETE FROM shifts WHERE id = ?", (shift_id,)).rowcount, 0)
+
+def _delete_series(conn, series_id) -> int:
+    """Delete a series' shifts, rule and exceptions inside the caller's transaction. Returns shifts deleted."""
+    removed = conn.execute("DELETE FROM shifts WHERE series_id = ?", (series_id,)).rowcount
+    conn.execute("DELETE FROM series_exceptions WHERE series_id = ?", (series_id,))
+    conn.execute("DELETE FROM series WHERE id = ?", (series_id,))
+    return max(removed, 0)
+
+class DuplicateShiftError(Exception):
+    """A swap/edit would give a caregiver two shifts with the same start time (ux_shifts_employee_time).
+    Unlike an overlap this is never allowed, forced or not."""
+
+    def __init__(self, shift_id, employee_id, shift_time, duplicate_id):
+        super().__init__(
+            f'shift {shift_id} would duplicate shift {duplicate_id} (caregiver {employee_id} at {shift_time})'
+        )
+        self.shift_id = shift_id
+        self.duplicate_id = duplicate_id
+
+def _check_duplicate(conn, shift_id, employee_id, shift_time=None):
+    """Raise DuplicateShiftError if employee_id already has another shift starting at shift_time (default: the
+    shift's current start). Compares the normalized day/minute, so '09:00' and '09:00:00' are the same start;
+    ux_shifts_employee_time only sees identical text."""
+    if shift_time is None:
+        dup = conn.execute(
+            """
+            SELECT d.id, s.shift_time FROM shifts s
+            JOIN shifts d ON d.employee_id = ? AND d.shift_day = s.shift_day AND d.start_min = s.start_min
+            WHERE s.id = ? AND d.id != s.id LIMIT 1
+            """,
+            (employee_id, shift_id),
+        ).fetchone()
+    else:
+        # Same expressions the normalization triggers use, applied to the new value
+        dup = conn.execute(
+            f"""
+            SELECT d.id, p.shift_time FROM (SELECT ? AS shift_time) p
+            JOIN shifts d ON d.employee_id = ? AND d.shift_day = {_SHIFT_DAY_SQL.format(src='p')}
+                AND d.start_min = {_START_MIN_SQL.format(src='p')}
+            WHERE d.id != ? LIMIT 1
+            """,
+            (shift_time, employee_id, shift_id),
+        ).fetchone()
+    if dup is not None:
+        raise DuplicateShiftError(shift_id, employee_id, dup[1], dup[0])
+
+def _update_shift_employee(conn, shift_id, new_employee_id) -> int:
+    _check_duplicate(conn, shift_id, new_employee_id)
+    _record_series_override(conn, shift_id)
+    try:
+        return conn.execute("UPDATE shifts SET employee_id = ? WHERE id = ?", (new_employee_id, shift_id)).rowcount
+    except sqlite3.IntegrityError:
+        # A writer got in between the check and the update (outside BEGIN IMMEDIATE): name its row
+        _check_duplicate(conn, shift_id, new_employee_id)
+        raise
+
+def _update_shift_occurrence(conn, shift_id, shift_time, end_time, employee_id) -> int:
+    _check_duplicate(conn, shift_id, employee_id, shift_time)
+    _record_series_override(conn, shift_id)
+    try:
+        return conn.execute(
+            "UPDATE shifts SET shift_time = ?, end_time = ?, employee_id = ? WHERE id = ?",
+            (shift_time, end_time, employee_id, shift_id),
+        ).rowcount
+    except sqlite3.IntegrityError:
+        _check_duplicate(conn, shift_id, employee_id, shift_time)
+        raise
 
 def delete_shift(shift_id):
-    """Delete a shift from the database."""
-    conn = connect_db()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM shifts WHERE id = ?", (shift_id,))
-    conn.commit()
-    conn.close()
+    """Delete a shift from the database. A deleted series occurrence is remembered as a skip."""
+    conn = get_db()
+    with conn:
+        _delete_shift(conn, shift_id)
 
 def delete_shifts_by_series(series_id):
-    """Delete all shifts belonging to a series."""
-    conn = connect_db()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM shifts WHERE series_id = ?", (series_id,))
-    conn.commit()
-    conn.close()
+    """Delete all shifts belonging to a series, along with its rule and exceptions."""
+    conn = get_db()
+    with conn:
+        _delete_series(conn, series_id)
 
 def update_shift_employee(shift_id, new_employee_id):
-    conn = connect_db()
-    cursor = conn.cursor()
-    cursor.execute("UPDATE shifts SET employee_id = ? WHERE id = ?", (new_employee_id, shift_id))
-    conn.commit()
-    conn.close()
+    conn = get_db()
+    with conn:
+        _update_shift_employee(conn, shift_id, new_employee_id)
+
+def update_shift_occurrence(shift_id, shift_time, end_time, employee_id) -> bool:
+    """Rewrite one shift row (time and caregiver). Series occurrences become overrides. Returns True if updated."""
+    conn = get_db()
+    with conn:
+        updated = _update_shift_occurrence(conn, shift_id, shift_time, end_time, employee_id)
+    return updated > 0
+
+class BulkOpError(Exception):
+    """A bulk shift operation could not be applied; the whole batch was rolled back."""
+
+    def __init__(self, index, message, status=400):
+        super().__init__(message)
+        self.index = index
+        self.status = status
+
+def apply_shift_ops(ops):
+    """Apply shift operations in one write transaction (BEGIN IMMEDIATE), all or nothing.
+
+    ops: list of tuples, already validated by the caller:
+      ('delete', shift_id) | ('delete_series', series_id) | ('swap', shift_id, new_employee_id)
+      | ('edit_day', shift_id, shift_time, end_time, employee_id)
+    Deletes are idempotent (affected 0 when the row is already gone). A swap or edit_day of a missing
+    shift raises BulkOpError(index, ..., 404), and one that would duplicate another shift of the same caregiver
+    at the same start time BulkOpError(index, ..., 409), after rolling back. Returns the affected row count per op.
+    """
+    conn = get_db()
+    conn.execute('BEGIN IMMEDIATE')
+    affected = []
+    try:
+        for i, op in enumerate(ops):
+            kind = op[0]
+            if kind == 'delete':
+                n = _delete_shift(conn, op[1])
+            elif kind == 'delete_series':
+                n = _delete_series(conn, op[1])
+            elif kind in ('swap', 'edit_day'):
+                try:
+                    if kind == 'swap':
+                        n = _update_shift_employee(conn, op[1], op[2])
+                    else:
+                        n = _update_shift_occurrence(conn, op[1], op[2], op[3], op[4])
+                except (DuplicateShiftError, sqlite3.IntegrityError) as de:
+                    raise BulkOpError(i, str(de), 409) from de
+            else:
+                raise BulkOpError(i, f'unknown op {kind!r}')
+            if kind in ('swap', 'edit_day') and n == 0:
+                raise BulkOpError(i, f'shift {op[1]} not found', 404)
+            affected.append(n)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return affected
 
 def delete_attendance(attendance_id):
     """Delete an attendance record from the database."""
-    conn = connect_db()
+    conn = get_db()
     cursor = conn.cursor()
     cursor.execute("DELETE FROM attendance WHERE id = ?", (attendance_id,))
     conn.commit()
-    conn.close()
 
 def delete_task(task_id):
     """Delete a task from the database."""
-    conn = connect_db()
+    conn = get_db()
     cursor = conn.cursor()
     cursor.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
     conn.commit()
-    conn.close()
 
 def get_shifts_with_names():
     """Get all shifts from the database with employee names."""
-    conn = connect_db()
+    conn = get_db()
     cursor = conn.cursor()
     cursor.execute(
         """
@@ -337,33 +1505,39 @@ def get_shifts_with_names():
         """
     )
     shifts = cursor.fetchall()
-    conn.close()
     return shifts
 
 def get_shifts_with_names_between(start_iso_date: str, end_iso_date: str):
-        """Get shifts with employee names where date(shift_time) is between start and end (inclusive).
+        """Get shifts with employee names whose shift_day (start date) is between start and end (inclusive).
         Dates must be 'YYYY-MM-DD'. Returns rows with columns:
             id, name, employee_id, shift_time, end_time, series_id
         """
-        conn = connect_db()
+        ensure_series_materialized(end_iso_date)
+        conn = get_db()
         cursor = conn.cursor()
         cursor.execute(
                 """
                 SELECT shifts.id, employees.name, employees.id as employee_id, shifts.shift_time, shifts.end_time, shifts.series_id
                 FROM shifts
                 JOIN employees ON shifts.employee_id = employees.id
-                WHERE date(shifts.shift_time) BETWEEN date(?) AND date(?)
+                WHERE shifts.shift_day BETWEEN date(?) AND date(?)
                 ORDER BY shifts.shift_time
                 """,
                 (start_iso_date, end_iso_date)
         )
         rows = cursor.fetchall()
-        conn.close()
         return rows
 
+def get_coverage_gaps(start_iso_date: str, end_iso_date: str, window_start: int, window_end: int):
+    """{day: [(gap_start, gap_end), ...]} straight from shifts (see scheduling.coverage_gaps), for windows
+    other than the one daily_coverage is kept for."""
+    ensure_series_materialized(end_iso_date)
+    return _coverage_gaps_between(get_db(), date.fromisoformat(start_iso_date), date.fromisoformat(end_iso_date),
+                                  window_start, window_end)
+
 def get_attendance_with_names():
     """Get all attendance records from the database with employee names."""
-    conn = connect_db()
+    conn = get_db()
     cursor = conn.cursor()
     cursor.execute(
         """
@@ -373,12 +1547,11 @@ def get_attendance_with_names():
         """
     )
     attendance_records = cursor.fetchall()
-    conn.close()
     return attendance_records
 
 def get_tasks_with_names():
     """Get all tasks from the database with employee names."""
-    conn = connect_db()
+    conn = get_db()
     cursor = conn.cursor()
     cursor.execute(
         """
@@ -388,25 +1561,139 @@ def get_tasks_with_names():
         """
     )
     tasks = cursor.fetchall()
-    conn.close()
     return tasks
 
+def get_series_rule(series_id: str):
+    """Return the `series` row for series_id, or None. A series that only exists as `shifts` rows gets its
+    rule derived from them (and saved) first."""
+    conn = get_db()
+    rule = conn.execute("SELECT * FROM series WHERE id = ?", (series_id,)).fetchone()
+    if rule is None and conn.execute("SELECT 1 FROM shifts WHERE series_id = ? LIMIT 1", (series_id,)).fetchone():
+        with conn:
+            _backfill_series_rules(conn, series_id)
+        rule = conn.execute("SELECT * FROM series WHERE id = ?", (series_id,)).fetchone()
+    return rule
+
+def get_series_exception_days(series_id: str, start_iso_date: str, end_iso_date: str):
+    """Set of 'YYYY-MM-DD' days in the range where the series has a skip or override (no generated occurrence)."""
+    return {
+        r[0] for r in get_db().execute(
+            "SELECT day FROM series_exceptions WHERE series_id = ? AND day BETWEEN ? AND ?",
+            (series_id, start_iso_date, end_iso_date),
+        )
+    }
+
+def get_shift_by_id(shift_id: int):
+    """Return one shift row (id, employee_id, series_id, shift_time, end_time, shift_day), or None."""
+    return get_db().execute(
+        "SELECT id, employee_id, series_id, shift_time, end_time, shift_day FROM shifts WHERE id = ?",
+        (shift_id,),
+    ).fetchone()
+
+def get_shifts_by_ids(shift_ids):
+    """{id: row} for the given shift ids (same columns as get_shift_by_id); missing ids are absent."""
+    ids = sorted({int(i) for i in shift_ids})
+    if not ids:
+        return {}
+    rows = get_db().execute(
+        f"SELECT id, employee_id, series_id, shift_time, end_time, shift_day FROM shifts "
+        f"WHERE id IN ({','.join('?' * len(ids))})",
+        ids,
+    ).fetchall()
+    return {r['id']: r for r in rows}
+
+def get_conflict_candidates(employee_ids, start_iso_date: str, end_iso_date: str):
+    """(shift_rows, time_off_rows) of the given caregivers that could overlap shifts starting in the range,
+    for scheduling.ConflictIndex. Shifts starting the day before are included (overnight shifts)."""
+    ids = sorted({int(e) for e in employee_ids})
+    if not ids:
+        return [], []
+    # Only these caregivers' series need to be current; checking never writes anyone else's occurrences
+    ensure_series_materialized(end_iso_date, ids)
+    conn = get_db()
+    marks = ','.join('?' * len(ids))
+    shift_rows = conn.execute(
+        f"""
+        SELECT id, employee_id, series_id, shift_time, end_time, start_min, end_min
+        FROM shifts
+        WHERE employee_id IN ({marks}) AND shift_day BETWEEN date(?, '-1 day') AND date(?)
+        """,
+        (*ids, start_iso_date, end_iso_date),
+    ).fetchall()
+    time_off_rows = conn.execute(
+        f"""
+        SELECT id, employee_id, start_date, end_date, reason
+        FROM time_off
+        WHERE employee_id IN ({marks}) AND start_date <= ? AND end_date >= date(?, '-1 day')
+        """,
+        (*ids, end_iso_date, start_iso_date),
+    ).fetchall()
+    return shift_rows, time_off_rows
+
 def get_series_start_date(series_id: str):
     """Return the earliest date (YYYY-MM-DD) for a given series_id, or None if not found."""
-    conn = connect_db()
+    conn = get_db()
     cur = conn.cursor()
-    cur.execute("SELECT MIN(date(shift_time)) AS start_date FROM shifts WHERE series_id = ?", (series_id,))
+    cur.execute("SELECT valid_from AS start_date FROM series WHERE id = ?", (series_id,))
     row = cur.fetchone()
-    conn.close()
     if not row or row[0] is None:
         return None
     return row[0]
 
+# ---------------- Changes feed ---------------- #
+
+def get_change_seq() -> int:
+    """Latest seq in `changes` (0 when empty). Read it before loading data so nothing is missed."""
+    return get_db().execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+
+def get_changes_since(since: int, limit: int = 1000, start_iso_date=None, end_iso_date=None):
+    """Rows changed after `since`, oldest first, at most `limit` change entries.
+
+    Returns (seq, more, changes) where seq is the last seq covered (pass it as the next `since`) and
+    changes maps table -> {'upserted': [current rows], 'deleted': [ids]}. Upserted shifts carry the same
+    columns as get_shifts_with_names_between; when start/end are given, only shifts whose day falls in the
+    range are returned (deletes always are). Rows deleted again since are reported as deleted.
+    """
+    conn = get_db()
+    entries = conn.execute(
+        "SELECT seq, tbl, row_id, op FROM changes WHERE seq > ? ORDER BY seq LIMIT ?",
+        (since, limit + 1),
+    ).fetchall()
+    more = len(entries) > limit
+    entries = entries[:limit]
+    seq = entries[-1]['seq'] if entries else since
+    wanted = {table: [] for table in CHANGE_FEED_TABLES}
+    deleted = {table: [] for table in CHANGE_FEED_TABLES}
+    for e in entries:
+        (wanted if e['op'] == 'upsert' else deleted)[e['tbl']].append(e['row_id'])
+    queries = {
+        'shifts': """
+            SELECT shifts.id, employees.name, employees.id AS employee_id, shifts.shift_time, shifts.end_time,
+                   shifts.series_id, shifts.shift_day
+            FROM shifts JOIN employees ON shifts.employee_id = employees.id
+            WHERE shifts.id IN ({marks})
+        """,
+        'time_off': "SELECT id, employee_id, start_date, end_date, reason FROM time_off WHERE id IN ({marks})",
+        'employees': "SELECT id, name, position FROM employees WHERE id IN ({marks})",
+    }
+    changes = {}
+    for table, ids in wanted.items():
+        rows = []
+        for i in range(0, len(ids), 500):  # stay under SQLITE_MAX_VARIABLE_NUMBER on old builds
+            chunk = ids[i:i + 500]
+            rows.extend(conn.execute(queries[table].format(marks=','.join('?' * len(chunk))), chunk).fetchall())
+        found = {r['id'] for r in rows}
+        gone = deleted[table] + [i for i in ids if i not in found]
+        if table == 'shifts' and start_iso_date and end_iso_date:
+            rows = [r for r in rows if start_iso_date <= r['shift_day'] <= end_iso_date]
+        changes[table] = {'upserted': rows, 'deleted': gone}
+    return seq, more, changes
+
 # ---------------- Time Off helpers ---------------- #
 
 def insert_time_off(employee_id: int, start_date: str, end_date: str, reason: str|None):
     """Insert a time off record (assumes validation already performed). Returns new row id."""
-    conn = connect_db()
+    conn = get_db()
     cur = conn.cursor()
     cur.execute(
         "INSERT INTO time_off (employee_id, start_date, end_date, reason) VALUES (?, ?, ?, ?)",
@@ -414,12 +1701,11 @@ def insert_time_off(employee_id: int, start_date: str, end_date: str, reason: st
     )
     new_id = int(cur.lastrowid or 0)
     conn.commit()
-    conn.close()
     return new_id
 
 def get_time_off_overlapping(start_date: str, end_date: str):
     """Return list of time off rows that overlap the [start_date, end_date] window (inclusive)."""
-    conn = connect_db()
+    conn = get_db()
     cur = conn.cursor()
     cur.execute(
         """
@@ -431,37 +1717,30 @@ def get_time_off_overlapping(start_date: str, end_date: str):
         (start_date, end_date)
     )
     rows = cur.fetchall()
-    conn.close()
     return rows
 
 def delete_time_off(time_off_id: int) -> bool:
     """Delete a time off row. Returns True if a row was deleted, else False."""
-    conn = connect_db()
+    conn = get_db()
     cur = conn.cursor()
     cur.execute("DELETE FROM time_off WHERE id = ?", (time_off_id,))
     deleted = cur.rowcount > 0
     conn.commit()
-    conn.close()
     return deleted
 
 def employee_exists(employee_id: int) -> bool:
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("SELECT 1 FROM employees WHERE id = ? LIMIT 1", (employee_id,))
-    found = cur.fetchone() is not None
-    conn.close()
-    return found
+    ids = _cache.get('employee_ids', 'employees', lambda: frozenset(e['id'] for e in _load_employees()))
+    return employee_id in ids
 
 def get_time_off_by_id(time_off_id: int):
-    conn = connect_db()
+    conn = get_db()
     cur = conn.cursor()
     cur.execute("SELECT id, employee_id, start_date, end_date, reason FROM time_off WHERE id = ?", (time_off_id,))
     row = cur.fetchone()
-    conn.close()
     return row
 
 def update_time_off(time_off_id: int, employee_id: int, start_date: str, end_date: str, reason: str|None) -> bool:
-    conn = connect_db()
+    conn = get_db()
     cur = conn.cursor()
     cur.execute(
         "UPDATE time_off SET employee_id=?, start_date=?, end_date=?, reason=? WHERE id=?",
@@ -469,13 +1748,12 @@ def update_time_off(time_off_id: int, employee_id: int, start_date: str, end_dat
     )
     changed = cur.rowcount > 0
     conn.commit()
-    conn.close()
     return changed
 
 # ---- Pay adjustments helpers ----
 
 def insert_adjustment(employee_id: int, date: str, amount: float, note: str|None) -> int:
-    conn = connect_db()
+    conn = get_db()
     cur = conn.cursor()
     cur.execute(
         "INSERT INTO pay_adjustments (employee_id, date, amount, note) VALUES (?, ?, ?, ?)",
@@ -483,21 +1761,371 @@ def insert_adjustment(employee_id: int, date: str, amount: float, note: str|None
     )
     new_id = cur.lastrowid
     conn.commit()
-    conn.close()
     return int(new_id if new_id is not None else -1)
 
+def get_payroll_summary(start_iso_date: str, end_iso_date: str):
+    """Per-employee worked minutes and pay adjustments for shifts starting in [start, end] (inclusive).
+    One statement: minutes are summed from the daily_employee_minutes rollup (at most one row per employee
+    per day, end defaulting to start + 60 as in shifts.end_min), adjustments over the same date range.
+    Only employees with shifts in range are returned, ordered by name.
+    Columns: employee_id, employee_name, hourly_rate, minutes, adjustments."""
+    ensure_series_materialized(end_iso_date)
+    conn = get_db()
+    return conn.execute(
+        """
+        WITH worked AS (
+            SELECT employee_id, SUM(minutes) AS minutes
+            FROM daily_employee_minutes
+            WHERE day BETWEEN date(?) AND date(?)
+            GROUP BY employee_id
+            HAVING SUM(minutes) > 0
+        ), adj AS (
+            SELECT employee_id, SUM(amount) AS total
+            FROM pay_adjustments
+            WHERE date BETWEEN date(?) AND date(?)
+            GROUP BY employee_id
+        )
+        SELECT employees.id AS employee_id, employees.name AS employee_name,
+               COALESCE(employees.hourly_rate, 16) AS hourly_rate,
+               worked.minutes AS minutes, COALESCE(adj.total, 0) AS adjustments
+        FROM worked
+        JOIN employees ON employees.id = worked.employee_id
+        LEFT JOIN adj ON adj.employee_id = worked.employee_id
+        ORDER BY employees.name COLLATE NOCASE
+        """,
+        (start_iso_date, end_iso_date, start_iso_date, end_iso_date),
+    ).fetchall()
+
+def _coverage_gaps_between(conn, start_d: date, end_d: date, window_start: int, window_end: int):
+    """coverage_gaps() for [start_d, end_d] from raw shifts: shifts of a caregiver on time off that day do
+    not count, and the previous day is read so shifts running past midnight cover the morning."""
+    query_start = (start_d - timedelta(days=1)).isoformat()
+    rows = conn.execute(
+        """
+        SELECT employee_id, shift_day, start_min, end_min
+        FROM shifts
+        WHERE shift_day BETWEEN date(?) AND date(?)
+        ORDER BY start_min
+        """,
+        (query_start, end_d.isoformat()),
+    ).fetchall()
+    off_days = expand_time_off_days(conn.execute(
+        "SELECT employee_id, start_date, end_date FROM time_off WHERE NOT(end_date < ? OR start_date > ?)",
+        (query_start, end_d.isoformat()),
+    ).fetchall())
+    intervals = [
+        (r['start_min'], r['end_min']) for r in rows
+        if r['start_min'] is not None and (r['employee_id'], r['shift_day']) not in off_days
+    ]
+    return coverage_gaps(intervals, start_d, end_d, window_start, window_end)
+
+def _fill_daily_coverage(conn, start_d: date, end_d: date, window_start: int, window_end: int) -> int:
+    """Compute and store daily_coverage for every day in [start_d, end_d]; returns the number of days."""
+    gaps = _coverage_gaps_between(conn, start_d, end_d, window_start, window_end)
+    width = window_end - window_start
+    rows = []
+    d = start_d
+    while d <= end_d:
+        day = d.isoformat()
+        day_gaps = gaps.get(day, ())
+        gap = sum(b - a for a, b in day_gaps)
+        rows.append((day, window_start, window_end, width - gap, gap, ','.join(f'{a}-{b}' for a, b in day_gaps)))
+        d += timedelta(days=1)
+    conn.executemany(
+        """
+        INSERT OR REPLACE INTO daily_coverage (day, window_start, window_end, covered_minutes, gap_minutes, gaps)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        rows,
+    )
+    return len(rows)
+
+def get_daily_coverage(start_iso_date: str, end_iso_date: str, window_start: int, window_end: int):
+    """{day: (covered_minutes, [(gap_start, gap_end), ...])} for every day in [start, end], gap bounds in
+    minutes after midnight. Read from the daily_coverage rollup; days the triggers invalidated (or that were
+    computed for another window) are recomputed from shifts and stored first, under BEGIN IMMEDIATE so a
+    concurrent write cannot slip in between computing and storing them."""
+    ensure_series_materialized(end_iso_date)
+    conn = get_db()
+    start_d, end_d = date.fromisoformat(start_iso_date), date.fromisoformat(end_iso_date)
+    expected = (end_d - start_d).days + 1
+    sql = """
+        SELECT day, covered_minutes, gaps FROM daily_coverage
+        WHERE day BETWEEN ? AND ? AND window_start = ? AND window_end = ?
+    """
+    args = (start_iso_date, end_iso_date, window_start, window_end)
+    rows = conn.execute(sql, args).fetchall()
+    if len(rows) < expected:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            have = {r['day'] for r in conn.execute(sql, args).fetchall()}
+            missing = [d for d in (start_d + timedelta(days=i) for i in range(expected)) if d.isoformat() not in have]
+            # One sweep over the span of missing days; typically one short run after an edit
+            if missing:
+                _fill_daily_coverage(conn, missing[0], missing[-1], window_start, window_end)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        rows = conn.execute(sql, args).fetchall()
+    return {
+        r['day']: (r['covered_minutes'], [tuple(int(x) for x in g.split('-')) for g in r['gaps'].split(',')] if r['gaps'] else [])
+        for r in rows
+    }
+
+def rebuild_rollups(window_start: int, window_end: int, through_iso_date: str | None = None):
+    """Recompute daily_employee_minutes and daily_coverage from scratch in one write transaction.
+    Coverage is filled from the first shift or time off day through `through_iso_date` (default: the last
+    one, after materializing series that far). Returns (employee_day_rows, coverage_days)."""
+    conn = get_db()
+    if through_iso_date:
+        ensure_series_materialized(through_iso_date)
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        _rebuild_employee_minutes(conn)
+        conn.execute('DELETE FROM daily_coverage')
+        first, last = conn.execute(
+            """
+            SELECT MIN(d), MAX(d) FROM (
+                SELECT MIN(shift_day) AS d FROM shifts UNION ALL SELECT MAX(shift_day) FROM shifts
+                UNION ALL SELECT MIN(start_date) FROM time_off UNION ALL SELECT MAX(end_date) FROM time_off
+            )
+            """
+        ).fetchone()
+        last = through_iso_date or last
+        days = 0
+        if first and last and first <= last:
+            days = _fill_daily_coverage(conn, date.fromisoformat(first), date.fromisoformat(last), window_start, window_end)
+        employee_days = conn.execute('SELECT COUNT(*) FROM daily_employee_minutes').fetchone()[0]
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return employee_days, days
+
+# ---------------- Table versions (conditional GET) ---------------- #
+
+_table_versions = threading.local()
+
+def get_table_versions(tables):
+    """Current write version of each table (TABLE_VERSION_COUNTERS), in order. The counters are re-read only
+    when this thread's connection has seen a commit since the last call: PRAGMA data_version moves when
+    another connection commits, total_changes when this one writes. Otherwise no table is touched."""
+    conn = get_db()
+    key = (id(conn), conn.execute('PRAGMA data_version').fetchone()[0], conn.total_changes)
+    snapshot = getattr(_table_versions, 'snapshot', None)
+    if snapshot is None or snapshot[0] != key:
+        names = list(TABLE_VERSION_COUNTERS.values())
+        rows = conn.execute(
+            f"SELECT name, value FROM change_counters WHERE name IN ({','.join('?' * len(names))})", names
+        ).fetchall()
+        snapshot = (key, {name: value for name, value in rows})
+        _table_versions.snapshot = snapshot
+    return tuple(snapshot[1].get(TABLE_VERSION_COUNTERS[t], 0) for t in tables)
+
+# ---------------- Dashboard counters (stat_counters, see STAT_COUNTERS) ---------------- #
+
+def get_stat_totals():
+    """{name: value} of the running totals (bucket ''): employees, tasks, shifts, attendance:<status>."""
+    conn = get_db()
+    return {r['name']: r['value'] for r in conn.execute("SELECT name, value FROM stat_counters WHERE bucket = ''")}
+
+def get_stat_buckets(names, first_bucket: str, last_bucket: str):
+    """{name: {bucket: value}} for the given counters over [first_bucket, last_bucket] (buckets compare as text:
+    week buckets are the Monday's ISO date, month buckets 'YYYY-MM'). Empty buckets are absent."""
+    names = list(names)
+    conn = get_db()
+    out = {name: {} for name in names}
+    for r in conn.execute(
+        f"""
+        SELECT name, bucket, value FROM stat_counters
+        WHERE name IN ({','.join('?' * len(names))}) AND bucket BETWEEN ? AND ?
+        """,
+        (*names, first_bucket, last_bucket),
+    ):
+        out[r['name']][r['bucket']] = r['value']
+    return out
+
+def check_stat_counters(repair: bool = False):
+    """Recount every counter from its table and compare with stat_counters. Returns the differences as
+    (name, bucket, stored, actual) with missing rows as 0. With repair=True the table is rewritten from the
+    recount in the same BEGIN IMMEDIATE transaction, so no write can land between counting and fixing."""
+    conn = get_db()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        actual = {(r[0], r[1]): r[2] for r in conn.execute(_stat_counter_recount_sql())}
+        stored = {(r[0], r[1]): r[2] for r in conn.execute('SELECT name, bucket, value FROM stat_counters')}
+        diffs = sorted(
+            (name, bucket, stored.get((name, bucket), 0), actual.get((name, bucket), 0))
+            for name, bucket in actual.keys() | stored.keys()
+            if stored.get((name, bucket), 0) != actual.get((name, bucket), 0)
+        )
+        if repair and diffs:
+            _recount_stat_counters(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return diffs
+
+# ---------------- Export helpers (cursors are iterated lazily by the streaming routes) ---------------- #
+
+def iter_shift_export_rows(start_iso_date: str, end_iso_date: str):
+    """Cursor over shifts starting in [start, end] with caregiver names, ordered by start.
+    Columns: id, shift_day, employee_id, name, start_local, end_local, minutes, series_id
+    (start_local/end_local are 'YYYY-MM-DD HH:MM'; end falls back to start + 60 like the reports).
+    Rows stream straight from SQLite: the range index yields days in order, so only each day is sorted."""
+    ensure_series_materialized(end_iso_date)
+    conn = get_db()
+    return conn.execute(
+        """
+        SELECT shifts.id, shifts.shift_day, shifts.employee_id, employees.name,
+               strftime('%Y-%m-%d %H:%M', shifts.start_min * 60, 'unixepoch') AS start_local,
+               strftime('%Y-%m-%d %H:%M', shifts.end_min * 60, 'unixepoch') AS end_local,
+               shifts.end_min - shifts.start_min AS minutes, shifts.series_id
+        FROM shifts
+        JOIN employees ON shifts.employee_id = employees.id
+        WHERE shifts.shift_day BETWEEN date(?) AND date(?) AND shifts.start_min IS NOT NULL
+        ORDER BY shifts.shift_day, shifts.start_min
+        """,
+        (start_iso_date, end_iso_date),
+    )
+
+def iter_time_off_export_rows(start_date: str, end_date: str):
+    """Cursor over time off rows overlapping [start, end] with caregiver names."""
+    conn = get_db()
+    return conn.execute(
+        """
+        SELECT time_off.id, time_off.employee_id, employees.name, time_off.start_date, time_off.end_date, time_off.reason
+        FROM time_off
+        JOIN employees ON time_off.employee_id = employees.id
+        WHERE NOT(time_off.end_date < ? OR time_off.start_date > ?)
+        ORDER BY time_off.start_date, time_off.employee_id
+        """,
+        (start_date, end_date),
+    )
+
+def get_export_fingerprint(start_iso_date: str, end_iso_date: str, include_time_off: bool = False):
+    """Cheap summary of everything an export of [start, end] depends on, for ETags.
+    Aggregates over the covering shift index plus the (small) employees/time_off tables; any insert,
+    delete, time edit or caregiver swap in range changes it."""
+    ensure_series_materialized(end_iso_date)
+    conn = get_db()
+    parts = [tuple(conn.execute(
+        """
+        SELECT COUNT(*), TOTAL(id), TOTAL(start_min), TOTAL(end_min), TOTAL(employee_id * start_min)
+        FROM shifts
+        WHERE shift_day BETWEEN date(?) AND date(?)
+        """,
+        (start_iso_date, end_iso_date),
+    ).fetchone())]
+    parts.append(conn.execute("SELECT group_concat(id || ':' || name, '|') FROM employees").fetchone()[0])
+    if include_time_off:
+        parts.append(conn.execute(
+            """
+            SELECT group_concat(id || ':' || employee_id || ':' || start_date || ':' || end_date || ':' || COALESCE(reason, ''), '|')
+            FROM time_off
+            WHERE NOT(end_date < ? OR start_date > ?)
+            """,
+            (start_iso_date, end_iso_date),
+        ).fetchone()[0])
+    return tuple(parts)
+
+# ---------------- Google Calendar sync state ---------------- #
+
+_GCAL_SHIFT_COLUMNS = """
+    SELECT shifts.id, employees.name, shifts.shift_day,
+           strftime('%Y-%m-%d %H:%M', shifts.start_min * 60, 'unixepoch') AS start_local,
+           strftime('%Y-%m-%d %H:%M', shifts.end_min * 60, 'unixepoch') AS end_local,
+           st.content_hash, st.event_id
+    FROM shifts
+    JOIN employees ON shifts.employee_id = employees.id
+    LEFT JOIN gcal_sync_state st ON st.calendar_id = ? AND st.shift_id = shifts.id
+"""
+
+def get_gcal_sync_plan(calendar_id: str, start_iso_date: str, end_iso_date: str):
+    """Local diff for an incremental Google Calendar sync; costs no API calls.
+    Returns dict with:
+      seq      change_counters value this plan covers (store with set_gcal_sync_cursor after a clean run)
+      upserts  rows (id, name, shift_day, start_local, end_local, content_hash, event_id) changed since the
+               last clean run (if in the window or already pushed) or in the window and never pushed
+      deletes  rows (shift_id, event_id) pushed earlier whose shift no longer exists
+    """
+    ensure_series_materialized(end_iso_date)
+    conn = get_db()
+    seq = conn.execute("SELECT value FROM change_counters WHERE name = 'shifts'").fetchone()[0]
+    cursor_row = conn.execute("SELECT last_seq FROM gcal_sync_cursor WHERE calendar_id = ?", (calendar_id,)).fetchone()
+    last_seq = cursor_row[0] if cursor_row else 0
+    upserts = {}
+    if seq > last_seq:
+        for r in conn.execute(_GCAL_SHIFT_COLUMNS + " WHERE shifts.change_seq > ?", (calendar_id, last_seq)):
+            if r['event_id'] is not None or start_iso_date <= r['shift_day'] <= end_iso_date:
+                upserts[r['id']] = r
+    # New to the window (window moved forward, or state was reset)
+    for r in conn.execute(
+        _GCAL_SHIFT_COLUMNS + " WHERE shifts.shift_day BETWEEN date(?) AND date(?) AND st.shift_id IS NULL",
+        (calendar_id, start_iso_date, end_iso_date),
+    ):
+        upserts[r['id']] = r
+    deletes = conn.execute(
+        """
+        SELECT shift_id, event_id FROM gcal_sync_state
+        WHERE calendar_id = ? AND shift_id NOT IN (SELECT id FROM shifts)
+        """,
+        (calendar_id,),
+    ).fetchall()
+    return { 'seq': seq, 'upserts': list(upserts.values()), 'deletes': deletes }
+
+def record_gcal_pushed(calendar_id: str, items):
+    """items: iterable of (shift_id, event_id, content_hash, remote_etag) that are now on the calendar."""
+    conn = get_db()
+    with conn:
+        conn.executemany(
+            """
+            INSERT OR REPLACE INTO gcal_sync_state (calendar_id, shift_id, event_id, content_hash, remote_etag, synced_at)
+            VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            """,
+            [(calendar_id, sid, eid, h, etag) for sid, eid, h, etag in items],
+        )
+
+def forget_gcal_pushed(calendar_id: str, shift_ids):
+    """Drop sync state for shifts whose events were deleted (or should be re-pushed from scratch)."""
+    conn = get_db()
+    with conn:
+        conn.executemany(
+            "DELETE FROM gcal_sync_state WHERE calendar_id = ? AND shift_id = ?",
+            [(calendar_id, sid) for sid in shift_ids],
+        )
+
+def set_gcal_sync_cursor(calendar_id: str, seq: int):
+    conn = get_db()
+    with conn:
+        conn.execute(
+            """
+            INSERT INTO gcal_sync_cursor (calendar_id, last_seq, synced_at) VALUES (?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(calendar_id) DO UPDATE SET last_seq = excluded.last_seq, synced_at = excluded.synced_at
+            """,
+            (calendar_id, seq),
+        )
+
+def reset_gcal_sync_state(calendar_id: str):
+    """Forget everything pushed to calendar_id so the next run re-pushes the whole window."""
+    conn = get_db()
+    with conn:
+        conn.execute("DELETE FROM gcal_sync_state WHERE calendar_id = ?", (calendar_id,))
+        conn.execute("DELETE FROM gcal_sync_cursor WHERE calendar_id = ?", (calendar_id,))
+
 def get_adjustments_between(start_date: str, end_date: str):
-    conn = connect_db()
+    conn = get_db()
     cur = conn.cursor()
     cur.execute(
         """
         SELECT id, employee_id, date, amount, note
         FROM pay_adjustments
-        WHERE date(date) BETWEEN date(?) AND date(?)
+        WHERE date BETWEEN date(?) AND date(?)
         ORDER BY date, employee_id
         """,
         (start_date, end_date)
     )
     rows = cur.fetchall()
-    conn.close()
     return rows
\ No newline at end of file
@@ -0,0 +1,128 @@
+"""
+Streaming export formats (CSV and iCalendar) built as generators over database cursors.
+
+Nothing here touches Flask or SQLite directly: routes pass in row iterables and wrap the
+generators in a streaming Response, so memory stays flat regardless of the date range.
+"""
+
+import csv
+import io
+from datetime import date, datetime, timedelta, timezone
+
+# Flush to the client roughly every this many bytes (keeps chunk overhead low without buffering everything)
+STREAM_CHUNK_BYTES = 64 * 1024
+
+
+def csv_stream(header, rows):
+    """Yield CSV text in ~STREAM_CHUNK_BYTES chunks. `rows` is any iterable of sequences."""
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator='\n')
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow(row)
+        if buf.tell() >= STREAM_CHUNK_BYTES:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate(0)
+    if buf.tell():
+        yield buf.getvalue()
+
+
+# --- iCalendar (RFC 5545) ---
+
+def _ics_escape(text):
+    return (
+        str(text or '')
+        .replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+    )
+
+
+def _ics_fold(line):
+    """Fold a content line to 75 octets per RFC 5545 (continuation lines start with a space)."""
+    raw = line.encode('utf-8')
+    if len(raw) <= 75:
+        return line + '\r\n'
+    out = []
+    limit = 75
+    while raw:
+        cut = min(limit, len(raw))
+        # never split inside a UTF-8 sequence
+        while cut < len(raw) and (raw[cut] & 0xC0) == 0x80:
+            cut -= 1
+        out.append(raw[:cut].decode('utf-8'))
+        raw = raw[cut:]
+        limit = 74  # leading space takes one octet
+    return '\r\n '.join(out) + '\r\n'
+
+
+def _ics_local(value):
+    """'YYYY-MM-DD HH:MM' -> floating local time 'YYYYMMDDTHHMM00' (shift times carry no timezone)."""
+    return value[0:4] + value[5:7] + value[8:10] + 'T' + value[11:13] + value[14:16] + '00'
+
+
+def ics_stream(shift_rows, time_off_rows, calendar_name='Care Calendar', domain='care-calendar'):
+    """Yield an iCalendar feed: one VEVENT per shift (timed) and per time off row (all-day).
+
+    shift_rows: rows with id, name, start_local, end_local, series_id (see database.iter_shift_export_rows)
+    time_off_rows: rows with id, name, start_date, end_date, reason
+    """
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    head = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//Care Calendar//Shifts//EN',
+        'CALSCALE:GREGORIAN',
+        f'X-WR-CALNAME:{_ics_escape(calendar_name)}',
+    ]
+    buf = [_ics_fold(line) for line in head]
+    size = 0
+    for r in shift_rows:
+        lines = [
+            'BEGIN:VEVENT',
+            f'UID:shift-{r["id"]}@{domain}',
+            f'DTSTAMP:{stamp}',
+            f'DTSTART:{_ics_local(r["start_local"])}',
+            f'DTEND:{_ics_local(r["end_local"])}',
+            f'SUMMARY:{_ics_escape(r["name"])}',
+        ]
+        if r['series_id']:
+            lines.append(f'CATEGORIES:{_ics_escape("Recurring")}')
+        lines.append('END:VEVENT')
+        chunk = ''.join(_ics_fold(line) for line in lines)
+        buf.append(chunk)
+        size += len(chunk)
+        if size >= STREAM_CHUNK_BYTES:
+            yield ''.join(buf)
+            buf, size = [], 0
+    for r in time_off_rows:
+        try:
+            first = date.fromisoformat(r['start_date'])
+            last = date.fromisoformat(r['end_date'])
+        except (TypeError, ValueError):
+            continue
+        summary = f'{r["name"]} (Time Off)'
+        lines = [
+            'BEGIN:VEVENT',
+            f'UID:time-off-{r["id"]}@{domain}',
+            f'DTSTAMP:{stamp}',
+            f'DTSTART;VALUE=DATE:{first.strftime("%Y%m%d")}',
+            # DTEND is exclusive for all-day events
+            f'DTEND;VALUE=DATE:{(last + timedelta(days=1)).strftime("%Y%m%d")}',
+            f'SUMMARY:{_ics_escape(summary)}',
+            'TRANSP:TRANSPARENT',
+        ]
+        if r['reason']:
+            lines.append(f'DESCRIPTION:{_ics_escape(r["reason"])}')
+        lines.append('END:VEVENT')
+        chunk = ''.join(_ics_fold(line) for line in lines)
+        buf.append(chunk)
+        size += len(chunk)
+        if size >= STREAM_CHUNK_BYTES:
+            yield ''.join(buf)
+            buf, size = [], 0
+    buf.append(_ics_fold('END:VCALENDAR'))
+    yield ''.join(buf)
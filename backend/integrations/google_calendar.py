@@ -1,23 +1,37 @@
 import os
+import json
+import random
+import hashlib
+import threading
+import time
 from datetime import datetime, timedelta
-from typing import Iterable, Dict, Optional, Set
+from typing import Iterable, Dict, List, Optional, Set, Tuple
 
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from google.auth.transport.requests import Request
+# google-auth / googleapiclient are imported inside the functions that talk to the API: importing
+# them costs ~0.3s here (seconds on a Pi), and a sync run with nothing to push never needs them.
 
 SCOPES = ["https://www.googleapis.com/auth/calendar"]
 
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
-SECRETS_DIR = os.path.join(ROOT, ".secrets")
+SECRETS_DIR = os.getenv("CARE_GOOGLE_SECRETS_DIR") or os.path.join(ROOT, ".secrets")
 CLIENT_SECRET = os.path.join(SECRETS_DIR, "client_secret.json")
 TOKEN_FILE = os.path.join(SECRETS_DIR, "token.json")
 
 CARE_TZ = os.getenv("CARE_TZ", "America/New_York")
 CALENDAR_ID = os.getenv("GOOGLE_CALENDAR_ID") or "primary"
 
+# Point at a local fake server (e.g. scripts/fake_google_calendar.py) instead of Google; no credentials are used then
+API_ROOT = os.getenv("GOOGLE_CALENDAR_API_ROOT")
+BATCH_SIZE = 50  # Calendar API limit per batch request
+MAX_RETRIES = int(os.getenv("GOOGLE_CALENDAR_MAX_RETRIES", "5"))
+BACKOFF_BASE_S = float(os.getenv("GOOGLE_CALENDAR_BACKOFF_S", "1.0"))
+BACKOFF_MAX_S = 32.0
+
+
+def _load_creds():
+    from google.oauth2.credentials import Credentials
+    from google.auth.transport.requests import Request
 
-def _load_creds() -> Credentials:
     os.makedirs(SECRETS_DIR, exist_ok=True)
     creds = None
     if os.path.exists(TOKEN_FILE):
@@ -33,9 +47,32 @@ def _load_creds() -> Credentials:
     return creds
 
 
+_service_lock = threading.Lock()
+_service_cache = None
+
+
 def _service():
-    creds = _load_creds()
-    return build("calendar", "v3", credentials=creds, cache_discovery=False)
+    """Build the Calendar client once per process (credentials refresh themselves on expiry)."""
+    global _service_cache
+    with _service_lock:
+        if _service_cache is None:
+            from googleapiclient.discovery import build
+            if API_ROOT:
+                import httplib2
+                _service_cache = build(
+                    "calendar", "v3", http=httplib2.Http(), static_discovery=True,
+                    client_options={"api_endpoint": API_ROOT.rstrip("/") + "/calendar/v3/"},
+                )
+            else:
+                _service_cache = build("calendar", "v3", credentials=_load_creds(), cache_discovery=False)
+        return _service_cache
+
+
+def _new_batch(svc, callback):
+    if API_ROOT:
+        from googleapiclient.http import BatchHttpRequest
+        return BatchHttpRequest(callback=callback, batch_uri=API_ROOT.rstrip("/") + "/batch/calendar/v3")
+    return svc.new_batch_http_request(callback=callback)
 
 
 def _event_body(shift: Dict) -> Dict:
@@ -46,6 +83,7 @@ def _event_body(shift: Dict) -> Dict:
       - date (YYYY-MM-DD) OR shift_time (ISO with time)
       - start_time (HH:MM) optional if using separate date/time
       - end_time (HH:MM) optional
+      - end_date (YYYY-MM-DD) optional, for shifts that end after midnight
       - shift_time may be ISO string "YYYY-MM-DDTHH:MM[:SS]"
     """
     emp_name = shift.get("employee_name") or shift.get("name") or "Caregiver"
@@ -75,7 +113,7 @@ def _event_body(shift: Dict) -> Dict:
     use_dt = bool(start_time)
     if use_dt:
         start = f"{date_str}T{start_time}:00"
-        end = f"{date_str}T{(end_time or '23:59')}:00"
+        end = f"{shift.get('end_date') or date_str}T{(end_time or '23:59')}:00"
     else:
         # All-day
         start = date_str
@@ -92,32 +130,115 @@ def _event_body(shift: Dict) -> Dict:
     return body
 
 
-def upsert_shift(shift: Dict):
+def _http_status(exc) -> Optional[int]:
+    resp = getattr(exc, "resp", None)
+    try:
+        return int(resp.status) if resp is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_rate_limited(exc) -> bool:
+    status = _http_status(exc)
+    if status in (429, 500, 502, 503, 504):
+        return True
+    return status == 403 and any(r in str(exc) for r in ("rateLimitExceeded", "userRateLimitExceeded"))
+
+
+def execute_ops(ops: List[Dict], calendar_id: Optional[str] = None, sleep=time.sleep) -> Dict:
+    """Run event operations through the batch endpoint, BATCH_SIZE per HTTP request.
+
+    ops: dicts with kind ('insert' | 'update' | 'delete'), key (caller's id), and body (insert/update)
+         or event_id (delete).
+    Per-op outcomes are folded into follow-up rounds: insert 409 -> update, update 404/410 -> insert,
+    delete 404/410 -> done, rate limits / 5xx -> retried with exponential backoff (up to MAX_RETRIES).
+    Returns {'results': {key: event or None}, 'errors': {key: str}, 'api_calls': ops sent, 'http_requests': n}.
+    """
+    calendar_id = calendar_id or CALENDAR_ID
     svc = _service()
+    events = svc.events()  # building the resource re-parses discovery methods; do it once
+    results, errors = {}, {}
+    stats = {"api_calls": 0, "http_requests": 0}
+    pending = [dict(op, attempts=0) for op in ops]
+    round_no = 0
+    while pending:
+        retry, throttled = [], False
+        for i in range(0, len(pending), BATCH_SIZE):
+            chunk = pending[i:i + BATCH_SIZE]
+            by_id = {str(n): op for n, op in enumerate(chunk)}
+
+            def on_response(request_id, response, exception, by_id=by_id):
+                nonlocal throttled
+                op = by_id[request_id]
+                if exception is None:
+                    results[op["key"]] = response
+                    return
+                status = _http_status(exception)
+                if op["kind"] == "insert" and status == 409:
+                    retry.append(dict(op, kind="update"))
+                elif op["kind"] == "update" and status in (404, 410):
+                    retry.append(dict(op, kind="insert"))
+                elif op["kind"] == "delete" and status in (404, 410):
+                    results[op["key"]] = None
+                elif _is_rate_limited(exception) and op["attempts"] < MAX_RETRIES:
+                    throttled = True
+                    retry.append(dict(op, attempts=op["attempts"] + 1))
+                else:
+                    errors[op["key"]] = str(exception)
+
+            batch = _new_batch(svc, on_response)
+            for n, op in by_id.items():
+                if op["kind"] == "insert":
+                    req = events.insert(calendarId=calendar_id, body=op["body"], conferenceDataVersion=0)
+                elif op["kind"] == "update":
+                    req = events.update(calendarId=calendar_id, eventId=op["body"]["id"], body=op["body"])
+                else:
+                    req = events.delete(calendarId=calendar_id, eventId=op["event_id"])
+                batch.add(req, request_id=n)
+            stats["api_calls"] += len(chunk)
+            stats["http_requests"] += 1
+            try:
+                batch.execute()
+            except Exception as e:
+                # The whole batch request failed (network, 5xx, 429 on the batch itself)
+                if not _is_rate_limited(e) and _http_status(e) is not None:
+                    for op in chunk:
+                        errors[op["key"]] = str(e)
+                    continue
+                throttled = True
+                for op in chunk:
+                    if op["attempts"] < MAX_RETRIES:
+                        retry.append(dict(op, attempts=op["attempts"] + 1))
+                    else:
+                        errors[op["key"]] = str(e)
+        pending = retry
+        if pending and throttled:
+            sleep(min(BACKOFF_MAX_S, BACKOFF_BASE_S * (2 ** round_no)) + random.uniform(0, BACKOFF_BASE_S))
+            round_no += 1
+    return {"results": results, "errors": errors, **stats}
+
+
+def upsert_shift(shift: Dict):
     body = _event_body(shift)
-    try:
-        return svc.events().insert(calendarId=CALENDAR_ID, body=body, conferenceDataVersion=0).execute()
-    except Exception as e:
-        # Update if exists
-        if any(x in str(e) for x in ("409", "Already exists", "duplicate")):
-            return svc.events().update(calendarId=CALENDAR_ID, eventId=body["id"], body=body).execute()
-        raise
+    out = execute_ops([{"kind": "insert", "key": body["id"], "body": body}])
+    if out["errors"]:
+        raise RuntimeError(out["errors"][body["id"]])
+    return out["results"][body["id"]]
 
 
 def delete_shift_event(shift_id: int):
-    svc = _service()
     eid = f"shift-{shift_id}"
-    try:
-        svc.events().delete(calendarId=CALENDAR_ID, eventId=eid).execute()
-    except Exception as e:
-        if "404" in str(e):
-            return
-        raise
+    out = execute_ops([{"kind": "delete", "key": eid, "event_id": eid}])
+    if out["errors"]:
+        raise RuntimeError(out["errors"][eid])
 
 
 def bulk_sync(shifts: Iterable[Dict]):
+    ops = []
     for s in shifts:
-        upsert_shift(s)
+        body = _event_body(s)
+        ops.append({"kind": "insert", "key": body["id"], "body": body})
+    return execute_ops(ops)
 
 
 def list_shift_event_ids_between(time_min_rfc3339: str, time_max_rfc3339: str) -> Set[str]:
@@ -156,12 +277,69 @@ def reconcile_window(db_shift_ids: Set[int], start: datetime, end: datetime) ->
     to_delete = existing - db_ids
     if not to_delete:
         return 0
-    svc = _service()
-    count = 0
-    for eid in to_delete:
-        try:
-            svc.events().delete(calendarId=CALENDAR_ID, eventId=eid).execute()
-            count += 1
-        except Exception:
-            pass
-    return count
+    out = execute_ops([{"kind": "delete", "key": eid, "event_id": eid} for eid in to_delete])
+    return len(out["results"])
+
+
+def shift_from_row(row) -> Dict:
+    """Split-field shift dict for _event_body from a sync/export row (start_local/end_local 'YYYY-MM-DD HH:MM')."""
+    return {
+        "id": row["id"],
+        "employee_name": row["name"],
+        "date": row["start_local"][:10],
+        "start_time": row["start_local"][11:16],
+        "end_date": row["end_local"][:10],
+        "end_time": row["end_local"][11:16],
+    }
+
+
+def content_hash(body: Dict) -> str:
+    return hashlib.sha1(json.dumps(body, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def incremental_sync(start, end, calendar_id: Optional[str] = None) -> Dict[str, int]:
+    """Push only shifts inserted/updated/deleted since the last clean run, within [start, end] dates.
+
+    Rows whose event body hashes to what was last pushed are skipped, so a run with no changes
+    makes zero API calls; the rest go out through execute_ops() in batches. The cursor only
+    advances when every operation succeeded; failed rows are retried next run.
+    Returns counts: upserted, deleted, unchanged, failed, api_calls, http_requests.
+    """
+    from database import (  # imported lazily: this module is also used standalone by the OAuth scripts
+        get_gcal_sync_plan, record_gcal_pushed, forget_gcal_pushed, set_gcal_sync_cursor,
+    )
+    calendar_id = calendar_id or CALENDAR_ID
+    plan = get_gcal_sync_plan(calendar_id, start.isoformat(), end.isoformat())
+    stats = {"upserted": 0, "deleted": 0, "unchanged": 0, "failed": 0, "api_calls": 0, "http_requests": 0}
+    ops, digests = [], {}
+    for row in plan["upserts"]:
+        body = _event_body(shift_from_row(row))
+        digest = content_hash(body)
+        if digest == row["content_hash"]:
+            stats["unchanged"] += 1
+            continue
+        digests[row["id"]] = (body["id"], digest)
+        # Known events go straight to update instead of insert-then-409
+        ops.append({"kind": "update" if row["event_id"] is not None else "insert", "key": ("u", row["id"]), "body": body})
+    for row in plan["deletes"]:
+        ops.append({"kind": "delete", "key": ("d", row["shift_id"]), "event_id": row["event_id"]})
+    if not ops:
+        set_gcal_sync_cursor(calendar_id, plan["seq"])
+        return stats
+
+    out = execute_ops(ops, calendar_id)
+    stats["api_calls"], stats["http_requests"] = out["api_calls"], out["http_requests"]
+    stats["failed"] = len(out["errors"])
+    pushed, gone = [], []
+    for (kind, shift_id), event in out["results"].items():
+        if kind == "u":
+            event_id, digest = digests[shift_id]
+            pushed.append((shift_id, event_id, digest, (event or {}).get("etag")))
+        else:
+            gone.append(shift_id)
+    record_gcal_pushed(calendar_id, pushed)
+    forget_gcal_pushed(calendar_id, gone)
+    stats["upserted"], stats["deleted"] = len(pushed), len(gone)
+    if not stats["failed"]:
+        set_gcal_sync_cursor(calendar_id, plan["seq"])
+    return stats
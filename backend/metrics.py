@@ -0,0 +1,185 @@
+"""
+In-process metrics registry: request latency histograms, status counts, SQLite query
+accounting and password-hash verify timings, rendered as Prometheus text for /metrics.
+
+No Flask here: app.py records requests from its before/after hooks and database.py reports
+each statement through note_query(). Recording a request is a few dict/deque operations under
+one lock and per-statement accounting is thread-local, so it stays cheap on the Pi; quantiles
+are only computed when /metrics is read.
+"""
+
+import bisect
+import threading
+import time
+from collections import deque
+
+# Cumulative histogram buckets for request latency (seconds), Prometheus-style
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Recent samples kept per endpoint for p50/p95/p99 (and per timer for rolling averages)
+WINDOW = 512
+QUANTILES = (0.5, 0.95, 0.99)
+
+_started = time.time()
+_local = threading.local()
+
+
+def _quantile(sorted_values, q):
+    if not sorted_values:
+        return None
+    idx = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[idx]
+
+
+class _Series:
+    """Latency histogram (cumulative since start) plus a rolling window of recent samples."""
+
+    __slots__ = ('buckets', 'count', 'total', 'recent')
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)  # last slot is +Inf
+        self.count = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=WINDOW)
+
+    def observe(self, seconds):
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.recent.append(seconds)
+
+
+class _Endpoint:
+    __slots__ = ('latency', 'statuses', 'db_queries', 'db_seconds')
+
+    def __init__(self):
+        self.latency = _Series()
+        self.statuses = {}
+        self.db_queries = 0
+        self.db_seconds = 0.0
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}   # (endpoint, method) -> _Endpoint
+        self._timers = {}      # name -> _Series (login lookup, hash verify, ...)
+
+    def observe_request(self, endpoint, method, status, seconds, db_queries=0, db_seconds=0.0):
+        key = (endpoint, method)
+        with self._lock:
+            ep = self._endpoints.get(key)
+            if ep is None:
+                ep = self._endpoints[key] = _Endpoint()
+            ep.latency.observe(seconds)
+            ep.statuses[status] = ep.statuses.get(status, 0) + 1
+            ep.db_queries += db_queries
+            ep.db_seconds += db_seconds
+
+    def observe_timer(self, name, seconds):
+        with self._lock:
+            series = self._timers.get(name)
+            if series is None:
+                series = self._timers[name] = _Series()
+            series.observe(seconds)
+
+    def render_prometheus(self, extra_counters=None, extra_gauges=None, info=None):
+        """Prometheus text exposition (version 0.0.4).
+
+        extra_counters / extra_gauges: {metric_name: {label_tuple_or_None: value}} appended as-is
+        (used for pool and cache stats, which live in database.py). info: {label: value} for care_info.
+        """
+        lines = []
+        with self._lock:
+            items = sorted(self._endpoints.items())
+            lines.append('# HELP care_http_request_duration_seconds Request latency by endpoint.')
+            lines.append('# TYPE care_http_request_duration_seconds histogram')
+            for (endpoint, method), ep in items:
+                labels = f'endpoint="{_esc(endpoint)}",method="{method}"'
+                cumulative = 0
+                for bound, n in zip(LATENCY_BUCKETS, ep.latency.buckets):
+                    cumulative += n
+                    lines.append(f'care_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'care_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {ep.latency.count}')
+                lines.append(f'care_http_request_duration_seconds_sum{{{labels}}} {ep.latency.total:.6f}')
+                lines.append(f'care_http_request_duration_seconds_count{{{labels}}} {ep.latency.count}')
+
+            lines.append(f'# HELP care_http_request_recent_seconds Latency quantiles over the last {WINDOW} requests per endpoint.')
+            lines.append('# TYPE care_http_request_recent_seconds summary')
+            for (endpoint, method), ep in items:
+                labels = f'endpoint="{_esc(endpoint)}",method="{method}"'
+                recent = sorted(ep.latency.recent)
+                for q in QUANTILES:
+                    v = _quantile(recent, q)
+                    if v is not None:
+                        lines.append(f'care_http_request_recent_seconds{{{labels},quantile="{q}"}} {v:.6f}')
+                lines.append(f'care_http_request_recent_seconds_sum{{{labels}}} {sum(recent):.6f}')
+                lines.append(f'care_http_request_recent_seconds_count{{{labels}}} {len(recent)}')
+
+            lines.append('# HELP care_http_requests_total Requests by endpoint and status code.')
+            lines.append('# TYPE care_http_requests_total counter')
+            for (endpoint, method), ep in items:
+                for status, n in sorted(ep.statuses.items()):
+                    lines.append(
+                        f'care_http_requests_total{{endpoint="{_esc(endpoint)}",method="{method}",status="{status}"}} {n}'
+                    )
+
+            lines.append('# HELP care_db_queries_total SQLite statements executed while serving each endpoint.')
+            lines.append('# TYPE care_db_queries_total counter')
+            for (endpoint, method), ep in items:
+                lines.append(f'care_db_queries_total{{endpoint="{_esc(endpoint)}",method="{method}"}} {ep.db_queries}')
+            lines.append('# HELP care_db_query_seconds_total Time spent in SQLite execute/fetch while serving each endpoint.')
+            lines.append('# TYPE care_db_query_seconds_total counter')
+            for (endpoint, method), ep in items:
+                lines.append(f'care_db_query_seconds_total{{endpoint="{_esc(endpoint)}",method="{method}"}} {ep.db_seconds:.6f}')
+
+            lines.append('# HELP care_timer_seconds Rolling average of timed operations (password verify, user lookup).')
+            lines.append('# TYPE care_timer_seconds gauge')
+            for name, series in sorted(self._timers.items()):
+                recent = list(series.recent)
+                avg = sum(recent) / len(recent) if recent else 0.0
+                last = recent[-1] if recent else 0.0
+                lines.append(f'care_timer_seconds{{name="{_esc(name)}",stat="avg"}} {avg:.6f}')
+                lines.append(f'care_timer_seconds{{name="{_esc(name)}",stat="last"}} {last:.6f}')
+            lines.append('# TYPE care_timer_total counter')
+            for name, series in sorted(self._timers.items()):
+                lines.append(f'care_timer_total{{name="{_esc(name)}"}} {series.count}')
+
+        for kind, block in (('counter', extra_counters or {}), ('gauge', extra_gauges or {})):
+            for name, values in block.items():
+                lines.append(f'# TYPE {name} {kind}')
+                for labels, value in values.items():
+                    label_txt = '{' + ','.join(f'{k}="{_esc(v)}"' for k, v in labels) + '}' if labels else ''
+                    lines.append(f'{name}{label_txt} {value}')
+        if info:
+            lines.append('# TYPE care_info gauge')
+            label_txt = ','.join(f'{k}="{_esc(v)}"' for k, v in sorted(info.items()))
+            lines.append(f'care_info{{{label_txt}}} 1')
+        lines.append('# TYPE care_uptime_seconds gauge')
+        lines.append(f'care_uptime_seconds {time.time() - _started:.1f}')
+        return '\n'.join(lines) + '\n'
+
+
+def _esc(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = Registry()
+
+
+# --- per-request SQLite accounting (thread-local; one request per thread at a time) ---
+
+def begin_request():
+    _local.queries = 0
+    _local.db_seconds = 0.0
+
+
+def request_db_usage():
+    """(queries, seconds) recorded on this thread since begin_request()."""
+    return getattr(_local, 'queries', 0), getattr(_local, 'db_seconds', 0.0)
+
+
+def note_query(seconds, count=1):
+    """Called by database.py for each statement (count=1) and fetch (count=0) on a metered connection.
+    Lock-free: totals are folded into the registry once per request by observe_request()."""
+    _local.queries = getattr(_local, 'queries', 0) + count
+    _local.db_seconds = getattr(_local, 'db_seconds', 0.0) + seconds
@@ -0,0 +1,222 @@
+"""
+Pure scheduling computations over shift intervals (no Flask, no SQLite).
+
+Intervals are half-open [start, end) in epoch minutes, matching shifts.start_min/end_min.
+"""
+
+from bisect import bisect_left
+from datetime import date, datetime, timedelta
+
+_EPOCH = date(1970, 1, 1)
+_EPOCH_ORDINAL = _EPOCH.toordinal()
+
+
+def day_start_min(d: date) -> int:
+    """Epoch minutes at midnight of `d` (same clock as shifts.start_min, which strftime('%s') reads as UTC)."""
+    return (d - _EPOCH).days * 1440
+
+
+def merge_intervals(intervals):
+    """Sort-and-sweep merge of (start, end) pairs into disjoint, ascending intervals.
+    Touching intervals (a.end == b.start) are merged."""
+    merged = []
+    for start, end in sorted(intervals):
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def coverage_gaps(intervals, start_date: date, end_date: date, window_start: int, window_end: int):
+    """Return {day_iso: [(gap_start, gap_end), ...]} of uncovered minutes per day.
+
+    intervals: iterable of (start_min, end_min) in epoch minutes (may span midnight).
+    window_start/window_end: minutes after midnight of the daily coverage window (end > start).
+    Gap bounds are returned as minutes after midnight; days that are fully covered are omitted.
+    One merge over all intervals, then a single forward walk across the days (O(n log n + days)).
+    """
+    merged = merge_intervals(intervals)
+    gaps = {}
+    i = 0
+    d = start_date
+    while d <= end_date:
+        base = day_start_min(d)
+        w0, w1 = base + window_start, base + window_end
+        # merged intervals are disjoint and sorted, so anything ending before this window is done for good
+        while i < len(merged) and merged[i][1] <= w0:
+            i += 1
+        cursor = w0
+        day_gaps = []
+        j = i
+        while j < len(merged) and merged[j][0] < w1:
+            s, e = merged[j]
+            if s > cursor:
+                day_gaps.append((cursor - base, s - base))
+            cursor = max(cursor, e)
+            if cursor >= w1:
+                break
+            j += 1
+        if cursor < w1:
+            day_gaps.append((cursor - base, w1 - base))
+        if day_gaps:
+            gaps[d.isoformat()] = day_gaps
+        d += timedelta(days=1)
+    return gaps
+
+
+def expand_time_off_days(rows):
+    """Set of (employee_id, 'YYYY-MM-DD') covered by time_off rows (start_date/end_date inclusive)."""
+    days = set()
+    for r in rows:
+        try:
+            d = date.fromisoformat(r['start_date'])
+            last = date.fromisoformat(r['end_date'])
+        except (TypeError, ValueError):
+            continue
+        while d <= last:
+            days.add((r['employee_id'], d.isoformat()))
+            d += timedelta(days=1)
+    return days
+
+
+def _iso_minutes(value: str) -> int:
+    # Fast path for the 'YYYY-MM-DDTHH:MM[:SS]' strings the app writes; anything else goes through fromisoformat
+    if len(value) >= 16 and value[10] == 'T' and value[13] == ':':
+        return (date.fromisoformat(value[:10]).toordinal() - _EPOCH_ORDINAL) * 1440 + int(value[11:13]) * 60 + int(value[14:16])
+    dt = datetime.fromisoformat(value)
+    return day_start_min(dt.date()) + dt.hour * 60 + dt.minute
+
+
+def shift_minutes(shift_time: str, end_time: str | None = None):
+    """(start_min, end_min) of a shift from its ISO strings, with the same end fallback as shifts.end_min:
+    a missing, invalid or non-positive end time means start + 60."""
+    start = _iso_minutes(shift_time)
+    end = None
+    if end_time:
+        try:
+            end = _iso_minutes(end_time)
+        except ValueError:
+            end = None
+    if end is None or end <= start:
+        end = start + 60
+    return start, end
+
+
+class IntervalIndex:
+    """Static index of half-open [start, end) intervals for overlap probes.
+
+    Intervals are kept sorted by start next to a running maximum of their ends. A probe bisects for the
+    intervals starting before its end, then walks back while that running maximum still reaches past its
+    start, so it costs O(log n + k) when intervals rarely nest (true for one caregiver's shifts).
+    """
+
+    __slots__ = ('starts', 'ends', 'max_end', 'items')
+
+    def __init__(self, entries):
+        """entries: iterable of (start, end, item)."""
+        ordered = sorted(entries, key=lambda e: (e[0], e[1]))
+        self.starts = [e[0] for e in ordered]
+        self.ends = [e[1] for e in ordered]
+        self.items = [e[2] for e in ordered]
+        self.max_end = []
+        running = None
+        for end in self.ends:
+            running = end if running is None or end > running else running
+            self.max_end.append(running)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def overlapping(self, start, end):
+        """Items whose interval overlaps [start, end), in start order."""
+        i = bisect_left(self.starts, end)
+        found = []
+        while i > 0:
+            i -= 1
+            if self.max_end[i] <= start:
+                break
+            if self.ends[i] > start:
+                found.append(self.items[i])
+        found.reverse()
+        return found
+
+
+class ConflictIndex:
+    """Per-caregiver interval indexes over existing shifts and time off, for double-booking checks.
+
+    shift_rows need id, employee_id, series_id, shift_time, end_time, start_min, end_min;
+    time_off_rows need id, employee_id, start_date, end_date, reason (dates inclusive, whole days).
+    Build it over a window that covers every probe (see database.get_conflict_candidates).
+    """
+
+    def __init__(self, shift_rows, time_off_rows):
+        shifts, off = {}, {}
+        for r in shift_rows:
+            if r['start_min'] is None:
+                continue
+            shifts.setdefault(r['employee_id'], []).append((r['start_min'], r['end_min'], r))
+        for r in time_off_rows:
+            try:
+                first = date.fromisoformat(r['start_date'])
+                last = date.fromisoformat(r['end_date'])
+            except (TypeError, ValueError):
+                continue
+            off.setdefault(r['employee_id'], []).append(
+                (day_start_min(first), day_start_min(last + timedelta(days=1)), r)
+            )
+        self._shifts = {emp: IntervalIndex(entries) for emp, entries in shifts.items()}
+        self._time_off = {emp: IntervalIndex(entries) for emp, entries in off.items()}
+
+    def conflicts(self, employee_id, start_min, end_min, ignore_shift_ids=(), ignore_series_ids=()):
+        """Conflict dicts for one proposed [start_min, end_min) of `employee_id`.
+        Shifts listed in ignore_shift_ids (the one being edited) or belonging to ignore_series_ids
+        (series being rewritten or deleted) are not counted."""
+        found = []
+        index = self._shifts.get(employee_id)
+        if index is not None:
+            for r in index.overlapping(start_min, end_min):
+                if r['id'] in ignore_shift_ids or (r['series_id'] and r['series_id'] in ignore_series_ids):
+                    continue
+                found.append({
+                    'kind': 'shift',
+                    'shift_id': r['id'],
+                    'series_id': r['series_id'],
+                    'shift_time': r['shift_time'],
+                    'end_time': r['end_time'],
+                })
+        index = self._time_off.get(employee_id)
+        if index is not None:
+            for r in index.overlapping(start_min, end_min):
+                found.append({
+                    'kind': 'time_off',
+                    'time_off_id': r['id'],
+                    'start_date': r['start_date'],
+                    'end_date': r['end_date'],
+                    'reason': r['reason'],
+                })
+        return found
+
+    def check(self, proposals, ignore_shift_ids=(), ignore_series_ids=()):
+        """Check proposed shifts, each (employee_id, shift_time, end_time[, shift_id]).
+        Returns one entry per conflicting proposal: {employee_id, shift_time, end_time, shift_id, conflicts}."""
+        ignore = set(ignore_shift_ids)
+        report = []
+        for p in proposals:
+            employee_id, shift_time, end_time = p[0], p[1], p[2]
+            shift_id = p[3] if len(p) > 3 else None
+            start_min, end_min = shift_minutes(shift_time, end_time)
+            skip = ignore | {shift_id} if shift_id is not None else ignore
+            found = self.conflicts(employee_id, start_min, end_min, skip, ignore_series_ids)
+            if found:
+                report.append({
+                    'employee_id': employee_id,
+                    'shift_time': shift_time,
+                    'end_time': end_time,
+                    'shift_id': shift_id,
+                    'conflicts': found,
+                })
+        return report
@@ -0,0 +1,98 @@
+"""
+Production serving for main.py --production (gunicorn, gthread workers; Linux/Pi only).
+
+The master process runs init_db() once, under a file lock, before forking; workers import the
+Flask app themselves after the fork, so every worker opens its own pooled SQLite connections
+(one per server thread, reused across requests). SIGHUP is a graceful restart: migrations run
+again in the master, new workers load the current code, old workers finish in-flight requests.
+
+Settings (env): CARE_WORKERS (2), CARE_THREADS (4), CARE_KEEPALIVE_S (5), CARE_TIMEOUT_S (60),
+CARE_GRACEFUL_TIMEOUT_S (30), CARE_MAX_REQUESTS (0 = never recycle workers), CARE_ACCESS_LOG
+(unset = off, '-' = stderr, or a file path).
+"""
+
+import os
+
+from database import DATABASE, init_db, close_all_db
+
+DEFAULT_WORKERS = int(os.environ.get('CARE_WORKERS', '2'))
+DEFAULT_THREADS = int(os.environ.get('CARE_THREADS', '4'))
+
+
+def init_db_once():
+    """Run init_db() holding an exclusive lock next to the database file, so concurrent starters
+    (another instance, a migration script) never run the schema migrations at the same time."""
+    lock_path = DATABASE + '.init-lock'
+    try:
+        import fcntl
+    except ImportError:  # Windows: no multi-process serving there, just migrate
+        init_db()
+        return
+    with open(lock_path, 'a') as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            init_db()
+        finally:
+            # Nothing opened in the master may leak into forked workers
+            close_all_db()
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def _on_starting(server):
+    init_db_once()
+
+
+def _on_reload(server):
+    # SIGHUP: new workers will import the current code, so bring the schema up to date first
+    init_db_once()
+
+
+def _post_worker_init(worker):
+    import app
+    if hasattr(app, 'resolve_autologin_user'):
+        app.resolve_autologin_user()
+
+
+def _worker_exit(server, worker):
+    close_all_db()
+
+
+def run_production(host, port, workers=None, threads=None):
+    """Serve the app with gunicorn until stopped. Blocks."""
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError as e:
+        raise SystemExit(
+            "Production mode needs gunicorn (Linux/macOS): pip install -r requirements.txt "
+            f"({e}). On Windows use the development server (python main.py)."
+        )
+
+    options = {
+        'bind': f'{host}:{port}',
+        'workers': workers or DEFAULT_WORKERS,
+        'threads': threads or DEFAULT_THREADS,
+        'worker_class': 'gthread',
+        'keepalive': int(os.environ.get('CARE_KEEPALIVE_S', '5')),
+        'timeout': int(os.environ.get('CARE_TIMEOUT_S', '60')),
+        'graceful_timeout': int(os.environ.get('CARE_GRACEFUL_TIMEOUT_S', '30')),
+        'max_requests': int(os.environ.get('CARE_MAX_REQUESTS', '0')),
+        'max_requests_jitter': int(os.environ.get('CARE_MAX_REQUESTS', '0')) // 10,
+        'accesslog': os.environ.get('CARE_ACCESS_LOG') or None,
+        'preload_app': False,
+        'on_starting': _on_starting,
+        'on_reload': _on_reload,
+        'post_worker_init': _post_worker_init,
+        'worker_exit': _worker_exit,
+        'proc_name': 'care-calendar',
+    }
+
+    class CareCalendarApplication(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from app import app
+            return app
+
+    CareCalendarApplication().run()
@@ -0,0 +1,175 @@
+"""
+Opt-in SQL statement tracer for the data layer (CARE_SQL_TRACE=1).
+
+database.py swaps in a traced Connection/Cursor pair when enabled; every statement is reported
+here with its normalized text, parameter count, rows returned/affected and wall time (execute
+plus fetches). The first time a statement shape is seen its EXPLAIN QUERY PLAN is stored with it.
+Statements slower than CARE_SQL_TRACE_SLOW_MS are appended as JSON lines to a rotating
+slow-query log; aggregate stats are flushed to stats-<pid>.json every few seconds so
+`scripts/sql_trace_report.py` can print the top statements, merged across processes.
+
+Parameter values are never written anywhere (they include e-mails and password hashes).
+"""
+
+import atexit
+import json
+import os
+import re
+import threading
+import time
+
+SLOW_MS = float(os.environ.get('CARE_SQL_TRACE_SLOW_MS', '50'))
+LOG_MAX_BYTES = int(os.environ.get('CARE_SQL_TRACE_LOG_BYTES', str(1024 * 1024)))
+LOG_BACKUPS = int(os.environ.get('CARE_SQL_TRACE_LOG_BACKUPS', '3'))
+FLUSH_INTERVAL_S = 5.0
+
+SLOW_LOG_NAME = 'slow.log'
+STATS_PREFIX = 'stats-'
+
+# Only these statements get an EXPLAIN QUERY PLAN (PRAGMA/DDL/transaction control have none worth keeping)
+_EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize(sql):
+    """Collapse whitespace and replace literals with ? so one statement shape aggregates as one row."""
+    text = _STRING_RE.sub('?', sql)
+    text = _NUMBER_RE.sub('?', text)
+    text = _SPACE_RE.sub(' ', text).strip()
+    return _PLACEHOLDER_LIST_RE.sub('(?, ...)', text)
+
+
+def explainable(sql):
+    return sql.lstrip().split(None, 1)[0].upper() in _EXPLAINABLE if sql.strip() else False
+
+
+class Tracer:
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._stats = {}  # normalized sql -> dict
+        self._last_flush = time.monotonic()
+        self._dirty = False
+        os.makedirs(directory, exist_ok=True)
+        import logging.handlers  # only paid when tracing is on
+        self._slow = logging.getLogger(f'care.sqltrace.{os.getpid()}')
+        self._slow.propagate = False
+        self._slow.setLevel(logging.INFO)
+        if not self._slow.handlers:
+            handler = logging.handlers.RotatingFileHandler(
+                os.path.join(directory, SLOW_LOG_NAME), maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS,
+                encoding='utf-8'
+            )
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            self._slow.addHandler(handler)
+        atexit.register(self.flush)
+
+    def needs_plan(self, norm):
+        with self._lock:
+            return norm not in self._stats
+
+    def record(self, norm, nparams, rows, seconds, plan=None):
+        with self._lock:
+            st = self._stats.get(norm)
+            if st is None:
+                st = self._stats[norm] = {
+                    'count': 0, 'total_s': 0.0, 'max_s': 0.0, 'rows': 0, 'params': nparams, 'plan': plan,
+                }
+            elif plan is not None and st['plan'] is None:
+                st['plan'] = plan
+            st['count'] += 1
+            st['total_s'] += seconds
+            st['rows'] += rows
+            if seconds > st['max_s']:
+                st['max_s'] = seconds
+            self._dirty = True
+            flush_due = time.monotonic() - self._last_flush >= FLUSH_INTERVAL_S
+        if seconds * 1000.0 >= SLOW_MS:
+            self._slow.info(json.dumps({
+                'ts': time.strftime('%Y-%m-%dT%H:%M:%S'), 'pid': os.getpid(), 'ms': round(seconds * 1000.0, 3),
+                'rows': rows, 'params': nparams, 'sql': norm,
+            }))
+        if flush_due:
+            self.flush()
+
+    def snapshot(self):
+        with self._lock:
+            return {sql: dict(st) for sql, st in self._stats.items()}
+
+    def flush(self):
+        """Write this process's aggregate stats to <dir>/stats-<pid>.json (atomic replace)."""
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if not self._dirty:
+                return
+            data = {sql: dict(st) for sql, st in self._stats.items()}
+            self._dirty = False
+        path = os.path.join(self.directory, f'{STATS_PREFIX}{os.getpid()}.json')
+        tmp = path + '.tmp'
+        try:
+            with open(tmp, 'w', encoding='utf-8') as fh:
+                json.dump({'pid': os.getpid(), 'written_at': time.time(), 'statements': data}, fh)
+            os.replace(tmp, path)
+        except OSError:
+            pass  # tracing must never break the app
+
+
+_tracer = None
+_tracer_pid = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer(default_dir):
+    """Process-wide tracer writing to CARE_SQL_TRACE_DIR (or default_dir). Re-created after fork."""
+    global _tracer, _tracer_pid
+    with _tracer_lock:
+        if _tracer is None or _tracer_pid != os.getpid():
+            _tracer = Tracer(os.environ.get('CARE_SQL_TRACE_DIR') or default_dir)
+            _tracer_pid = os.getpid()
+        return _tracer
+
+
+# --- reporting (used by scripts/sql_trace_report.py) ---
+
+SORT_KEYS = {
+    'total': lambda st: st['total_s'],
+    'mean': lambda st: st['total_s'] / st['count'] if st['count'] else 0.0,
+    'max': lambda st: st['max_s'],
+    'count': lambda st: st['count'],
+    'rows': lambda st: st['rows'],
+}
+
+
+def load_stats(directory):
+    """Merge every stats-*.json in `directory` into {normalized sql: stats}."""
+    merged = {}
+    try:
+        names = sorted(n for n in os.listdir(directory) if n.startswith(STATS_PREFIX) and n.endswith('.json'))
+    except FileNotFoundError:
+        return merged
+    for name in names:
+        try:
+            with open(os.path.join(directory, name), encoding='utf-8') as fh:
+                statements = json.load(fh).get('statements', {})
+        except (OSError, ValueError):
+            continue
+        for sql, st in statements.items():
+            cur = merged.get(sql)
+            if cur is None:
+                merged[sql] = dict(st)
+                continue
+            cur['count'] += st['count']
+            cur['total_s'] += st['total_s']
+            cur['rows'] += st['rows']
+            cur['max_s'] = max(cur['max_s'], st['max_s'])
+            cur['plan'] = cur.get('plan') or st.get('plan')
+    return merged
+
+
+def top(stats, n=20, sort='total'):
+    key = SORT_KEYS[sort]
+    return sorted(stats.items(), key=lambda item: key(item[1]), reverse=True)[:n]
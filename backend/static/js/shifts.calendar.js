@@ -16,6 +16,8 @@ async function buildMonth(){
   // Fetch time off for this month window (1st .. last day)
   const nextMonth=new Date(shown.getFullYear(), shown.getMonth()+1, 1); const endOfMonth=new Date(nextMonth-1); // last day
   try { await window.__CARE_TIME_OFF__.fetchTimeOffForRange(localDateStr(monthStart), localDateStr(endOfMonth)); }catch{}
+  await Promise.all([fetchShiftsForMonth(shown), fetchCoverageForMonth(shown)]); prefetchAdjacentMonths(shown); buildLegend();
+  grid.innerHTML='';
   const currentWeekStart=startOfWeek(new Date());
   for(let i=0;i<42;i++) renderDayCell(addDays(firstCell,i), shown.getMonth(), currentWeekStart, grid);
 }
@@ -25,6 +27,8 @@ async function buildWeek(){
   const weekStart=startOfWeek(anchor); const weekEnd=addDays(weekStart,6);
   const label=document.getElementById('periodLabel'); if(label) label.textContent=`${weekStart.toLocaleDateString(undefined,{month:'short',day:'numeric'})} – ${weekEnd.toLocaleDateString(undefined,{month:'short',day:'numeric',year:'numeric'})}`;
   try { await window.__CARE_TIME_OFF__.fetchTimeOffForRange(localDateStr(weekStart), localDateStr(weekEnd)); }catch{}
+  await Promise.all([fetchShiftsForMonth(weekStart), fetchCoverageForMonth(weekStart)]); prefetchAdjacentMonths(weekStart); buildLegend();
+  grid.innerHTML='';
   for(let i=0;i<7;i++) renderDayCell(addDays(weekStart,i), weekStart.getMonth(), weekStart, grid);
 }
 
@@ -41,10 +45,7 @@ function renderDayCell(day, shownMonth, currentWeekStart, grid){
   const pills=document.createElement('div'); pills.className='pills'; cell.appendChild(pills);
   const dayStr=localDateStr(day); const items=dayIndex[dayStr]||[];
   const dayShifts=items.map(s=>({ id:s.id,name:s.name,start:new Date(s.shift_time), end:s.end_time? new Date(`${dayStr}T${s.end_time.slice(11,16)}`):null, series_id:s.series_id, employee_id:s.employee_id }));
-  const cov=getCov(); const ATT_START=cov.a, ATT_END=cov.b;
-  let intervals=[]; for(const sh of dayShifts){ const st=sh.start.getHours()*60+sh.start.getMinutes(); const et=sh.end? sh.end.getHours()*60+sh.end.getMinutes():(st+60); const a=Math.max(ATT_START,st), b=Math.min(ATT_END,et); if(b>a) intervals.push([a,b]); }
-  intervals.sort((x,y)=>x[0]-y[0]); let merged=[]; for(const iv of intervals){ if(!merged.length||iv[0]>merged[merged.length-1][1]) merged.push(iv); else merged[merged.length-1][1]=Math.max(merged[merged.length-1][1],iv[1]); }
-  let covered=0; merged.forEach(([a,b])=>covered+=(b-a)); if(covered<(ATT_END-ATT_START)){ const badge=document.createElement('span'); badge.className='gap-badge'; badge.textContent='Coverage gap'; cell.classList.add('needs-attention'); cell.appendChild(badge); }
+  const gap=coverageIndex[dayStr]; if(gap){ const badge=document.createElement('span'); badge.className='gap-badge'; badge.textContent='Coverage gap'; badge.title='Uncovered: '+gap.gaps.map(g=>`${g.start}–${g.end}`).join(', '); cell.classList.add('needs-attention'); cell.appendChild(badge); }
   dayShifts.forEach(sh=>{ const cls=nameToEventClass(sh.name); const ev=document.createElement('div'); ev.className='event '+cls; if(shiftConflictsWithTimeOff(sh)){ ev.classList.add('conflict'); ev.title='Shift overlaps time off'; }
     const timelabel=`${to12h(sh.start)}${sh.end?'–'+to12h(sh.end):''}`; ev.innerHTML=`<span>${timelabel} ${sh.name}${ev.classList.contains('conflict')?' ⚠':''}</span>`; ev.dataset.shiftId=sh.id; ev.dataset.seriesId=sh.series_id||''; ev.dataset.employeeId=sh.employee_id; ev.addEventListener('click',(e)=>{ e.stopPropagation(); if(selectionMode){ toggleSelect(ev, sh.id, sh.series_id); } else { openMenu(e, sh); } }); ev.addEventListener('contextmenu',(e)=>{ e.preventDefault(); e.stopPropagation(); if(selectionMode){ toggleSelect(ev, sh.id, sh.series_id); } else { openMenu(e, sh); } }); pills.appendChild(ev); });
 
@@ -79,7 +80,7 @@ function renderDayCell(day, shownMonth, currentWeekStart, grid){
   grid.appendChild(cell);
 }
 
-function buildLegend(){ const legend=document.getElementById('calendarLegend'); if(!legend) return; legend.innerHTML=''; const names=[...new Set(shiftsData.map(s=>s.name))].sort((a,b)=>a.localeCompare(b)); names.forEach(n=>{ const cls=nameToEventClass(n); const item=document.createElement('div'); item.className='legend-item'; const sw=document.createElement('span'); sw.className='legend-swatch '+cls; const label=document.createElement('span'); label.textContent=n; item.append(sw,label); legend.appendChild(item); });
+function buildLegend(){ const legend=document.getElementById('calendarLegend'); if(!legend) return; legend.innerHTML=''; const names=[...new Set([...shiftsById.values()].map(s=>s.name))].sort((a,b)=>a.localeCompare(b)); names.forEach(n=>{ const cls=nameToEventClass(n); const item=document.createElement('div'); item.className='legend-item'; const sw=document.createElement('span'); sw.className='legend-swatch '+cls; const label=document.createElement('span'); label.textContent=n; item.append(sw,label); legend.appendChild(item); });
   // Time off legend entry
   const toItem=document.createElement('div'); toItem.className='legend-item'; const toSw=document.createElement('span'); toSw.className='legend-swatch timeoff-swatch'; const toLbl=document.createElement('span'); toLbl.textContent='Time Off'; toItem.append(toSw,toLbl); legend.appendChild(toItem);
 }
@@ -31,7 +31,7 @@ function eBuildReview(){ const empId=eSelect && eSelect.value? parseInt(eSelect.
 if(btnOpenEditSeries){ btnOpenEditSeries.addEventListener('click',(ev)=>{ ev.stopPropagation(); openEditWizard(); }); }
 if(eCancelBtn){ eCancelBtn.addEventListener('click',(ev)=>{ ev.stopPropagation(); eClose(); }); }
 if(eBackBtn){ eBackBtn.addEventListener('click',(ev)=>{ ev.stopPropagation(); eShowStep(Math.max(1, eWiz.step-1)); }); }
-if(eNextBtn){ eNextBtn.addEventListener('click', async (ev)=>{ ev.stopPropagation(); if(eWiz.step===1){ eWiz.employeeId=eSelect && eSelect.value? parseInt(eSelect.value,10):null; eShowStep(2); return; } if(eWiz.step===2){ const sh12=eStartHour12? eStartHour12.value:''; const sm=eStartMin? eStartMin.value:''; const sAmpm=getEditAmPm('eStart'); if(!sh12 || !sm) return alert('Pick a start time'); if(eEndHour12 && eEndMin && eEndHour12.value && eEndMin.value){ const eh12=eEndHour12.value; const em=eEndMin.value; const eAmpm=getEditAmPm('eEnd'); const startHour24=to24h(sh12, sAmpm); const endHour24=to24h(eh12, eAmpm); const st=parseInt(startHour24,10)*60+parseInt(sm,10); const et=parseInt(endHour24,10)*60+parseInt(em,10); if(et<=st) return alert('End must be after start'); } eShowStep(3); return; } if(eWiz.step===3){ eShowStep(4); return; } if(eWiz.step===4){ eShowStep(5); return; } if(eWiz.step===5){ try{ const weekdays=[...eWiz.days]; const startDate=localDateStr(startOfWeek(currentShift.start)); const time=`${to24h(eStartHour12.value, getEditAmPm('eStart'))}:${eStartMin.value}`; let endTime=null; if(eEndHour12.value && eEndMin.value){ endTime=`${to24h(eEndHour12.value, getEditAmPm('eEnd'))}:${eEndMin.value}`; } const repeat_until=eUntil.value||null; await postJSON(API.updateSeries,{ series_id: currentShift.series_id, start_date:startDate, time, end_time:endTime, weekdays, repeat_until }); location.reload(); }catch(e){ alert('Failed to update series: '+e.message); } } }); }
+if(eNextBtn){ eNextBtn.addEventListener('click', async (ev)=>{ ev.stopPropagation(); if(eWiz.step===1){ eWiz.employeeId=eSelect && eSelect.value? parseInt(eSelect.value,10):null; eShowStep(2); return; } if(eWiz.step===2){ const sh12=eStartHour12? eStartHour12.value:''; const sm=eStartMin? eStartMin.value:''; const sAmpm=getEditAmPm('eStart'); if(!sh12 || !sm) return alert('Pick a start time'); if(eEndHour12 && eEndMin && eEndHour12.value && eEndMin.value){ const eh12=eEndHour12.value; const em=eEndMin.value; const eAmpm=getEditAmPm('eEnd'); const startHour24=to24h(sh12, sAmpm); const endHour24=to24h(eh12, eAmpm); const st=parseInt(startHour24,10)*60+parseInt(sm,10); const et=parseInt(endHour24,10)*60+parseInt(em,10); if(et<=st) return alert('End must be after start'); } eShowStep(3); return; } if(eWiz.step===3){ eShowStep(4); return; } if(eWiz.step===4){ eShowStep(5); return; } if(eWiz.step===5){ try{ const weekdays=[...eWiz.days]; const startDate=localDateStr(startOfWeek(currentShift.start)); const time=`${to24h(eStartHour12.value, getEditAmPm('eStart'))}:${eStartMin.value}`; let endTime=null; if(eEndHour12.value && eEndMin.value){ endTime=`${to24h(eEndHour12.value, getEditAmPm('eEnd'))}:${eEndMin.value}`; } const repeat_until=eUntil.value||null; const js=await postJSONConfirmingConflicts(API.updateSeries,{ series_id: currentShift.series_id, start_date:startDate, time, end_time:endTime, weekdays, repeat_until }); if(!js) return; eClose(); closeMenu(); await refreshAfterChange(); }catch(e){ alert('Failed to update series: '+e.message); } } }); }
 
 // Edit Day wizard (d*)
 const dOverlay=document.getElementById('editDayOverlay'); const dBack=document.getElementById('dBack'); const dNext=document.getElementById('dNext'); const dCancel=document.getElementById('dCancel'); const dStartHour12=document.getElementById('dStartHour12'); const dStartMin=document.getElementById('dStartMin'); const dEndHour12=document.getElementById('dEndHour12'); const dEndMin=document.getElementById('dEndMin'); const dReview=document.getElementById('dReview'); const dEmployee=document.getElementById('dEmployee'); const dStartAM=document.getElementById('dStartAM'); const dStartPM=document.getElementById('dStartPM'); const dEndAM=document.getElementById('dEndAM'); const dEndPM=document.getElementById('dEndPM');
@@ -84,10 +84,11 @@ if(dNext){ dNext.addEventListener('click', async (e)=>{ e.stopPropagation(); if(
       const time = `${to24h(dStartHour12.value, dStartAM.classList.contains('active')?'AM':'PM')}:${dStartMin.value}`;
       let end_time = null; if(dEndHour12.value && dEndMin.value){ end_time = `${to24h(dEndHour12.value, dEndAM.classList.contains('active')?'AM':'PM')}:${dEndMin.value}`; }
       const payload = { shift_id: editingShift.id, shift_date: shiftDate, time, end_time, employee_id: dWiz.employeeId };
-      const js = await postJSON('/api/edit_day', payload);
+      const js = await postJSONConfirmingConflicts('/api/edit_day', payload);
+      if(!js) return;
       if(!js.ok && js.error) throw new Error(js.error);
       dOverlay.classList.add('is-hidden'); dOverlay.style.display='none'; editingShift=null;
-      location.reload();
+      closeMenu(); await refreshAfterChange();
     }catch(err){ alert('Failed to save: '+err.message); }
   }
 }); }
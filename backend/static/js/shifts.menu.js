@@ -5,7 +5,7 @@ function toggleSelect(pill,id,seriesId){ if(selected.has(id)){ selected.delete(i
 
 document.getElementById('btnSelectMode').addEventListener('click',()=>{ selectionMode=!selectionMode; document.getElementById('btnDeleteSelected').classList.toggle('hidden', !selectionMode); document.getElementById('btnSelectMode').textContent=selectionMode? 'Cancel selection':'Select shifts'; selected.clear(); selectedMap.clear(); updateDeleteSelectedLabel(); document.querySelectorAll('.pill.selected').forEach(el=>el.classList.remove('selected')); });
 
-document.getElementById('btnDeleteSelected').addEventListener('click', async ()=>{ if(!selected.size) return alert('No shifts selected'); const hasSeries=[...selectedMap.values()].some(v=>!!v); let deleteSeriesToo=false; if(hasSeries){ deleteSeriesToo=confirm('Some selected shifts are part of a series. OK=delete entire series; Cancel=only selected occurrences.'); } try{ const ops=[]; if(deleteSeriesToo){ const seriesIds=[...new Set([...selectedMap.values()].filter(Boolean))]; seriesIds.forEach(sid=>ops.push(postJSON(API.deleteSeries,{series_id:sid}))); const singles=[...selectedMap.entries()].filter(([id,sid])=>!sid).map(([id])=>id); singles.forEach(id=>ops.push(postJSON(API.deleteShift,{shift_id:id}))); } else { [...selected].forEach(id=>ops.push(postJSON(API.deleteShift,{shift_id:id}))); } await Promise.all(ops); location.reload(); }catch(e){ alert('Failed to delete selected: '+e.message); } });
+document.getElementById('btnDeleteSelected').addEventListener('click', async ()=>{ if(!selected.size) return alert('No shifts selected'); const hasSeries=[...selectedMap.values()].some(v=>!!v); let deleteSeriesToo=false; if(hasSeries){ deleteSeriesToo=confirm('Some selected shifts are part of a series. OK=delete entire series; Cancel=only selected occurrences.'); } try{ const ops=[]; if(deleteSeriesToo){ const seriesIds=[...new Set([...selectedMap.values()].filter(Boolean))]; seriesIds.forEach(sid=>ops.push({op:'delete_series', series_id:sid})); const singles=[...selectedMap.entries()].filter(([id,sid])=>!sid).map(([id])=>id); singles.forEach(id=>ops.push({op:'delete', shift_id:id})); } else { [...selected].forEach(id=>ops.push({op:'delete', shift_id:id})); } await postJSON(API.bulkShifts||'/api/shifts/bulk',{ops}); document.getElementById('btnSelectMode').click(); await refreshAfterChange(); }catch(e){ alert('Failed to delete selected (nothing was deleted): '+e.message); } });
 
 document.addEventListener('keydown',(e)=>{ if(e.key==='Escape' && selectionMode){ document.getElementById('btnSelectMode').click(); }});
 
@@ -15,10 +15,10 @@ function openMenu(evt, sh){ currentShift=sh; document.getElementById('menuTitle'
 function closeMenu(preserveShift=false){ menu.style.display='none'; if(!preserveShift) currentShift=null; }
 
 // Delete single shift button (clear listeners then attach)
-(function(){ const oldBtn=document.getElementById('btnDeleteShift'); if(oldBtn){ const newBtn=oldBtn.cloneNode(true); oldBtn.parentNode.replaceChild(newBtn, oldBtn); newBtn.addEventListener('click', async ()=>{ if(!currentShift) return; try{ if(currentShift.series_id){ if(!confirm('Delete this shift occurrence?')) return; await postJSON(API.deleteShift,{shift_id:currentShift.id}); } else { if(!confirm('Delete this shift?')) return; await postJSON(API.deleteShift,{shift_id:currentShift.id}); } location.reload(); }catch(e){ alert('Failed to delete: '+e.message); } }); } })();
+(function(){ const oldBtn=document.getElementById('btnDeleteShift'); if(oldBtn){ const newBtn=oldBtn.cloneNode(true); oldBtn.parentNode.replaceChild(newBtn, oldBtn); newBtn.addEventListener('click', async ()=>{ if(!currentShift) return; try{ if(currentShift.series_id){ if(!confirm('Delete this shift occurrence?')) return; await postJSON(API.deleteShift,{shift_id:currentShift.id}); } else { if(!confirm('Delete this shift?')) return; await postJSON(API.deleteShift,{shift_id:currentShift.id}); } closeMenu(); await refreshAfterChange(); }catch(e){ alert('Failed to delete: '+e.message); } }); } })();
 
-document.getElementById('btnDeleteSeries').addEventListener('click', async ()=>{ if(!currentShift || !currentShift.series_id) return; if(!confirm('Delete ALL occurrences in this series? This cannot be undone.')) return; try{ await postJSON(API.deleteSeries,{series_id:currentShift.series_id}); location.reload(); }catch(e){ alert('Failed to delete series: '+e.message); } });
-document.getElementById('btnSwap').addEventListener('click', async ()=>{ if(!currentShift) return; const sel=document.getElementById('swapSelect'); const val=sel.value; if(!val) return alert('Select a caregiver to swap to'); try{ await postJSON(API.swapShift,{ shift_id:currentShift.id, new_employee_id: parseInt(val,10)}); location.reload(); }catch(e){ alert('Failed to swap: '+e.message); } });
+document.getElementById('btnDeleteSeries').addEventListener('click', async ()=>{ if(!currentShift || !currentShift.series_id) return; if(!confirm('Delete ALL occurrences in this series? This cannot be undone.')) return; try{ await postJSON(API.deleteSeries,{series_id:currentShift.series_id}); closeMenu(); await refreshAfterChange(); }catch(e){ alert('Failed to delete series: '+e.message); } });
+document.getElementById('btnSwap').addEventListener('click', async ()=>{ if(!currentShift) return; const sel=document.getElementById('swapSelect'); const val=sel.value; if(!val) return alert('Select a caregiver to swap to'); try{ const js=await postJSONConfirmingConflicts(API.swapShift,{ shift_id:currentShift.id, new_employee_id: parseInt(val,10)}); if(!js) return; closeMenu(); await refreshAfterChange(); }catch(e){ alert('Failed to swap: '+e.message); } });
 
 document.getElementById('btnSaveCoverage').addEventListener('click',()=>{ const sh=document.getElementById('covStartHour').value||'09'; const sm=document.getElementById('covStartMin').value||'00'; const eh=document.getElementById('covEndHour').value||'21'; const em=document.getElementById('covEndMin').value||'00'; const a=parseInt(sh,10)*60+parseInt(sm,10); const b=parseInt(eh,10)*60+parseInt(em,10); if(b<=a) return alert('Coverage end must be after start'); setCov(a,b); closeMenu(); render(); });
 document.getElementById('btnCloseMenu').addEventListener('click',()=> closeMenu());
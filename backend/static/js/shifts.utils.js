@@ -8,8 +8,9 @@ function hashString(str){ let h=0; for(let i=0;i<str.length;i++){ h=(h<<5)-h+str
 function nameToEventClass(name){ const n=name.toLowerCase(); if(n.includes('kellie')) return 'kellie'; if(n.includes('robin')) return 'robin'; if(n.includes('scarlett')) return 'scarlett'; const pool=['purple','cyan']; return pool[hashString(name)%pool.length]; }
 function validateShiftForm(){ return true; }
 
-// Data injected by template JSON script tags
-const shiftsData = JSON.parse(document.getElementById('shifts-data').textContent);
+// Data injected by template JSON script tags (shifts cover only the initially visible window)
+const shiftsDataEl = document.getElementById('shifts-data');
+const shiftsData = JSON.parse(shiftsDataEl.textContent);
 const employeesData = JSON.parse(document.getElementById('employees-data').textContent);
 
 // API endpoints provided via inline script (window.CARE_API)
@@ -17,12 +18,138 @@ const API = (window.CARE_API)||{};
 
 // Coverage prefs
 function getCov(){ try{ const s=localStorage.getItem('cov'); if(!s) return { a:540, b:1260 }; const {a,b}=JSON.parse(s); return { a, b }; }catch{ return { a:540, b:1260 }; } }
-function setCov(a,b){ localStorage.setItem('cov', JSON.stringify({a,b})); }
+function setCov(a,b){ localStorage.setItem('cov', JSON.stringify({a,b})); for(const k in coverageCache) delete coverageCache[k]; coverageIndex={}; }
 function minsFromHHMM(t){ const [hh,mm]=t.split(':').map(x=>parseInt(x,10)||0); return hh*60+mm; }
 
 // Pre-index shifts by YYYY-MM-DD for faster rendering
-function buildDayIndex(shifts){ const idx={}; for(const s of shifts){ const day=s.shift_time.slice(0,10); (idx[day] ||= []).push(s); } return idx; }
-const dayIndex = buildDayIndex(shiftsData);
+function buildDayIndex(shifts){ const idx={}; for(const s of shifts){ const day=s.shift_time.slice(0,10); (idx[day] ||= []).push(s); } for(const k in idx) idx[k].sort((a,b)=>a.shift_time.localeCompare(b.shift_time)); return idx; }
+
+// ---- Windowed shift loading ----
+// Shifts are loaded per month grid (Mon-aligned, 42 days) keyed by 'YYYY-MM', mirroring the time off cache.
+// Adjacent grids overlap, so rows are merged by id before re-indexing.
+const shiftsById = new Map();
+const shiftMonthCache = {}; // { 'YYYY-MM': true | Promise }
+let dayIndex = {};
+
+function mergeShifts(rows){ for(const s of rows) shiftsById.set(s.id, s); dayIndex = buildDayIndex(shiftsById.values()); }
+function monthKey(d){ return `${d.getFullYear()}-${pad2(d.getMonth()+1)}`; }
+function monthGridRange(d){ const first=startOfWeek(startOfMonth(d)); return [localDateStr(first), localDateStr(addDays(first,41))]; }
+
+async function fetchShiftsForMonth(d){
+  const key = monthKey(d);
+  if(shiftMonthCache[key]) return shiftMonthCache[key];
+  const [startISO, endISO] = monthGridRange(d);
+  const p = (async ()=>{
+    try {
+      const res = await fetch(`${API.listShifts || '/api/shifts'}?start=${startISO}&end=${endISO}`);
+      if(!res.ok) throw new Error(await res.text());
+      const data = await res.json();
+      if(data.ok){ mergeShifts(data.items); shiftMonthCache[key] = true; return true; }
+    } catch(e){ console.warn('Shift fetch failed', e); }
+    delete shiftMonthCache[key];
+    return false;
+  })();
+  shiftMonthCache[key] = p;
+  return p;
+}
+
+// Warm the neighbouring months so Prev/Next render without waiting on the network
+function prefetchAdjacentMonths(d){
+  const prev = new Date(d.getFullYear(), d.getMonth()-1, 1);
+  const next = new Date(d.getFullYear(), d.getMonth()+1, 1);
+  fetchShiftsForMonth(prev); fetchShiftsForMonth(next);
+}
+
+// ---- Coverage gaps (computed server-side by /api/coverage) ----
+// Cached per month grid and coverage window; setCov() clears it.
+const coverageCache = {}; // { 'YYYY-MM|a-b': true | Promise }
+let coverageIndex = {};   // { 'YYYY-MM-DD': { gap_minutes, gaps:[{start,end}] } } (days with a gap only)
+
+function minsToHHMM(m){ return `${pad2(Math.floor(m/60))}:${pad2(m%60)}`; }
+
+async function fetchCoverageForMonth(d){
+  const cov = getCov();
+  const key = `${monthKey(d)}|${cov.a}-${cov.b}`;
+  if(coverageCache[key]) return coverageCache[key];
+  const [startISO, endISO] = monthGridRange(d);
+  const p = (async ()=>{
+    try {
+      const qs = `start=${startISO}&end=${endISO}&window_start=${minsToHHMM(cov.a)}&window_end=${minsToHHMM(cov.b)}`;
+      const res = await fetch(`${API.coverage || '/api/coverage'}?${qs}`);
+      if(!res.ok) throw new Error(await res.text());
+      const data = await res.json();
+      if(data.ok){ Object.assign(coverageIndex, data.days); coverageCache[key] = true; return true; }
+    } catch(e){ console.warn('Coverage fetch failed', e); }
+    delete coverageCache[key];
+    return false;
+  })();
+  coverageCache[key] = p;
+  return p;
+}
+
+// Seed the cache from the server-rendered window (the month grid containing today by default)
+(function seedShiftWindow(){
+  mergeShifts(shiftsData);
+  const start = shiftsDataEl.dataset.start;
+  if(start){ const [s, e] = monthGridRange(addDays(new Date(start+'T00:00:00'), 7)); if(s===start && e===shiftsDataEl.dataset.end) shiftMonthCache[monthKey(addDays(new Date(start+'T00:00:00'), 7))] = true; }
+})();
+
+// ---- Changes feed (/api/changes) ----
+// After a mutation, and whenever another kiosk/phone saves something, fetch only the rows that changed since
+// changeSeq and patch shiftsById/dayIndex, the time off cache and employeesData in place, then re-render.
+let changeSeq = parseInt(shiftsDataEl.dataset.seq||'0',10)||0;
+
+function loadedShiftRange(){ const keys=Object.keys(shiftMonthCache).filter(k=>shiftMonthCache[k]===true).sort(); if(!keys.length) return null; const first=keys[0].split('-').map(Number); const last=keys[keys.length-1].split('-').map(Number); return [monthGridRange(new Date(first[0],first[1]-1,1))[0], monthGridRange(new Date(last[0],last[1]-1,1))[1]]; }
+
+function applyChanges(data){
+  const none={upserted:[],deleted:[]}; const sh=data.shifts||none, to=data.time_off||none, em=data.employees||none;
+  for(const id of sh.deleted) shiftsById.delete(id);
+  for(const s of sh.upserted) shiftsById.set(s.id, s);
+  for(const e of em.upserted){ const cur=employeesData.find(x=>x.id===e.id); if(cur) cur.name=e.name; else employeesData.push({ id:e.id, name:e.name }); for(const s of shiftsById.values()) if(s.employee_id===e.id) s.name=e.name; }
+  for(const id of em.deleted){ const i=employeesData.findIndex(x=>x.id===id); if(i>=0) employeesData.splice(i,1); for(const [sid,s] of shiftsById) if(s.employee_id===id) shiftsById.delete(sid); }
+  const shiftsChanged=!!(sh.upserted.length||sh.deleted.length||em.upserted.length||em.deleted.length);
+  const timeOffChanged=!!(to.upserted.length||to.deleted.length);
+  if(shiftsChanged) dayIndex=buildDayIndex(shiftsById.values());
+  if(timeOffChanged){
+    const drop=new Set([...to.deleted, ...to.upserted.map(r=>r.id)]); const keys=Object.keys(timeOffCache);
+    for(const k of keys) timeOffCache[k]=timeOffCache[k].filter(r=>!drop.has(r.id));
+    if(keys.length) timeOffCache[keys[0]].push(...to.upserted);
+    rebuildTimeOffIndex();
+  }
+  // Gaps depend on both; refetched for the visible month on the next render
+  if(shiftsChanged||timeOffChanged){ for(const k in coverageCache) delete coverageCache[k]; coverageIndex={}; }
+  return shiftsChanged||timeOffChanged;
+}
+
+async function syncChanges(wait=0){
+  const range=loadedShiftRange(); let changed=false;
+  for(;;){
+    const qs=new URLSearchParams({ since:String(changeSeq) }); if(wait) qs.set('wait', String(wait)); if(range){ qs.set('start', range[0]); qs.set('end', range[1]); }
+    const res=await fetch(`${API.changes || '/api/changes'}?${qs}`);
+    if(!res.ok) throw new Error(await res.text());
+    const data=await res.json(); if(!data.ok) throw new Error(data.error||'Failed');
+    changed=applyChanges(data)||changed; changeSeq=data.seq;
+    if(!data.more) return { changed, waited:data.waited };
+    wait=0;
+  }
+}
+
+// Used instead of location.reload() after saving; falls back to a reload if the feed is unavailable
+async function refreshAfterChange(){ try{ await syncChanges(); await render(); }catch(e){ console.warn('[Changes] sync failed, reloading', e); location.reload(); } }
+
+// Follow other devices' edits: long-poll while the page is visible, slower polling when the server is busy
+function followChanges(){
+  let delay=0;
+  (async function loop(){
+    for(;;){
+      if(document.hidden){ await new Promise(r=>document.addEventListener('visibilitychange', r, { once:true })); continue; }
+      try{ const r=await syncChanges(25); if(r.changed && !selectionMode) await render(); delay=r.waited? 0 : 15000; }
+      catch(e){ console.warn('[Changes] poll failed', e); delay=Math.min(Math.max(delay*2, 5000), 60000); }
+      if(delay) await new Promise(r=>setTimeout(r, delay));
+    }
+  })();
+}
+window.addEventListener('load', ()=>setTimeout(followChanges, 1000));
 
 // ---- Time Off (Phase 2 minimal integration) ----
 // Cache keyed by 'YYYY-MM' to avoid repeated fetches when navigating months.
@@ -191,7 +318,11 @@ function to12h(dateObj){ let h=dateObj.getHours(); const m=pad2(dateObj.getMinut
 function fmtDayLabel(d){ const w=['Mon','Tue','Wed','Thu','Fri','Sat','Sun'][(d.getDay()+6)%7]; return `${w} ${pad2(d.getMonth()+1)}/${pad2(d.getDate())}`; }
 
 // Shared fetch helper
-async function postJSON(url, payload){ const res=await fetch(url,{method:'POST',headers:{'Content-Type':'application/json'},body:JSON.stringify(payload)}); if(!res.ok){ const t=await res.text(); throw new Error(t); } return res.json(); }
+async function postJSON(url, payload){ const res=await fetch(url,{method:'POST',headers:{'Content-Type':'application/json'},body:JSON.stringify(payload)}); if(!res.ok){ const t=await res.text(); let js=null; try{ js=JSON.parse(t); }catch{} const err=new Error((js&&js.error)||t); err.status=res.status; err.conflicts=(js&&js.conflicts)||null; throw err; } return res.json(); }
+
+// Double-booking: the server answers 409 with structured conflicts; let the user confirm and resend with force
+function describeConflicts(conflicts, limit=3){ return conflicts.slice(0,limit).map(c=>{ const o=c.conflicts[0]; const what=o.kind==='time_off'?`time off ${o.start_date}${o.end_date!==o.start_date?' – '+o.end_date:''}`:`shift ${o.shift_time.slice(11,16)}${o.end_time?'–'+o.end_time.slice(11,16):''}`; return `${c.shift_time.slice(0,10)} ${c.shift_time.slice(11,16)} overlaps ${what}`; }).join('\n') + (conflicts.length>limit?`\n(+${conflicts.length-limit} more)`:''); }
+async function postJSONConfirmingConflicts(url, payload){ try{ return await postJSON(url, payload); }catch(e){ if(e.status!==409 || !e.conflicts) throw e; if(!confirm(`${e.message}:\n\n${describeConflicts(e.conflicts)}\n\nSave anyway?`)) return null; return postJSON(url, { ...payload, force:true }); } }
 
 // Dark mode heuristic (kept here so it executes early)
 (function sunsetDarkMode(){
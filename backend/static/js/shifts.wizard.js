@@ -30,7 +30,7 @@ function initInlineCalendar(){ const prevBtn=document.getElementById('wizCalPrev
 document.getElementById('btnNewShift').addEventListener('click', openWizard);
 document.getElementById('wizCancel').addEventListener('click', closeWizard);
 document.getElementById('wizBack').addEventListener('click', ()=> showStep(Math.max(1, wiz.step-1)) );
-document.getElementById('wizNext').addEventListener('click', ()=>{ if(wiz.step===1){ if(!wiz.employeeId) return alert('Select an employee'); showStep(2); return;} if(wiz.step===2){ updateStartFromControls(); updateEndFromControls(); if(!wiz.start) return alert('Pick a start date & time'); if(wiz.end){ const st=new Date(wiz.start); const [eh,em]=wiz.end.split(':'); const et=new Date(wiz.start); et.setHours(parseInt(eh,10), parseInt(em,10),0,0); if(et<=st) return alert('End time must be after start'); } showStep(3); return;} if(wiz.step===3){ const form=document.getElementById('addShiftForm'); document.getElementById('employee_id_select').value=wiz.employeeId; document.getElementById('shift_time_input').value=wiz.start; document.getElementById('end_time_input').value=wiz.end||''; document.getElementById('repeat_until_input').value=wiz.until||''; [...form.querySelectorAll('input[name="selected_days"]'), ...form.querySelectorAll('input[name="repeat_weekly"]')].forEach(n=>n.remove()); if(wiz.repeat){ const rw=document.createElement('input'); rw.type='hidden'; rw.name='repeat_weekly'; rw.value='on'; form.appendChild(rw); wiz.days.forEach(d=>{ const hid=document.createElement('input'); hid.type='hidden'; hid.name='selected_days'; hid.value=String(d); form.appendChild(hid); }); } form.requestSubmit(); closeWizard(); } });
+document.getElementById('wizNext').addEventListener('click', async ()=>{ if(wiz.step===1){ if(!wiz.employeeId) return alert('Select an employee'); showStep(2); return;} if(wiz.step===2){ updateStartFromControls(); updateEndFromControls(); if(!wiz.start) return alert('Pick a start date & time'); if(wiz.end){ const st=new Date(wiz.start); const [eh,em]=wiz.end.split(':'); const et=new Date(wiz.start); et.setHours(parseInt(eh,10), parseInt(em,10),0,0); if(et<=st) return alert('End time must be after start'); } showStep(3); return;} if(wiz.step===3){ const form=document.getElementById('addShiftForm'); document.getElementById('employee_id_select').value=wiz.employeeId; document.getElementById('shift_time_input').value=wiz.start; document.getElementById('end_time_input').value=wiz.end||''; document.getElementById('repeat_until_input').value=wiz.until||''; [...form.querySelectorAll('input[name="selected_days"]'), ...form.querySelectorAll('input[name="repeat_weekly"]')].forEach(n=>n.remove()); if(wiz.repeat){ const rw=document.createElement('input'); rw.type='hidden'; rw.name='repeat_weekly'; rw.value='on'; form.appendChild(rw); wiz.days.forEach(d=>{ const hid=document.createElement('input'); hid.type='hidden'; hid.name='selected_days'; hid.value=String(d); form.appendChild(hid); }); } form.querySelectorAll('input[name="force"]').forEach(n=>n.remove()); try{ const chk=await postJSON(API.shiftConflicts||'/api/shift_conflicts',{ employee_id:wiz.employeeId, shift_time:wiz.start, end_time:wiz.end||null, repeat_weekly:!!wiz.repeat, weekdays:[...wiz.days], repeat_until:wiz.until||null }); if(chk.conflict_count){ if(chk.policy==='block' && !confirm(`${chk.conflict_count} of ${chk.checked} shifts overlap an existing shift or time off:\n\n${describeConflicts(chk.conflicts)}\n\nCreate anyway?`)) return; const f=document.createElement('input'); f.type='hidden'; f.name='force'; f.value='1'; form.appendChild(f); } }catch(e){ console.warn('[Wizard] conflict check failed', e); } form.requestSubmit(); closeWizard(); } });
 
 ['wizStartDate','wizStartHour12','wizStartMin'].forEach(id=>{ const el=document.getElementById(id); if(el) el.addEventListener('change', updateStartFromControls); });
 ['wizEndHour12','wizEndMin'].forEach(id=>{ const el=document.getElementById(id); if(el) el.addEventListener('change', updateEndFromControls); });
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Response bytes and latency with and without the compression middleware (backend/compress.py).
+
+Usage:
+    python benchmarks/compression.py [--caregivers 50] [--years 5] [--seed 1234] [--repeat 20]
+                                     [--mbps 10] [--output PATH]
+
+Generates the benchmark dataset (benchmarks/dataset.py) and requests each page through Flask's
+test client in four modes: without the middleware, gzip with the ETag cache off ("gzip cold":
+every response is compressed), gzip with the cache on ("gzip cached": repeated identical
+responses reuse the compressed body), and brotli/zstd when those modules are installed. Prints
+the body size, the in-process median and an estimate of the total time over a --mbps link
+(median + bytes / bandwidth), and optionally writes them as JSON.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import dataset  # noqa: E402
+
+
+def _paths(summary):
+    first = date.fromisoformat(summary["start"])
+    last = date.fromisoformat(summary["end"])
+    mid = first + (last - first) / 2
+    month = date(mid.year, mid.month, 1)
+    grid = month - timedelta(days=month.weekday())
+    return [
+        ("shifts_page", f"/shifts?start={grid.isoformat()}"),
+        ("api_shifts_month", f"/api/shifts?start={grid.isoformat()}&end={(grid + timedelta(days=41)).isoformat()}"),
+        ("time_off_year", f"/api/time_off?start={mid.year}-01-01&end={mid.year}-12-31"),
+        ("coverage_year", f"/api/coverage?start={mid.year}-01-01&end={mid.year}-12-31"),
+        ("hours_month", f"/hours?start={month.isoformat()}&end={(month + timedelta(days=30)).isoformat()}"),
+        ("shifts_csv_month", f"/shifts.csv?start={month.isoformat()}&end={(month + timedelta(days=30)).isoformat()}"),
+        ("utils_js", "/static/js/shifts.utils.js"),
+    ]
+
+
+def _time(client, path, accept, repeat):
+    headers = {"Accept-Encoding": accept} if accept else {}
+    samples, size, encoding = [], 0, None
+    for k in range(repeat + 2):
+        t0 = time.perf_counter()
+        resp = client.get(path, headers=headers)
+        body = resp.get_data()
+        dt_ms = (time.perf_counter() - t0) * 1000.0
+        if resp.status_code != 200:
+            raise SystemExit(f"{path}: HTTP {resp.status_code}")
+        size, encoding = len(body), resp.headers.get("Content-Encoding")
+        resp.close()
+        if k >= 2:
+            samples.append(dt_ms)
+    return {"bytes": size, "encoding": encoding, "median_ms": round(statistics.median(samples), 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare response sizes/latency with and without compression")
+    parser.add_argument("--caregivers", type=int, default=50)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--repeat", type=int, default=20, help="Timed requests per page and mode")
+    parser.add_argument("--mbps", type=float, default=10.0, help="Link speed for the transfer estimate")
+    parser.add_argument("--output", help="Write results JSON here")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="care-compress-")
+    db_path = os.path.join(workdir, "database.db")
+    out = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve().parent / "dataset.py"), "--db", db_path,
+         "--caregivers", str(args.caregivers), "--years", str(args.years), "--seed", str(args.seed)],
+        capture_output=True, text=True, check=True,
+    ).stdout
+    summary = json.loads(out.strip().splitlines()[-1])
+    print(f"Dataset: {summary['rows']}")
+
+    os.environ.update({
+        "CARE_DB_PATH": db_path, "CARE_AUTOLOGIN": "0", "CARE_LOG_LEVEL": "WARNING",
+        "FLASK_SECRET_KEY": "benchmark", "CARE_COMPRESS": "0",
+    })
+    sys.path.insert(0, str(ROOT / "backend"))
+    import app as app_module
+    import compress
+    app_module.init_db()
+    flask_app = app_module.app
+    raw_wsgi = flask_app.wsgi_app
+    client = flask_app.test_client()
+    resp = client.post("/login", data={"email": dataset.BENCH_EMAIL, "password": dataset.BENCH_PASSWORD})
+    if resp.status_code != 302:
+        raise SystemExit(f"benchmark login failed ({resp.status_code})")
+
+    modes = [
+        ("identity", None, None),
+        ("gzip cold", compress.CompressMiddleware(raw_wsgi, encodings=("gzip",), cache_bytes=0), "gzip"),
+        ("gzip cached", compress.CompressMiddleware(raw_wsgi, encodings=("gzip",)), "gzip"),
+    ]
+    for name in ("br", "zstd"):
+        if compress.available_encoders((name,)):
+            modes.append((f"{name} cached", compress.CompressMiddleware(raw_wsgi, encodings=(name,)), name))
+
+    results = {}
+    bytes_per_ms = args.mbps * 1e6 / 8 / 1000.0
+    print(f"{'page':<18} {'mode':<12} {'bytes':>9} {'median':>9} {'@' + format(args.mbps, 'g') + ' Mbit/s':>12}")
+    try:
+        for page, path in _paths(summary):
+            results[page] = {}
+            for mode, middleware, accept in modes:
+                flask_app.wsgi_app = middleware or raw_wsgi
+                res = _time(client, path, accept, args.repeat)
+                res["link_ms"] = round(res["median_ms"] + res["bytes"] / bytes_per_ms, 3)
+                results[page][mode] = res
+                print(f"{page:<18} {mode:<12} {res['bytes']:>9} {res['median_ms']:>7.2f}ms {res['link_ms']:>10.1f}ms")
+    finally:
+        flask_app.wsgi_app = raw_wsgi
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        report = {
+            "meta": {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "repeat": args.repeat,
+                "mbps": args.mbps,
+                "dataset": summary,
+            },
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
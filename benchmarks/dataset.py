@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Deterministic synthetic dataset for the benchmark suite.
+
+Usage:
+    python benchmarks/dataset.py --db PATH [--caregivers 50] [--years 5] [--seed 1234] [--start 2021-01-04]
+
+Creates a fresh database with N caregivers, each working one or two weekly recurring series per
+year (2-5 weekdays, 4-12 hour shifts), a few time off spans per year, monthly pay adjustments and
+a benchmark login user. Series are materialized through the last day so reads measure steady
+state. The same arguments always produce the same rows (fixed seed and fixed start date, never
+today's date), so results from different commits are comparable.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+from datetime import date, time as dtime, timedelta
+from pathlib import Path
+
+BENCH_EMAIL = "bench@example.com"
+BENCH_PASSWORD = "bench-password"
+
+FIRST_NAMES = ["Alice", "Bob", "Carol", "Dave", "Eve", "Frank", "Grace", "Heidi", "Ivan", "Judy",
+               "Mallory", "Niaj", "Olivia", "Peggy", "Rupert", "Sybil", "Trent", "Victor", "Walter", "Yara"]
+POSITIONS = ["Day Shift Caregiver", "Evening Shift Caregiver", "Float Caregiver", "Night Shift Caregiver"]
+START_HOURS = [6, 7, 8, 9, 13, 14, 15, 19, 21]
+REASONS = [None, "Vacation", "Family", "Medical", "Training"]
+
+
+def plan(caregivers, years, seed, start):
+    """Pure description of the dataset (no database access): employees, series, time off, adjustments."""
+    rng = random.Random(seed)
+    end = date(start.year + years, start.month, start.day) - timedelta(days=1)
+    employees, series, time_off, adjustments = [], [], [], []
+    for i in range(caregivers):
+        name = f"{FIRST_NAMES[i % len(FIRST_NAMES)]} {i + 1:03d}"
+        employees.append((name, POSITIONS[i % len(POSITIONS)], round(rng.uniform(15.0, 24.0), 2)))
+        for y in range(years):
+            year_start = date(start.year + y, start.month, start.day)
+            year_end = min(end, date(start.year + y + 1, start.month, start.day) - timedelta(days=1))
+            used_days = set()
+            n_series = rng.choice((1, 1, 2))
+            for k in range(n_series):
+                free = [d for d in range(7) if d not in used_days]
+                days = sorted(rng.sample(free, rng.randint(2, 5 if n_series == 1 else 3)))
+                used_days.update(days)
+                hour = rng.choice(START_HOURS)
+                length = min(rng.randint(4, 12), 23 - hour)
+                end_t = dtime(hour + length, 0)
+                series.append((i, f"bench-{i:03d}-{y}-{k}", year_start, year_end, days, dtime(hour, 0), end_t))
+            for _ in range(rng.randint(1, 4)):
+                first = year_start + timedelta(days=rng.randint(0, max(0, (year_end - year_start).days - 10)))
+                time_off.append((i, first, first + timedelta(days=rng.randint(0, 9)), rng.choice(REASONS)))
+        d = date(start.year, start.month, 1)
+        while d <= end:
+            if rng.random() < 0.7:
+                adjustments.append((i, d + timedelta(days=rng.randint(0, 27)), round(rng.uniform(-80, 120), 2),
+                                    rng.choice([None, "Mileage", "Supplies", "Advance"])))
+            d = date(d.year + (d.month == 12), d.month % 12 + 1, 1)
+    return {"end": end, "employees": employees, "series": series, "time_off": time_off, "adjustments": adjustments}
+
+
+def generate(db_path, caregivers=50, years=5, seed=1234, start=date(2021, 1, 4)):
+    """Create the database at db_path (must not exist). Returns a summary dict with row counts."""
+    if os.path.exists(db_path):
+        raise FileExistsError(db_path)
+    # database.py resolves CARE_DB_PATH at import time
+    os.environ["CARE_DB_PATH"] = os.path.abspath(db_path)
+    sys.path.append(str(Path(__file__).resolve().parent.parent / "backend"))
+    from werkzeug.security import generate_password_hash
+    import database
+
+    spec = plan(caregivers, years, seed, start)
+    database.init_db()
+    conn = database.get_db()
+    conn.executemany(
+        "INSERT INTO employees (name, position, hourly_rate) VALUES (?, ?, ?)", spec["employees"]
+    )
+    conn.commit()
+    database.clear_cache()
+    ids = [r["id"] for r in conn.execute("SELECT id FROM employees ORDER BY id")]
+    for idx, series_id, first, last, days, start_t, end_t in spec["series"]:
+        database.create_series(ids[idx], series_id, first, last, days, start_t, end_t)
+    database.ensure_series_materialized(spec["end"].isoformat())
+    conn.executemany(
+        "INSERT INTO time_off (employee_id, start_date, end_date, reason) VALUES (?, ?, ?, ?)",
+        [(ids[i], a.isoformat(), b.isoformat(), reason) for i, a, b, reason in spec["time_off"]],
+    )
+    conn.executemany(
+        "INSERT INTO pay_adjustments (employee_id, date, amount, note) VALUES (?, ?, ?, ?)",
+        [(ids[i], d.isoformat(), amount, note) for i, d, amount, note in spec["adjustments"]],
+    )
+    conn.commit()
+    method = os.environ.get("CARE_PWHASH_METHOD", "pbkdf2:sha256:15000")
+    database.insert_user("Bench", BENCH_EMAIL, generate_password_hash(BENCH_PASSWORD, method=method))
+    conn.execute("PRAGMA optimize")
+    counts = {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+              for t in ("employees", "series", "shifts", "time_off", "pay_adjustments")}
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    database.close_all_db()
+    return {
+        "caregivers": caregivers, "years": years, "seed": seed,
+        "start": start.isoformat(), "end": spec["end"].isoformat(), "rows": counts,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a deterministic benchmark database")
+    parser.add_argument("--db", required=True, help="Path of the database to create (must not exist)")
+    parser.add_argument("--caregivers", type=int, default=50)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--start", default="2021-01-04", help="First day of the data (YYYY-MM-DD)")
+    args = parser.parse_args()
+    summary = generate(args.db, args.caregivers, args.years, args.seed, date.fromisoformat(args.start))
+    print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
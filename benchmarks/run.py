@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+In-process benchmark of the key request paths against a synthetic multi-year dataset.
+
+Usage:
+    python benchmarks/run.py [--caregivers 50] [--years 5] [--seed 1234] [--repeat 20] [--warmup 2]
+                             [--only hours_week,login] [--output PATH] [--compare OLD.json] [--threshold 0.25]
+
+Generates a fresh database with benchmarks/dataset.py (using the code under test, so schema and
+migrations match the commit being measured), then times each case through Flask's test client.
+Startup is timed too: fresh interpreters importing the app and running init_db() against the
+already-migrated database (startup_import_app, startup_init_db, startup_total).
+Results are written as JSON (default: benchmarks/results/<commit>.json) and printed as a table.
+With --compare, medians are checked against an earlier results file; the exit status is 1 when a
+case got slower by more than --threshold (relative) and --min-delta-ms (absolute), or failed.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import dataset  # noqa: E402
+
+
+def _git(*args):
+    try:
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Context:
+    """Dates and ids the cases need, derived from the dataset summary (never from today)."""
+
+    def __init__(self, summary, employee_ids):
+        first = date.fromisoformat(summary["start"])
+        last = date.fromisoformat(summary["end"])
+        mid = first + (last - first) / 2
+        self.employee_ids = employee_ids
+        self.monday = mid - timedelta(days=mid.weekday())
+        self.month_start = date(mid.year, mid.month, 1)
+        self.month_end = date(mid.year + (mid.month == 12), mid.month % 12 + 1, 1) - timedelta(days=1)
+        self.grid_start = self.month_start - timedelta(days=self.month_start.weekday())
+        self.year = mid.year
+        self.series_year = (mid.year - first.year)
+        self.etags = {}  # url -> ETag of the last full response (revalidation cases)
+        self.after_end = last + timedelta(days=30)
+
+
+def _case_shifts_page(client, ctx, i):
+    return client.get(f"/shifts?start={ctx.grid_start.isoformat()}"), 200
+
+
+def _case_shifts_page_gzip(client, ctx, i):
+    # Same page as a browser asks for it; the body is identical each time, so after the warmup the
+    # compressed copy comes from the middleware's ETag cache
+    return client.get(f"/shifts?start={ctx.grid_start.isoformat()}", headers={"Accept-Encoding": "gzip"}), 200
+
+
+def _case_shifts_page_304(client, ctx, i):
+    # Kiosk reload: send back the ETag of an earlier response; nothing changed since, so no query or render
+    url = f"/shifts?start={ctx.grid_start.isoformat()}"
+    if url not in ctx.etags:
+        with client.get(url) as first:
+            ctx.etags[url] = first.headers.get("ETag")
+    return client.get(url, headers={"If-None-Match": ctx.etags[url]}), 304
+
+
+def _case_api_shifts_month(client, ctx, i):
+    end = ctx.grid_start + timedelta(days=41)
+    return client.get(f"/api/shifts?start={ctx.grid_start.isoformat()}&end={end.isoformat()}"), 200
+
+
+def _case_hours_week(client, ctx, i):
+    end = ctx.monday + timedelta(days=6)
+    return client.get(f"/hours?start={ctx.monday.isoformat()}&end={end.isoformat()}"), 200
+
+
+def _case_hours_month(client, ctx, i):
+    return client.get(f"/hours?start={ctx.month_start.isoformat()}&end={ctx.month_end.isoformat()}"), 200
+
+
+def _case_hours_csv_year(client, ctx, i):
+    return client.get(f"/hours.csv?start={ctx.year}-01-01&end={ctx.year}-12-31"), 200
+
+
+def _case_update_series(client, ctx, i):
+    n = len(ctx.employee_ids)
+    payload = {
+        "series_id": f"bench-{i % n:03d}-{ctx.series_year}-0",
+        "start_date": ctx.monday.isoformat(),
+        "time": "08:00" if (i // n) % 2 == 0 else "09:00",
+        "end_time": "16:00",
+        "weekdays": [0, 2, 4],
+        "repeat_until": f"{ctx.year}-12-31",
+        "force": True,  # the synthetic series overlap time off; measure the save, not the 409
+    }
+    return client.post("/api/update_series", json=payload), 200
+
+
+def _case_time_off_create(client, ctx, i):
+    n = len(ctx.employee_ids)
+    first = ctx.after_end + timedelta(days=(i // n) * 10)
+    payload = {
+        "employee_id": ctx.employee_ids[i % n],
+        "start_date": first.isoformat(),
+        "end_date": (first + timedelta(days=4)).isoformat(),
+        "reason": "Benchmark",
+    }
+    return client.post("/api/time_off", json=payload), 201
+
+
+def _case_time_off_list(client, ctx, i):
+    return client.get(f"/api/time_off?start={ctx.month_start.isoformat()}&end={ctx.month_end.isoformat()}"), 200
+
+
+def _case_recurring_create(client, ctx, i):
+    n = len(ctx.employee_ids)
+    first = ctx.after_end + timedelta(days=7 * (i // n))
+    form = {
+        "employee_id": str(ctx.employee_ids[i % n]),
+        "shift_time": f"{first.isoformat()}T{7 + i % 5:02d}:{(i * 7) % 60:02d}",
+        "end_time": "18:00",
+        "repeat_weekly": "on",
+        "repeat_until": (first + timedelta(days=365)).isoformat(),
+        "selected_days": ["0", "2", "4"],
+        "force": "1",
+    }
+    return client.post("/shifts", data=form), 302
+
+
+def _case_conflicts_series(client, ctx, i):
+    n = len(ctx.employee_ids)
+    payload = {
+        "employee_id": ctx.employee_ids[i % n],
+        "shift_time": f"{ctx.year}-01-02T08:00",
+        "end_time": "16:00",
+        "repeat_weekly": True,
+        "weekdays": [0, 1, 2, 3, 4],
+        "repeat_until": f"{ctx.year}-12-31",
+    }
+    return client.post("/api/shift_conflicts", json=payload), 200
+
+
+def _case_coverage_year(client, ctx, i):
+    # Default window; warmup fills the daily_coverage rollup, so this is the steady-state read
+    return client.get(f"/api/coverage?start={ctx.year}-01-01&end={ctx.year}-12-31"), 200
+
+
+def _case_login(client, ctx, i):
+    fresh = client.application.test_client()
+    resp = fresh.post("/login", data={"email": dataset.BENCH_EMAIL, "password": dataset.BENCH_PASSWORD})
+    return resp, 302
+
+
+CASES = [
+    ("shifts_page", _case_shifts_page),
+    ("shifts_page_gzip", _case_shifts_page_gzip),
+    ("shifts_page_304", _case_shifts_page_304),
+    ("api_shifts_month", _case_api_shifts_month),
+    ("hours_week", _case_hours_week),
+    ("hours_month", _case_hours_month),
+    ("hours_csv_year", _case_hours_csv_year),
+    ("update_series", _case_update_series),
+    ("time_off_create", _case_time_off_create),
+    ("time_off_list", _case_time_off_list),
+    ("recurring_create", _case_recurring_create),
+    ("conflicts_series", _case_conflicts_series),
+    ("coverage_year", _case_coverage_year),
+    ("login", _case_login),
+]
+
+
+def _stats(samples):
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    return {
+        "n": len(ordered),
+        "min_ms": round(ordered[0], 3),
+        "median_ms": round(statistics.median(ordered), 3),
+        "mean_ms": round(statistics.fmean(ordered), 3),
+        "p95_ms": round(p95, 3),
+        "max_ms": round(ordered[-1], 3),
+    }
+
+
+def run_cases(app_module, ctx, names, repeat, warmup):
+    client = app_module.app.test_client()
+    resp = client.post("/login", data={"email": dataset.BENCH_EMAIL, "password": dataset.BENCH_PASSWORD})
+    if resp.status_code != 302:
+        raise SystemExit(f"benchmark login failed ({resp.status_code})")
+    results = {}
+    for name, fn in CASES:
+        if names and name not in names:
+            continue
+        samples, failures, i = [], 0, 0
+        # Collect up front and keep the cyclic GC out of the timed region to cut run-to-run noise
+        gc.collect()
+        gc.disable()
+        for k in range(warmup + repeat):
+            t0 = time.perf_counter()
+            resp, expected = fn(client, ctx, i)
+            resp.get_data()  # drain streamed bodies inside the timing
+            dt_ms = (time.perf_counter() - t0) * 1000.0
+            resp.close()
+            i += 1
+            if resp.status_code != expected:
+                failures += 1
+                continue
+            if k >= warmup:
+                samples.append(dt_ms)
+        gc.enable()
+        results[name] = _stats(samples) if samples else {"n": 0}
+        results[name]["failures"] = failures
+        print(f"  {name:<18} {results[name].get('median_ms', float('nan')):9.2f} ms median"
+              f"{'  (' + str(failures) + ' failed)' if failures else ''}")
+    return results
+
+
+STARTUP_CASES = ("startup_import_app", "startup_init_db", "startup_total")
+
+# Runs in a fresh interpreter per sample: module imports are only cold once per process
+_STARTUP_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+app.init_db()
+t2 = time.perf_counter()
+print(json.dumps([(t1 - t0) * 1000.0, (t2 - t1) * 1000.0]))
+"""
+
+
+def run_startup(env, names, repeat):
+    wanted = [n for n in STARTUP_CASES if not names or n in names]
+    if not wanted:
+        return {}
+    samples = {n: [] for n in STARTUP_CASES}
+    failures = 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-c", _STARTUP_PROBE], cwd=ROOT / "backend", env=env,
+                              capture_output=True, text=True)
+        total_ms = (time.perf_counter() - t0) * 1000.0
+        if proc.returncode != 0:
+            failures += 1
+            continue
+        import_ms, init_ms = json.loads(proc.stdout.strip().splitlines()[-1])
+        samples["startup_import_app"].append(import_ms)
+        samples["startup_init_db"].append(init_ms)
+        samples["startup_total"].append(total_ms)
+    results = {}
+    for name in wanted:
+        results[name] = _stats(samples[name]) if samples[name] else {"n": 0}
+        results[name]["failures"] = failures
+        print(f"  {name:<18} {results[name].get('median_ms', float('nan')):9.2f} ms median"
+              f"{'  (' + str(failures) + ' failed)' if failures else ''}")
+    return results
+
+
+def compare(current, baseline_path, threshold, min_delta_ms):
+    with open(baseline_path, encoding="utf-8") as fh:
+        baseline = json.load(fh)
+    base_commit = baseline.get("meta", {}).get("git_commit")
+    print(f"\nCompared with {baseline_path} ({base_commit or 'unknown commit'}):")
+    print(f"  {'case':<18} {'before':>9} {'after':>9} {'change':>8}")
+    regressions = 0
+    for name, res in current["results"].items():
+        old = baseline.get("results", {}).get(name)
+        if not old or "median_ms" not in old or "median_ms" not in res:
+            bad = bool(res.get("failures"))
+            print(f"  {name:<18} {'-':>9} {res.get('median_ms', float('nan')):9.2f} {'FAILED' if bad else 'new':>8}")
+            regressions += 1 if bad else 0
+            continue
+        before, after = old["median_ms"], res["median_ms"]
+        change = (after - before) / before if before else 0.0
+        slower = change > threshold and (after - before) > min_delta_ms
+        bad = slower or bool(res.get("failures"))
+        regressions += 1 if bad else 0
+        print(f"  {name:<18} {before:9.2f} {after:9.2f} {change * 100:+7.1f}%{'  REGRESSION' if bad else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Care Calendar request paths")
+    parser.add_argument("--caregivers", type=int, default=50)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--repeat", type=int, default=20, help="Timed iterations per case")
+    parser.add_argument("--warmup", type=int, default=2, help="Untimed iterations per case")
+    parser.add_argument("--only", help="Comma-separated case names (default: all)")
+    parser.add_argument("--output", help="Results JSON path (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="Earlier results JSON to compare medians against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Relative slowdown that counts as a regression")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="Ignore slowdowns smaller than this")
+    parser.add_argument("--keep-db", action="store_true", help="Keep the generated database and print its path")
+    args = parser.parse_args()
+
+    names = set(args.only.split(",")) if args.only else None
+    unknown = (names or set()) - {n for n, _ in CASES} - set(STARTUP_CASES)
+    if unknown:
+        parser.error(f"unknown case(s): {', '.join(sorted(unknown))}")
+
+    workdir = tempfile.mkdtemp(prefix="care-bench-")
+    db_path = os.path.join(workdir, "database.db")
+    t0 = time.perf_counter()
+    # Separate process: database.py reads CARE_DB_PATH once at import
+    out = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve().parent / "dataset.py"), "--db", db_path,
+         "--caregivers", str(args.caregivers), "--years", str(args.years), "--seed", str(args.seed)],
+        capture_output=True, text=True, check=True,
+    ).stdout
+    summary = json.loads(out.strip().splitlines()[-1])
+    print(f"Dataset: {summary['rows']} ({time.perf_counter() - t0:.1f}s to generate)")
+
+    os.environ.update({
+        "CARE_DB_PATH": db_path, "CARE_AUTOLOGIN": "0", "CARE_LOG_LEVEL": "WARNING",
+        "FLASK_SECRET_KEY": "benchmark",
+    })
+    sys.path.insert(0, str(ROOT / "backend"))
+    import app as app_module
+    app_module.init_db()
+    conn = sqlite3.connect(db_path)
+    employee_ids = [r[0] for r in conn.execute("SELECT id FROM employees ORDER BY id")]
+    conn.close()
+    ctx = Context(summary, employee_ids)
+
+    print(f"Timing {args.repeat} iterations per case (+{args.warmup} warmup):")
+    results = run_cases(app_module, ctx, names, args.repeat, args.warmup)
+    results.update(run_startup(dict(os.environ), names, max(5, args.repeat // 2)))
+
+    commit = _git("rev-parse", "--short", "HEAD")
+    dirty = bool(_git("status", "--porcelain", "--untracked-files=no"))
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git_commit": commit,
+            "git_dirty": dirty,
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "repeat": args.repeat,
+            "warmup": args.warmup,
+            "dataset": summary,
+        },
+        "results": results,
+    }
+    output = args.output or str(ROOT / "benchmarks" / "results" / f"{commit or 'unknown'}{'-dirty' if dirty else ''}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2)
+    print(f"Results written to {output}")
+
+    status = 0
+    if args.compare:
+        status = 1 if compare(report, args.compare, args.threshold, args.min_delta_ms) else 0
+    if args.keep_db:
+        print(f"Database kept at {db_path}")
+    else:
+        shutil.rmtree(workdir, ignore_errors=True)
+    sys.exit(status or (1 if any(r.get("failures") for r in results.values()) else 0))
+
+
+if __name__ == "__main__":
+    main()
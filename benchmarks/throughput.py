@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+HTTP throughput of main.py under concurrent keep-alive clients, development vs production server.
+
+Usage:
+    python benchmarks/throughput.py [--modes dev,production] [--clients 8] [--duration 10]
+                                    [--workers 2] [--threads 4] [--caregivers 50] [--years 5] [--output PATH]
+
+Generates the benchmark dataset (benchmarks/dataset.py), starts `python main.py` (and
+`python main.py --production --workers N --threads M`) on a free port against a copy of it, logs
+in, then has --clients threads issue GETs over persistent connections for --duration seconds,
+cycling through the calendar month API, the weekly hours report, time off and the /shifts page.
+Prints requests/second and latency percentiles per mode and writes them as JSON.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from urllib.parse import urlencode
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import dataset  # noqa: E402
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _paths(summary):
+    first = date.fromisoformat(summary["start"])
+    last = date.fromisoformat(summary["end"])
+    mid = first + (last - first) / 2
+    monday = mid - timedelta(days=mid.weekday())
+    month = date(mid.year, mid.month, 1)
+    grid = month - timedelta(days=month.weekday())
+    return [
+        f"/api/shifts?start={grid.isoformat()}&end={(grid + timedelta(days=41)).isoformat()}",
+        f"/hours?start={monday.isoformat()}&end={(monday + timedelta(days=6)).isoformat()}",
+        f"/api/time_off?start={month.isoformat()}&end={(month + timedelta(days=30)).isoformat()}",
+        f"/shifts?start={grid.isoformat()}",
+    ]
+
+
+def _login(port):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    body = urlencode({"email": dataset.BENCH_EMAIL, "password": dataset.BENCH_PASSWORD})
+    conn.request("POST", "/login", body, {"Content-Type": "application/x-www-form-urlencoded"})
+    resp = conn.getresponse()
+    resp.read()
+    cookie = resp.getheader("Set-Cookie", "").split(";", 1)[0]
+    conn.close()
+    if resp.status != 302 or not cookie:
+        raise SystemExit(f"login failed: {resp.status}")
+    return cookie
+
+
+def _wait_ready(port, proc, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"server exited with {proc.returncode}")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                conn.close()
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit("server did not become ready")
+
+
+def _client(port, cookie, paths, offset, stop_at, latencies, errors):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    i = offset
+    while time.perf_counter() < stop_at:
+        path = paths[i % len(paths)]
+        i += 1
+        t0 = time.perf_counter()
+        try:
+            conn.request("GET", path, headers={"Cookie": cookie})
+            resp = conn.getresponse()
+            resp.read()
+            ok = resp.status == 200
+            if resp.getheader("Connection", "").lower() == "close":
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        except (OSError, http.client.HTTPException):
+            ok = False
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        if ok:
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+        else:
+            errors.append(path)
+    conn.close()
+
+
+def measure(mode, db_template, summary, args):
+    workdir = tempfile.mkdtemp(prefix=f"care-tp-{mode}-")
+    db_path = os.path.join(workdir, "database.db")
+    shutil.copy(db_template, db_path)
+    port = _free_port()
+    env = dict(os.environ, CARE_DB_PATH=db_path, PORT=str(port), HOST="127.0.0.1", CARE_AUTOLOGIN="0",
+               CARE_LOG_LEVEL="WARNING", FLASK_DEBUG="0", FLASK_SECRET_KEY="benchmark")
+    cmd = [sys.executable, str(ROOT / "main.py")]
+    if mode == "production":
+        cmd += ["--production", "--workers", str(args.workers), "--threads", str(args.threads)]
+    proc = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        _wait_ready(port, proc)
+        cookie = _login(port)
+        paths = _paths(summary)
+        latencies, errors = [], []
+        # short warmup so every worker/thread has its connection and templates loaded
+        warm_stop = time.perf_counter() + 1.0
+        warm = [threading.Thread(target=_client, args=(port, cookie, paths, n, warm_stop, [], []))
+                for n in range(args.clients)]
+        for t in warm:
+            t.start()
+        for t in warm:
+            t.join()
+        stop_at = time.perf_counter() + args.duration
+        threads = [threading.Thread(target=_client, args=(port, cookie, paths, n, stop_at, latencies, errors))
+                   for n in range(args.clients)]
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t0
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        shutil.rmtree(workdir, ignore_errors=True)
+    ordered = sorted(latencies)
+
+    def pct(q):
+        return round(ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))], 3) if ordered else None
+
+    return {
+        "requests": len(ordered),
+        "errors": len(errors),
+        "seconds": round(elapsed, 3),
+        "req_per_s": round(len(ordered) / elapsed, 1) if elapsed else 0.0,
+        "median_ms": round(statistics.median(ordered), 3) if ordered else None,
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "workers": args.workers if mode == "production" else 1,
+        "threads": args.threads if mode == "production" else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure HTTP throughput of the dev and production servers")
+    parser.add_argument("--modes", default="dev,production", help="Comma-separated: dev, production")
+    parser.add_argument("--clients", type=int, default=8, help="Concurrent keep-alive clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per mode")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--caregivers", type=int, default=50)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", help="Write results JSON here")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="care-tp-data-")
+    template = os.path.join(tmp, "database.db")
+    out = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve().parent / "dataset.py"), "--db", template,
+         "--caregivers", str(args.caregivers), "--years", str(args.years), "--seed", str(args.seed)],
+        capture_output=True, text=True, check=True,
+    ).stdout
+    summary = json.loads(out.strip().splitlines()[-1])
+    print(f"Dataset: {summary['rows']}")
+
+    results = {}
+    try:
+        for mode in args.modes.split(","):
+            res = measure(mode, template, summary, args)
+            results[mode] = res
+            print(f"  {mode:<11} {res['req_per_s']:8.1f} req/s  median {res['median_ms']} ms  "
+                  f"p95 {res['p95_ms']} ms  p99 {res['p99_ms']} ms  errors {res['errors']}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    if args.output:
+        report = {
+            "meta": {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "clients": args.clients,
+                "duration_s": args.duration,
+                "dataset": summary,
+            },
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"Results written to {args.output}")
+    sys.exit(1 if any(r["errors"] for r in results.values()) else 0)
+
+
+if __name__ == "__main__":
+    main()
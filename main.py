@@ -4,9 +4,14 @@ Root entry point for the Care Calendar Flask app.
 This bootstraps the existing application located under
 'backend' so you can run it from
 the project root without moving files.
+
+    python main.py                      # Werkzeug development server (FLASK_DEBUG=1 for reloader/debugger)
+    python main.py --production         # gunicorn, CARE_WORKERS x CARE_THREADS (see backend/serving.py)
+    CARE_SERVER=production python main.py
 """
 from __future__ import annotations
 
+import argparse
 import os
 import sys
 
@@ -18,17 +23,42 @@ def _ensure_legacy_on_path() -> None:
         sys.path.insert(0, legacy_dir)
 
 
-def main() -> None:
+def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the Care Calendar app")
+    parser.add_argument(
+        "--production",
+        action="store_true",
+        default=os.environ.get("CARE_SERVER", "dev") == "production",
+        help="Serve with gunicorn worker processes instead of the development server",
+    )
+    parser.add_argument("--workers", type=int, help="Worker processes (production; default CARE_WORKERS or 2)")
+    parser.add_argument("--threads", type=int, help="Threads per worker (production; default CARE_THREADS or 4)")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = _parse_args(argv)
     _ensure_legacy_on_path()
+    host = os.environ.get("HOST", "127.0.0.1")
+    port = int(os.environ.get("PORT", "5000"))
+
+    if args.production:
+        # Workers import the app after forking; the master only migrates the schema (once, locked)
+        import serving  # type: ignore
+
+        serving.run_production(host, port, workers=args.workers, threads=args.threads)
+        return
+
     # Import the existing Flask app module once the path is set.
     import app as legacy_app  # type: ignore
 
     # Initialize DB and start the server
     if hasattr(legacy_app, "init_db"):
         legacy_app.init_db()  # type: ignore[attr-defined]
-    host = os.environ.get("HOST", "127.0.0.1")
-    port = int(os.environ.get("PORT", "5000"))
-    debug = os.environ.get("FLASK_DEBUG", "1") not in ("0", "false", "False")
+    if hasattr(legacy_app, "resolve_autologin_user"):
+        legacy_app.resolve_autologin_user()  # type: ignore[attr-defined]
+    # Debugger/reloader only when asked for explicitly
+    debug = os.environ.get("FLASK_DEBUG", "0") not in ("0", "false", "False")
     legacy_app.app.run(host=host, port=port, debug=debug)
 
 
@@ -6,7 +6,14 @@ TS="$(date +%Y%m%d_%H%M%S)"
 OUT="${ROOT_DIR}/backups/database_${TS}.db"
 mkdir -p "${ROOT_DIR}/backups"
 if [ -f "$DB" ]; then
-  cp "$DB" "$OUT"
+  # The app runs SQLite in WAL mode: committed pages may still live in database.db-wal,
+  # so prefer the online backup API over a plain file copy.
+  if command -v sqlite3 >/dev/null 2>&1; then
+    sqlite3 "$DB" ".backup '$OUT'"
+  else
+    cp "$DB" "$OUT"
+    [ -f "$DB-wal" ] && cp "$DB-wal" "$OUT-wal"
+  fi
   echo "Backup created: $OUT"
 else
   echo "No database found at $DB"
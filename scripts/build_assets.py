@@ -0,0 +1,483 @@
+#!/usr/bin/env python3
+"""
+Build the static assets into backend/static/dist/ with content-hashed names.
+
+Usage:
+    python scripts/build_assets.py [--fonts DIR] [--clean]
+
+Writes, next to a manifest.json that backend/assets.py reads at startup:
+- the JS/CSS bundles in assets.BUNDLES, concatenated and minified (comments and indentation
+  removed; line breaks that could matter to semicolon insertion are kept), plus a .gz copy;
+- resized JPEG/PNG and WebP variants of assets.IMAGES (EXIF, including GPS tags, is dropped);
+- fonts.css with Kanit (the assets.FONT_WEIGHTS weights, Latin subset) and the Font Awesome
+  solid icons the templates and scripts use, subset to those glyphs.
+
+Fonts are read from --fonts (default backend/fonts/): Kanit-*.ttf from Google Fonts and the
+Font Awesome Free "for the web" download (webfonts/fa-solid-900.ttf and css/all.css). Images need
+Pillow and fonts need fonttools (plus brotli for woff2); a step whose tools or sources are
+missing is skipped and the pages keep using the originals/CDN for it. If node is on PATH the
+bundles are syntax-checked with `node --check`.
+
+Restart the app after a build. Older hashed files are kept so pages cached in browsers still
+load; --clean removes files the new manifest no longer references.
+"""
+
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT / "backend"))
+import assets  # noqa: E402
+
+STATIC = Path(assets.STATIC_DIR)
+DIST = Path(assets.DIST_DIR)
+TEMPLATES = ROOT / "backend" / "templates"
+
+
+class Dist:
+    """Writes content-hashed files under DIST and remembers what this build produced."""
+
+    def __init__(self):
+        self.written = set()
+
+    def write(self, rel, data):
+        stem, ext = os.path.splitext(rel)
+        name = f"{stem}.{hashlib.sha256(data).hexdigest()[:10]}{ext}"
+        self._put(name, data)
+        if ext in assets.GZIP_EXTS:
+            packed = gzip.compress(data, 9, mtime=0)
+            if len(packed) < len(data):
+                self._put(name + ".gz", packed)
+        return name
+
+    def gz_size(self, name):
+        path = DIST / (name + ".gz")
+        return path.stat().st_size if path.exists() else None
+
+    def _put(self, name, data):
+        self.written.add(name)
+        path = DIST / name
+        if path.exists():
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+
+# ---- JS / CSS minification ----
+
+# A "/" after one of these (or at the start) begins a regex literal, otherwise it is division
+_REGEX_AFTER_PUNCT = set("(,=:[!&|?{};+-*%<>~^")
+_REGEX_AFTER_WORDS = {
+    "return", "typeof", "case", "do", "else", "in", "of", "new", "delete", "void", "throw",
+    "instanceof", "yield", "await",
+}
+# A line break next to these can go: no semicolon would be inserted there
+_NO_ASI_BEFORE = set(")]},;.?:=&|*%^<>")
+_NO_ASI_AFTER = set("{([,;:=&|?!*%^~<>")
+
+
+def _word_char(c):
+    return c.isalnum() or c in "_$" or ord(c) > 127
+
+
+def _skip_string(src, i):
+    quote, j = src[i], i + 1
+    while src[j] != quote:
+        if src[j] == "\\":
+            j += 1
+        elif src[j] == "\n":
+            raise ValueError(f"unterminated string at offset {i}")
+        j += 1
+    return j + 1
+
+
+def _skip_template(src, i):
+    j = i + 1
+    while src[j] != "`":
+        if src[j] == "\\":
+            j += 2
+        elif src.startswith("${", j):
+            j = _skip_braces(src, j + 2)
+        else:
+            j += 1
+    return j + 1
+
+
+def _skip_braces(src, j):
+    """Index just past the "}" closing a template ${...} substitution that starts at j."""
+    depth = 0
+    while True:
+        c = src[j]
+        if c in "\"'":
+            j = _skip_string(src, j)
+            continue
+        if c == "`":
+            j = _skip_template(src, j)
+            continue
+        if c == "{":
+            depth += 1
+        elif c == "}":
+            if depth == 0:
+                return j + 1
+            depth -= 1
+        j += 1
+
+
+def _skip_regex(src, i):
+    j, in_class = i + 1, False
+    while True:
+        c = src[j]
+        if c == "\\":
+            j += 1
+        elif c == "[":
+            in_class = True
+        elif c == "]":
+            in_class = False
+        elif c == "/" and not in_class:
+            break
+        elif c == "\n":
+            raise ValueError(f"unterminated regex at offset {i}")
+        j += 1
+    j += 1
+    while j < len(src) and _word_char(src[j]):
+        j += 1
+    return j
+
+
+def minify_js(src):
+    """Drop comments and indentation, keeping every token (strings, templates, regexes) verbatim."""
+    out = []
+    last = ""
+    space = newline = False
+    i, n = 0, len(src)
+    while i < n:
+        c = src[i]
+        if c == "\n":
+            newline = True
+            i += 1
+            continue
+        if c.isspace() or c == "\ufeff":
+            space = True
+            i += 1
+            continue
+        if src.startswith("//", i):
+            j = src.find("\n", i)
+            i = n if j < 0 else j
+            continue
+        if src.startswith("/*", i):
+            j = src.find("*/", i + 2)
+            if j < 0:
+                raise ValueError(f"unterminated comment at offset {i}")
+            if "\n" in src[i:j]:
+                newline = True
+            else:
+                space = True
+            i = j + 2
+            continue
+
+        if c in "\"'":
+            j = _skip_string(src, i)
+        elif c == "`":
+            j = _skip_template(src, i)
+        elif c == "/" and (not last or last in _REGEX_AFTER_WORDS or (
+                not _word_char(last[-1]) and last[-1] in _REGEX_AFTER_PUNCT)):
+            j = _skip_regex(src, i)
+        elif c.isdigit() or (c == "." and i + 1 < n and src[i + 1].isdigit()):
+            j = i + 1
+            while j < n and (_word_char(src[j]) or src[j] == "." or (src[j] in "+-" and src[j - 1] in "eE")):
+                j += 1
+        elif _word_char(c):
+            j = i + 1
+            while j < n and _word_char(src[j]):
+                j += 1
+        else:
+            j = i + 1
+        token = src[i:j]
+
+        if out:
+            prev, first = out[-1][-1], token[0]
+            # ".5" is a number, not member access, so a break before it stays
+            joins = first in _NO_ASI_BEFORE and not (first == "." and len(token) > 1)
+            if newline and prev not in _NO_ASI_AFTER and not joins:
+                out.append("\n")
+            elif (space or newline) and (
+                (_word_char(prev) and _word_char(first))
+                or (prev == first and prev in "+-/")
+                or (prev == "/" and _word_char(first))
+            ):
+                out.append(" ")
+        out.append(token)
+        last = token
+        space = newline = False
+        i = j
+    return "".join(out) + "\n"
+
+
+def minify_css(src):
+    """Drop comments and collapse whitespace; strings and url(...) are copied unchanged."""
+    out = []
+    space = False
+    i, n = 0, len(src)
+    while i < n:
+        c = src[i]
+        if src.startswith("/*", i):
+            j = src.find("*/", i + 2)
+            if j < 0:
+                raise ValueError(f"unterminated comment at offset {i}")
+            i = j + 2
+            space = True
+            continue
+        if c.isspace():
+            space = True
+            i += 1
+            continue
+        if c in "\"'":
+            j = _skip_string(src, i)
+        elif src.startswith("url(", i):
+            k = i + 4
+            while src[k].isspace():
+                k += 1
+            j = src.index(")", _skip_string(src, k) if src[k] in "\"'" else k) + 1
+        else:
+            j = i + 1
+        token = src[i:j]
+        if c == "}" and out and out[-1] == ";":
+            out.pop()
+        if space and out and out[-1][-1] not in "{};,>:" and token not in ("{", "}", ";", ",", ">"):
+            out.append(" ")
+        out.append(token)
+        space = False
+        i = j
+    return "".join(out) + "\n"
+
+
+_CSS_URL_RE = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+
+
+def _rewrite_css_urls(css, source_rel, out_dir, dist):
+    """Point relative url()s at hashed copies; paths are relative to the bundle's directory."""
+    def repl(m):
+        url = m.group(2).strip()
+        if re.match(r"^(data:|[a-z]+:|/|#)", url):
+            return m.group(0)
+        target = STATIC / os.path.dirname(source_rel) / url.split("?")[0].split("#")[0]
+        if not target.is_file():
+            print(f"  warning: {source_rel} references missing {url}")
+            return m.group(0)
+        rel = target.resolve().relative_to(STATIC.resolve()).as_posix()
+        return f"url({os.path.relpath(dist.write(rel, target.read_bytes()), out_dir)})"
+    return _CSS_URL_RE.sub(repl, css)
+
+
+def build_bundles(dist, files):
+    node = shutil.which("node")
+    for name, sources in assets.BUNDLES.items():
+        ext = os.path.splitext(name)[1]
+        out_dir = ext[1:]
+        parts, raw = [], 0
+        for rel in sources:
+            text = (STATIC / rel).read_text(encoding="utf-8")
+            raw += len(text.encode())
+            if ext == ".css":
+                parts.append(minify_css(_rewrite_css_urls(text, rel, out_dir, dist)))
+            else:
+                # ";" guards against a file that ends without one before the next starts
+                parts.append(minify_js(text) + ";")
+        data = "".join(parts).encode()
+        built = files[name] = dist.write(f"{out_dir}/{name}", data)
+        if ext == ".js" and node:
+            check = subprocess.run([node, "--check", str(DIST / built)], capture_output=True, text=True)
+            if check.returncode:
+                sys.exit(f"node --check failed for {built}:\n{check.stderr}")
+        print(f"{built}: {raw / 1024:.1f} KiB -> {len(data) / 1024:.1f} KiB "
+              f"(gzip {(dist.gz_size(built) or len(data)) / 1024:.1f} KiB)")
+
+
+# ---- Images ----
+
+def build_images(dist, images):
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        print("Pillow not installed: skipping images (pip install Pillow)")
+        return
+    for rel, (widths, _sizes) in assets.IMAGES.items():
+        stem, ext = os.path.splitext(rel)
+        with Image.open(STATIC / rel) as original:
+            im = ImageOps.exif_transpose(original)
+            fmt = "PNG" if ext.lower() == ".png" else "JPEG"
+            if fmt == "JPEG":
+                im = im.convert("RGB")
+            variants = []
+            for width in widths:
+                width = min(width, im.width)
+                if variants and variants[-1][0] == width:
+                    continue
+                small = im.resize((width, round(im.height * width / im.width)), Image.LANCZOS)
+                buf, webp = io.BytesIO(), io.BytesIO()
+                if fmt == "JPEG":
+                    small.save(buf, fmt, quality=80, optimize=True, progressive=True)
+                else:
+                    small.save(buf, fmt, optimize=True)
+                small.save(webp, "WEBP", quality=80, method=6)
+                variants.append([
+                    width,
+                    dist.write(f"{stem}-{width}{ext}", buf.getvalue()),
+                    dist.write(f"{stem}-{width}.webp", webp.getvalue()),
+                ])
+        images[rel] = variants
+        sizes = ", ".join(f"{v[0]}w {(DIST / v[1]).stat().st_size / 1024:.0f}/{(DIST / v[2]).stat().st_size / 1024:.0f} KiB"
+                          for v in variants)
+        print(f"{rel}: {(STATIC / rel).stat().st_size / 1024:.0f} KiB -> {sizes} ({ext[1:]}/webp)")
+
+
+# ---- Fonts ----
+
+# Latin-1 plus the punctuation typed into names and notes; characters the templates and scripts
+# contain are added on top. Anything else falls back to the next font in the stack.
+LATIN = set(range(0x20, 0x7F)) | set(range(0xA0, 0x100)) | {ord(c) for c in "–—‘’‚“”„•…€™−×"}
+_FA_RULE_RE = re.compile(r"((?:\.fa-[\w-]+::?before\s*,?\s*)+)\{\s*content:\s*\"\\([0-9a-fA-F]+)\"")
+_FA_USE_RE = re.compile(r"\bfa-[a-z0-9-]+")
+
+
+def _page_sources():
+    paths = list(TEMPLATES.rglob("*.html"))
+    paths += [STATIC / rel for sources in assets.BUNDLES.values() for rel in sources if rel.endswith(".js")]
+    return [p.read_text(encoding="utf-8") for p in paths]
+
+
+def _unicode_range(codepoints):
+    ranges, cps = [], sorted(codepoints)
+    start = prev = cps[0]
+    for cp in cps[1:] + [None]:
+        if cp is not None and cp == prev + 1:
+            prev = cp
+            continue
+        ranges.append(f"U+{start:X}" if start == prev else f"U+{start:X}-{prev:X}")
+        if cp is not None:
+            start = prev = cp
+    return ",".join(ranges)
+
+
+def _subset(path, unicodes, flavor):
+    from fontTools import subset
+    options = subset.Options()
+    options.flavor = flavor
+    font = subset.load_font(str(path), options)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=unicodes)
+    subsetter.subset(font)
+    buf = io.BytesIO()
+    subset.save_font(font, buf, options)
+    return buf.getvalue()
+
+
+def build_fonts(dist, files, fonts_dir):
+    try:
+        from fontTools.ttLib import TTFont
+    except ImportError:
+        print("fonttools not installed: skipping fonts (pip install fonttools brotli)")
+        return
+    try:
+        import brotli  # noqa: F401  (fontTools needs it to write woff2)
+        flavor = "woff2"
+    except ImportError:
+        flavor = "woff"
+    if not fonts_dir.is_dir():
+        print(f"{fonts_dir} not found: skipping fonts (pages keep the CDN links)")
+        return
+
+    pages = _page_sources()
+    css = []
+    text = LATIN | {ord(c) for page in pages for c in page if ord(c) > 0x7F and not c.isspace()}
+    kanit = {}
+    for path in sorted(fonts_dir.rglob("Kanit-*.ttf")):
+        os2 = TTFont(path, lazy=True)["OS/2"]
+        if not os2.fsSelection & 1 and os2.usWeightClass in assets.FONT_WEIGHTS:
+            kanit[os2.usWeightClass] = path
+    for weight, path in sorted(kanit.items()):
+        covered = text & TTFont(path)["cmap"].getBestCmap().keys()
+        data = _subset(path, covered, flavor)
+        name = dist.write(f"fonts/kanit-{weight}.{flavor}", data)
+        css.append(
+            f"@font-face{{font-family:'Kanit';font-style:normal;font-weight:{weight};font-display:swap;"
+            f"src:url({os.path.relpath(name, 'css')}) format('{flavor}');unicode-range:{_unicode_range(covered)}}}"
+        )
+        print(f"{name}: {path.stat().st_size / 1024:.0f} KiB -> {len(data) / 1024:.1f} KiB")
+    missing = sorted(set(assets.FONT_WEIGHTS) - set(kanit))
+    if missing:
+        print(f"Kanit weights without a source font in {fonts_dir}: {', '.join(map(str, missing))}")
+
+    fa_font = next(fonts_dir.rglob("fa-solid-900.ttf"), None)
+    fa_css = next(fonts_dir.rglob("all.css"), None) or next(fonts_dir.rglob("all.min.css"), None)
+    if fa_font and fa_css:
+        glyphs = {}
+        for m in _FA_RULE_RE.finditer(fa_css.read_text(encoding="utf-8")):
+            for selector in re.findall(r"\.(fa-[\w-]+)", m.group(1)):
+                glyphs[selector] = int(m.group(2), 16)
+        used = sorted({name for page in pages for name in _FA_USE_RE.findall(page)} & glyphs.keys())
+        data = _subset(fa_font, {glyphs[n] for n in used}, flavor)
+        name = dist.write(f"fonts/fa-solid-900.{flavor}", data)
+        css.append(
+            "@font-face{font-family:'Font Awesome 6 Free';font-style:normal;font-weight:900;font-display:block;"
+            f"src:url({os.path.relpath(name, 'css')}) format('{flavor}')}}"
+            ".fa,.fas,.fa-solid{display:inline-block;font-family:'Font Awesome 6 Free';font-weight:900;"
+            "font-style:normal;font-variant:normal;line-height:1;text-rendering:auto;"
+            "-webkit-font-smoothing:antialiased;-moz-osx-font-smoothing:grayscale}"
+        )
+        css.extend(f'.{n}::before{{content:"\\{glyphs[n]:x}"}}' for n in used)
+        print(f"{name}: {fa_font.stat().st_size / 1024:.0f} KiB -> {len(data) / 1024:.1f} KiB ({len(used)} icons)")
+    else:
+        print(f"Font Awesome (fa-solid-900.ttf + all.css) not found in {fonts_dir}: icons keep the CDN")
+
+    # One stylesheet serves both, so self-host only when both are available
+    if kanit and fa_font and fa_css:
+        files["fonts.css"] = dist.write("css/fonts.css", ("\n".join(css) + "\n").encode())
+    else:
+        print("fonts.css not written: pages keep using the CDN fonts")
+
+
+def clean(dist):
+    removed = 0
+    for path in DIST.rglob("*"):
+        rel = path.relative_to(DIST).as_posix()
+        if path.is_file() and rel != "manifest.json" and rel not in dist.written:
+            path.unlink()
+            removed += 1
+    print(f"Removed {removed} stale file(s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build hashed, minified and precompressed static assets")
+    parser.add_argument("--fonts", default=str(ROOT / "backend" / "fonts"),
+                        help="Directory with the Kanit and Font Awesome sources (default: backend/fonts)")
+    parser.add_argument("--clean", action="store_true", help="Delete built files the new manifest does not use")
+    args = parser.parse_args()
+
+    dist = Dist()
+    files, images = {}, {}
+    build_bundles(dist, files)
+    build_images(dist, images)
+    build_fonts(dist, files, Path(args.fonts))
+
+    tmp = DIST / "manifest.json.tmp"
+    tmp.write_text(json.dumps({"files": files, "images": images}, indent=2, sort_keys=True) + "\n")
+    os.replace(tmp, DIST / "manifest.json")
+    if args.clean:
+        clean(dist)
+    print(f"Wrote {DIST / 'manifest.json'}; restart the app to serve the new files.")
+
+
+if __name__ == "__main__":
+    main()
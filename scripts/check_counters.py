@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Recount the /performance dashboard counters and report (or repair) drift.
+
+Usage:
+    python scripts/check_counters.py [--db PATH] [--repair] [--verbose]
+
+stat_counters is kept current by triggers on employees, tasks, shifts and attendance
+(see database.STAT_COUNTERS). Rows written with the triggers dropped, a restored backup or a
+manual edit of stat_counters can leave it out of step; this recounts every total and
+weekly/monthly bucket from the tables. Exits 1 when differences were found and not repaired.
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the dashboard counters against the tables")
+    parser.add_argument("--db", help="Database path (default: CARE_DB_PATH or backend/database.db)")
+    parser.add_argument("--repair", action="store_true", help="Rewrite stat_counters from the recount")
+    parser.add_argument("--verbose", action="store_true", help="List every difference")
+    args = parser.parse_args()
+
+    if args.db:
+        os.environ["CARE_DB_PATH"] = os.path.abspath(args.db)
+    # Import after CARE_DB_PATH is set; database.py resolves it at import time
+    sys.path.append(str(Path(__file__).resolve().parent.parent / "backend"))
+    import database
+
+    database.init_db()
+    diffs = database.check_stat_counters(repair=args.repair)
+    for name, bucket, stored, actual in diffs if args.verbose else diffs[:20]:
+        print(f"{name} {bucket or '(total)'}: stored {stored}, actual {actual}")
+    if len(diffs) > 20 and not args.verbose:
+        print(f"... {len(diffs) - 20} more (--verbose lists all)")
+    if not diffs:
+        print("Counters match the tables.")
+        return
+    if args.repair:
+        print(f"Repaired {len(diffs)} counter(s).")
+        return
+    print(f"{len(diffs)} counter(s) differ; run with --repair to fix.")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
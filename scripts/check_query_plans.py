@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Assert that the shift/adjustment range queries are index-backed.
+
+Usage:
+    python scripts/check_query_plans.py [--db PATH] [--verbose]
+
+Runs EXPLAIN QUERY PLAN for the date-range queries used by backend/database.py and
+backend/app.py (calendar window, coverage, payroll summary, rollups, series update)
+and fails if any of them falls back to a full scan of `shifts` or `pay_adjustments`.
+By default a throwaway database is created with init_db(); pass --db to check an
+existing database (its schema is migrated first).
+"""
+
+import argparse
+import os
+import re
+import sys
+import tempfile
+from pathlib import Path
+
+# (label, sql, params, tables that must not be fully scanned)
+RANGE_QUERIES = [
+    (
+        "get_shifts_in_range",
+        "SELECT * FROM shifts WHERE shift_day BETWEEN date(?) AND date(?)",
+        ("2025-01-01", "2025-01-31"),
+        ("shifts",),
+    ),
+    (
+        "get_shifts_with_names_between",
+        """
+        SELECT shifts.id, employees.name, employees.id as employee_id, shifts.shift_time, shifts.end_time, shifts.series_id
+        FROM shifts
+        JOIN employees ON shifts.employee_id = employees.id
+        WHERE shifts.shift_day BETWEEN date(?) AND date(?)
+        ORDER BY shifts.shift_time
+        """,
+        ("2025-01-01", "2025-01-31"),
+        ("shifts",),
+    ),
+    (
+        "_coverage_gaps_between (coverage fill)",
+        """
+        SELECT employee_id, shift_day, start_min, end_min
+        FROM shifts
+        WHERE shift_day BETWEEN date(?) AND date(?)
+        ORDER BY start_min
+        """,
+        ("2025-01-01", "2025-12-31"),
+        ("shifts",),
+    ),
+    (
+        "get_payroll_summary (hours report/CSV)",
+        """
+        WITH worked AS (
+            SELECT employee_id, SUM(minutes) AS minutes
+            FROM daily_employee_minutes
+            WHERE day BETWEEN date(?) AND date(?)
+            GROUP BY employee_id
+            HAVING SUM(minutes) > 0
+        ), adj AS (
+            SELECT employee_id, SUM(amount) AS total
+            FROM pay_adjustments
+            WHERE date BETWEEN date(?) AND date(?)
+            GROUP BY employee_id
+        )
+        SELECT employees.id AS employee_id, employees.name AS employee_name,
+               COALESCE(employees.hourly_rate, 16) AS hourly_rate,
+               worked.minutes AS minutes, COALESCE(adj.total, 0) AS adjustments
+        FROM worked
+        JOIN employees ON employees.id = worked.employee_id
+        LEFT JOIN adj ON adj.employee_id = worked.employee_id
+        ORDER BY employees.name COLLATE NOCASE
+        """,
+        ("2025-01-06", "2025-01-12", "2025-01-06", "2025-01-12"),
+        ("daily_employee_minutes", "pay_adjustments"),
+    ),
+    (
+        "get_daily_coverage (coverage badges)",
+        """
+        SELECT day, covered_minutes, gaps FROM daily_coverage
+        WHERE day BETWEEN ? AND ? AND window_start = ? AND window_end = ?
+        """,
+        ("2025-01-01", "2025-12-31", 540, 1260),
+        ("daily_coverage",),
+    ),
+    (
+        "update_series_rule (drop generated future)",
+        """
+        DELETE FROM shifts
+        WHERE series_id = ? AND shift_day >= date(?)
+          AND id NOT IN (
+            SELECT shift_id FROM series_exceptions
+            WHERE series_id = ? AND kind = 'override' AND shift_id IS NOT NULL
+          )
+        """,
+        ("series-1", "2025-01-06", "series-1"),
+        ("shifts",),
+    ),
+    (
+        "delete_shifts_by_series",
+        "DELETE FROM shifts WHERE series_id = ?",
+        ("series-1",),
+        ("shifts",),
+    ),
+    (
+        "employee shifts in range",
+        "SELECT id FROM shifts WHERE employee_id = ? AND shift_day BETWEEN date(?) AND date(?)",
+        (1, "2025-01-01", "2025-01-31"),
+        ("shifts",),
+    ),
+]
+
+
+def explain(conn, sql, params):
+    rows = conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    return [r[3] for r in rows]
+
+
+def full_scans(plan_lines, tables):
+    """Return plan lines that are a full table scan (no index) of one of `tables`."""
+    bad = []
+    for line in plan_lines:
+        for t in tables:
+            # 'SCAN shifts' / 'SCAN TABLE shifts' (older SQLite) without 'USING ... INDEX'
+            if re.match(rf"^SCAN (TABLE )?{t}\b", line) and "INDEX" not in line:
+                bad.append(line)
+    return bad
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that range queries use the shift/adjustment indexes")
+    parser.add_argument("--db", help="Database to check (default: temporary database)")
+    parser.add_argument("--verbose", action="store_true", help="Print every query plan")
+    args = parser.parse_args()
+
+    if args.db:
+        os.environ["CARE_DB_PATH"] = os.path.abspath(args.db)
+    else:
+        os.environ["CARE_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="care-plans-"), "database.db")
+
+    # Import after CARE_DB_PATH is set; database.py resolves it at import time
+    sys.path.append(str(Path(__file__).resolve().parent.parent / "backend"))
+    from database import init_db, connect_db
+
+    init_db()
+    conn = connect_db()
+    failures = 0
+    try:
+        for label, sql, params, tables in RANGE_QUERIES:
+            plan = explain(conn, sql, params)
+            bad = full_scans(plan, tables)
+            status = "FAIL" if bad else "ok"
+            print(f"[{status:4}] {label}")
+            if args.verbose or bad:
+                for line in plan:
+                    print(f"         {line}")
+            failures += 1 if bad else 0
+    finally:
+        conn.close()
+
+    if failures:
+        print(f"\n{failures} query plan(s) fall back to a full table scan.")
+        sys.exit(1)
+    print("\nAll range queries are index-backed.")
+
+
+if __name__ == "__main__":
+    main()
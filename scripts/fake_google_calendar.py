@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Minimal in-memory stand-in for the Google Calendar v3 events API, for exercising the sync offline.
+
+Usage:
+    python scripts/fake_google_calendar.py [--port 8765] [--latency-ms 0] [--throttle-every 0]
+    GOOGLE_CALENDAR_API_ROOT=http://127.0.0.1:8765/ python scripts/google_calendar_sync.py --full
+
+Implements events insert (409 on duplicate id), update (404 if missing), delete, list, and the
+multipart/mixed batch endpoint (/batch/calendar/v3). --latency-ms adds a delay per HTTP request
+to mimic network round trips; --throttle-every N answers every Nth operation with a 403
+rateLimitExceeded so client backoff can be observed. GET /_stats returns request counters.
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+EVENTS_RE = re.compile(r"^/calendar/v3/calendars/([^/]+)/events(?:/([^/?]+))?$")
+
+
+class FakeCalendar:
+    def __init__(self, throttle_every=0):
+        self.events = {}  # (calendar_id, event_id) -> event
+        self.lock = threading.Lock()
+        self.throttle_every = throttle_every
+        self.stats = {"http_requests": 0, "operations": 0, "throttled": 0}
+        self._etag = 0
+
+    def handle(self, method, path, body):
+        """Return (status, payload dict or None) for one events API call."""
+        with self.lock:
+            self.stats["operations"] += 1
+            if self.throttle_every and self.stats["operations"] % self.throttle_every == 0:
+                self.stats["throttled"] += 1
+                return 403, _error(403, "rateLimitExceeded", "Rate Limit Exceeded")
+            m = EVENTS_RE.match(urlsplit(path).path)
+            if not m:
+                return 404, _error(404, "notFound", "Not Found")
+            cal, event_id = unquote(m.group(1)), m.group(2) and unquote(m.group(2))
+            if method == "POST" and not event_id:
+                key = (cal, body.get("id"))
+                if key in self.events:
+                    return 409, _error(409, "duplicate", "The requested identifier already exists.")
+                return 200, self._store(key, body)
+            if method == "PUT" and event_id:
+                key = (cal, event_id)
+                if key not in self.events:
+                    return 404, _error(404, "notFound", "Not Found")
+                return 200, self._store(key, body)
+            if method == "DELETE" and event_id:
+                if self.events.pop((cal, event_id), None) is None:
+                    return 410, _error(410, "deleted", "Resource has been deleted")
+                return 204, None
+            if method == "GET" and not event_id:
+                items = [e for (c, _), e in self.events.items() if c == cal]
+                return 200, {"kind": "calendar#events", "items": items}
+            return 405, _error(405, "methodNotAllowed", "Method not allowed")
+
+    def _store(self, key, body):
+        self._etag += 1
+        event = dict(body, etag=f'"{self._etag}"')
+        self.events[key] = event
+        return event
+
+
+def _error(code, reason, message):
+    return {"error": {"code": code, "message": message, "errors": [{"reason": reason, "message": message}]}}
+
+
+REASONS = {200: "OK", 204: "No Content", 403: "Forbidden", 404: "Not Found", 405: "Method Not Allowed",
+           409: "Conflict", 410: "Gone"}
+
+
+def make_handler(cal, latency_s):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *args):
+            pass
+
+        def _body(self):
+            n = int(self.headers.get("Content-Length") or 0)
+            return self.rfile.read(n) if n else b""
+
+        def _send(self, status, payload, content_type="application/json", raw=None):
+            data = raw if raw is not None else (json.dumps(payload).encode() if payload is not None else b"")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _dispatch(self):
+            with cal.lock:
+                cal.stats["http_requests"] += 1
+            if latency_s:
+                time.sleep(latency_s)
+            path = self.path
+            if path == "/_stats":
+                return self._send(200, dict(cal.stats, events=len(cal.events)))
+            raw = self._body()
+            if urlsplit(path).path == "/batch/calendar/v3":
+                return self._batch(raw)
+            body = json.loads(raw) if raw else {}
+            status, payload = cal.handle(self.command, path, body)
+            self._send(status, payload)
+
+        def _batch(self, raw):
+            ctype = self.headers.get("Content-Type", "")
+            msg = BytesParser(policy=HTTP).parsebytes(b"Content-Type: " + ctype.encode() + b"\r\n\r\n" + raw)
+            boundary = "batch_fake_response"
+            out = []
+            for part in msg.iter_parts():
+                inner = part.get_payload(decode=True) or b""
+                head, _, body = inner.replace(b"\r\n", b"\n").partition(b"\n\n")
+                request_line = head.split(b"\n", 1)[0].decode()
+                method, path = request_line.split(" ")[:2]
+                status, payload = cal.handle(method, path, json.loads(body) if body.strip() else {})
+                content_id = (part.get("Content-ID") or "").strip("<>")
+                resp_body = json.dumps(payload) if payload is not None else ""
+                out.append(
+                    f"--{boundary}\r\nContent-Type: application/http\r\nContent-ID: <response-{content_id}>\r\n\r\n"
+                    f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(resp_body)}\r\n\r\n{resp_body}\r\n"
+                )
+            out.append(f"--{boundary}--\r\n")
+            self._send(200, None, f"multipart/mixed; boundary={boundary}", "".join(out).encode())
+
+        do_GET = do_POST = do_PUT = do_DELETE = _dispatch
+
+    return Handler
+
+
+def serve(port=8765, latency_ms=0, throttle_every=0):
+    """Start the fake server in a background thread; returns (server, calendar)."""
+    cal = FakeCalendar(throttle_every)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(cal, latency_ms / 1000.0))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, cal
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Google Calendar events API")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Delay added to every HTTP request")
+    parser.add_argument("--throttle-every", type=int, default=0, help="Answer every Nth operation with 403 rateLimitExceeded")
+    args = parser.parse_args()
+    server, _ = serve(args.port, args.latency_ms, args.throttle_every)
+    print(f"Fake Google Calendar on http://127.0.0.1:{server.server_port}/ (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
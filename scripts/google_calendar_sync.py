@@ -1,40 +1,52 @@
+"""
+Push care shifts to Google Calendar.
+
+Usage:
+    python scripts/google_calendar_sync.py [--full] [--past-days 7] [--future-days 180]
+
+By default only shifts inserted, updated or deleted since the last clean run are pushed
+(tracked by shifts.change_seq and the gcal_sync_state table), so a run with no changes makes
+no API calls. --full forgets the sync state, re-pushes every shift in the window and prunes
+stray shift-<id> events from the calendar.
+"""
+
+import argparse
 import os
 import sys
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 
 # Ensure Python can import from the app folder when running from repo root
-ROOT = os.path.dirname(os.path.dirname(__file__))
-APP_DIR = os.path.join(ROOT, "workforce-management-system")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_DIR = os.path.join(ROOT, "backend")
 if APP_DIR not in sys.path:
     sys.path.insert(0, APP_DIR)
 
-from integrations.google_calendar import bulk_sync, reconcile_window
-from database import get_shifts_with_names_between
+from integrations.google_calendar import CALENDAR_ID, incremental_sync, reconcile_window
+from database import get_shifts_in_range, reset_gcal_sync_state
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync shifts to Google Calendar")
+    parser.add_argument("--full", action="store_true", help="Re-push the whole window and prune stray events")
+    parser.add_argument("--past-days", type=int, default=7)
+    parser.add_argument("--future-days", type=int, default=180)
+    args = parser.parse_args()
+
     tz = ZoneInfo(os.getenv("CARE_TZ", "America/New_York"))
     today = datetime.now(tz).date()
-    start = today - timedelta(days=7)
-    end = today + timedelta(days=180)
-
-    rows = get_shifts_with_names_between(start.isoformat(), end.isoformat())
-    # Convert sqlite3.Row to dict with expected keys
-    shifts = []
-    ids = set()
-    for r in rows:
-        d = {
-            "id": r[0],
-            "employee_name": r[1],
-            "employee_id": r[2],
-            "shift_time": r[3],
-            "end_time": r[4],
-            "series_id": r[5],
-        }
-        shifts.append(d)
-        ids.add(d["id"])
-
-    bulk_sync(shifts)
-    # Optional: cleanup stray events in the window
-    removed = reconcile_window(ids, datetime.combine(start, datetime.min.time()), datetime.combine(end, datetime.min.time()))
-    print(f"Synced {len(shifts)} shifts; removed {removed} stray events.")
+    start = today - timedelta(days=args.past_days)
+    end = today + timedelta(days=args.future_days)
+
+    if args.full:
+        reset_gcal_sync_state(CALENDAR_ID)
+    stats = incremental_sync(start, end)
+    removed = 0
+    if args.full:
+        ids = {r["id"] for r in get_shifts_in_range(start.isoformat(), end.isoformat())}
+        removed = reconcile_window(ids, datetime.combine(start, datetime.min.time()), datetime.combine(end, datetime.min.time()))
+    print(
+        f"Synced: {stats['upserted']} upserted, {stats['deleted']} deleted, {stats['unchanged']} unchanged, "
+        f"{stats['failed']} failed, {stats['api_calls']} API calls; removed {removed} stray events."
+    )
+    if stats["failed"]:
+        sys.exit(1)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Rebuild (or check) the daily hours and coverage rollups from the raw shifts.
+
+Usage:
+    python scripts/rebuild_rollups.py [--db PATH] [--through YYYY-MM-DD] [--check]
+
+daily_employee_minutes and daily_coverage are kept current by triggers (see
+database._ensure_daily_rollups); this is for restoring a backup, a bulk import made with
+the triggers dropped, or a changed CARE_COVERAGE_START/END. Coverage is filled from the
+first shift or time off day through --through (default: the last one).
+--check only compares the stored rows with a fresh computation and exits 1 on a difference.
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import date, datetime
+from pathlib import Path
+
+
+def window_from_env():
+    """Coverage window in minutes after midnight, read like app.py does (CARE_COVERAGE_START/END)."""
+    bounds = []
+    for name, default in (("CARE_COVERAGE_START", "09:00"), ("CARE_COVERAGE_END", "21:00")):
+        t = datetime.strptime(os.environ.get(name, default), "%H:%M").time()
+        bounds.append(t.hour * 60 + t.minute)
+    return tuple(bounds)
+
+
+def check(database, window_start, window_end):
+    conn = database.get_db()
+    worked = {
+        (r[0], r[1]): r[2]
+        for r in conn.execute(
+            "SELECT shift_day, employee_id, SUM(end_min - start_min) FROM shifts "
+            "WHERE start_min IS NOT NULL GROUP BY shift_day, employee_id"
+        )
+    }
+    stored = {(r[0], r[1]): r[2] for r in conn.execute("SELECT day, employee_id, minutes FROM daily_employee_minutes")}
+    bad_minutes = sorted(k for k in worked.keys() | stored.keys() if worked.get(k, 0) != stored.get(k, 0))
+    for day, employee_id in bad_minutes[:20]:
+        print(f"minutes {day} employee {employee_id}: stored {stored.get((day, employee_id))}, "
+              f"shifts {worked.get((day, employee_id))}")
+
+    rows = conn.execute(
+        "SELECT day, gaps FROM daily_coverage WHERE window_start = ? AND window_end = ? ORDER BY day",
+        (window_start, window_end),
+    ).fetchall()
+    bad_coverage = []
+    if rows:
+        fresh = database._coverage_gaps_between(
+            conn, date.fromisoformat(rows[0][0]), date.fromisoformat(rows[-1][0]), window_start, window_end
+        )
+        for day, gaps in rows:
+            expected = ",".join(f"{a}-{b}" for a, b in fresh.get(day, ()))
+            if gaps != expected:
+                bad_coverage.append(day)
+                if len(bad_coverage) <= 20:
+                    print(f"coverage {day}: stored '{gaps}', shifts '{expected}'")
+    print(f"{len(stored)} employee-day rows ({len(bad_minutes)} wrong), "
+          f"{len(rows)} coverage days ({len(bad_coverage)} wrong)")
+    return 1 if bad_minutes or bad_coverage else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the daily hours/coverage rollup tables")
+    parser.add_argument("--db", help="Database path (default: CARE_DB_PATH or backend/database.db)")
+    parser.add_argument("--through", help="Fill coverage through this day (materializes series that far)")
+    parser.add_argument("--check", action="store_true", help="Compare with the raw shifts instead of rebuilding")
+    args = parser.parse_args()
+
+    if args.db:
+        os.environ["CARE_DB_PATH"] = os.path.abspath(args.db)
+    if args.through:
+        date.fromisoformat(args.through)
+    # Import after CARE_DB_PATH is set; database.py resolves it at import time
+    sys.path.append(str(Path(__file__).resolve().parent.parent / "backend"))
+    import database
+
+    database.init_db()
+    window_start, window_end = window_from_env()
+    if args.check:
+        sys.exit(check(database, window_start, window_end))
+    t0 = time.perf_counter()
+    employee_days, coverage_days = database.rebuild_rollups(window_start, window_end, args.through)
+    print(f"Rebuilt {employee_days} employee-day rows and {coverage_days} coverage days "
+          f"in {(time.perf_counter() - t0) * 1000.0:.0f} ms ({database.DATABASE})")
+
+
+if __name__ == "__main__":
+    main()
@@ -19,7 +19,7 @@ from werkzeug.security import generate_password_hash
 
 # Add backend directory to path to import database helpers
 sys.path.append(str(Path(__file__).resolve().parent.parent / "backend"))
-from database import init_db, connect_db
+from database import init_db, connect_db, create_series
 
 # Deterministic seed data
 ADMIN_EMAIL = "admin@example.com"
@@ -120,53 +120,30 @@ def ensure_shift_series(conn, employee_id, series_id, start_date, days_pattern,
     
     Returns: (created_count, skipped_count)
     """
-    created = 0
-    skipped = 0
-    
-    # Check if any shift with this series_id exists
-    cur = conn.execute("SELECT COUNT(*) FROM shifts WHERE series_id = ?", (series_id,))
-    existing_count = cur.fetchone()[0]
-    
-    if existing_count > 0:
+    total_shifts = len(days_pattern) * weeks
+
+    # The rule is the series; a series seeded as plain shifts rows before rules existed counts as present
+    cur = conn.execute(
+        "SELECT (SELECT COUNT(*) FROM series WHERE id = ?) + (SELECT COUNT(*) FROM shifts WHERE series_id = ?)",
+        (series_id, series_id)
+    )
+    if cur.fetchone()[0] > 0:
         if verbose:
-            print(f"[SKIP]   shift series {series_id} (exists with {existing_count} shifts)")
-        return 0, existing_count
+            print(f"[SKIP]   shift series {series_id} (exists)")
+        return 0, total_shifts
     
     if dry_run:
-        total_shifts = len(days_pattern) * weeks
-        print(f"[DRY-RUN] would create {total_shifts} shifts for series {series_id}")
+        print(f"[DRY-RUN] would create series {series_id} ({total_shifts} shifts)")
         return total_shifts, 0
     
-    # Generate shifts for the specified weeks
-    for week_offset in range(weeks):
-        week_start = start_date + dt.timedelta(weeks=week_offset)
-        
-        for day_offset in days_pattern:
-            shift_date = week_start + dt.timedelta(days=day_offset)
-            shift_start = format_shift_datetime(shift_date, start_time[0], start_time[1])
-            shift_end = format_shift_datetime(shift_date, end_time[0], end_time[1])
-            
-            # Double-check individual shift doesn't exist
-            cur = conn.execute(
-                "SELECT 1 FROM shifts WHERE employee_id = ? AND shift_time = ? LIMIT 1",
-                (employee_id, shift_start)
-            )
-            if cur.fetchone():
-                skipped += 1
-                continue
-            
-            conn.execute(
-                "INSERT INTO shifts (employee_id, shift_time, end_time, series_id) VALUES (?, ?, ?, ?)",
-                (employee_id, shift_start, shift_end, series_id)
-            )
-            created += 1
-    
-    if created > 0:
-        print(f"[CREATE] {created} shifts for series {series_id}")
-    if skipped > 0 and verbose:
-        print(f"[SKIP]   {skipped} individual shifts in series {series_id}")
-    
-    return created, skipped
+    # Store the weekly rule; occurrences are written to shifts when the calendar is first read
+    last_day = start_date + dt.timedelta(weeks=weeks, days=-1)
+    create_series(
+        employee_id, series_id, start_date, last_day, days_pattern,
+        dt.time(*start_time), dt.time(*end_time), conn=conn
+    )
+    print(f"[CREATE] series {series_id} ({total_shifts} shifts, {start_date} to {last_day})")
+    return total_shifts, 0
 
 def ensure_single_shift(conn, employee_id, shift_date, start_time, end_time, 
                        verbose=False, dry_run=False):
@@ -260,6 +237,10 @@ def seed_database(reset=False, verbose=False, dry_run=False, yes=False):
                     return False
             
             os.remove(db_path)
+            # WAL mode side files must go too, or they would be replayed into the new DB
+            for suffix in ('-wal', '-shm'):
+                if os.path.exists(db_path + suffix):
+                    os.remove(db_path + suffix)
             print(f"[RESET] Deleted existing database: {db_path}")
     
     # Initialize database
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Print the top SQL statements recorded by the opt-in tracer (CARE_SQL_TRACE=1).
+
+Usage:
+    CARE_SQL_TRACE=1 python main.py            # run the app (or any script) with tracing on
+    python scripts/sql_trace_report.py [--dir PATH] [--top 20] [--sort total|mean|max|count|rows] [--plans]
+    python scripts/sql_trace_report.py --slow 20   # last N entries of the slow-query log
+
+Stats are merged from every stats-<pid>.json in the trace directory (default: `sqltrace/` next to
+the database, or CARE_SQL_TRACE_DIR). Running processes flush them every few seconds and on exit.
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "backend"))
+import sqltrace  # noqa: E402
+
+
+def default_dir():
+    if os.environ.get("CARE_SQL_TRACE_DIR"):
+        return os.environ["CARE_SQL_TRACE_DIR"]
+    from database import SQL_TRACE_DIR
+    return SQL_TRACE_DIR
+
+
+def print_top(directory, n, sort, plans):
+    stats = sqltrace.load_stats(directory)
+    if not stats:
+        print(f"No trace stats in {directory} (run the app with CARE_SQL_TRACE=1 first).")
+        return 1
+    total_all = sum(st["total_s"] for st in stats.values()) or 1.0
+    print(f"{len(stats)} statement shapes, {sum(st['count'] for st in stats.values())} executions, "
+          f"{total_all * 1000.0:.1f} ms total  (sorted by {sort})\n")
+    print(f"{'total ms':>10} {'%':>5} {'count':>7} {'mean ms':>8} {'max ms':>8} {'rows':>8} {'par':>3}  statement")
+    for sql, st in sqltrace.top(stats, n, sort):
+        mean = st["total_s"] / st["count"] if st["count"] else 0.0
+        text = sql if len(sql) <= 110 else sql[:107] + "..."
+        print(f"{st['total_s'] * 1000.0:10.1f} {st['total_s'] / total_all * 100.0:5.1f} {st['count']:7d} "
+              f"{mean * 1000.0:8.3f} {st['max_s'] * 1000.0:8.1f} {st['rows']:8d} {st['params']:3d}  {text}")
+        if plans and st.get("plan"):
+            for line in st["plan"]:
+                print(f"{'':>56}plan: {line}")
+    return 0
+
+
+def print_slow(directory, n):
+    path = os.path.join(directory, sqltrace.SLOW_LOG_NAME)
+    try:
+        with open(path, encoding="utf-8") as fh:
+            lines = fh.readlines()[-n:]
+    except FileNotFoundError:
+        print(f"No slow-query log at {path}.")
+        return 1
+    for line in lines:
+        try:
+            e = json.loads(line)
+        except ValueError:
+            continue
+        print(f"{e['ts']} pid={e['pid']} {e['ms']:9.1f} ms rows={e['rows']:<6} {e['sql']}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize SQL tracer output")
+    parser.add_argument("--dir", help="Trace directory (default: CARE_SQL_TRACE_DIR or sqltrace/ next to the DB)")
+    parser.add_argument("--top", type=int, default=20, help="Number of statements to show")
+    parser.add_argument("--sort", choices=sorted(sqltrace.SORT_KEYS), default="total")
+    parser.add_argument("--plans", action="store_true", help="Show the EXPLAIN QUERY PLAN captured on first sight")
+    parser.add_argument("--slow", type=int, metavar="N", help="Show the last N slow-query log entries instead")
+    args = parser.parse_args()
+
+    directory = args.dir or default_dir()
+    if args.slow:
+        sys.exit(print_slow(directory, args.slow))
+    sys.exit(print_top(directory, args.top, args.sort, args.plans))
+
+
+if __name__ == "__main__":
+    main()